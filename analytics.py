@@ -0,0 +1,464 @@
+import argparse
+import math
+import os
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from grading import ROMAJI_VARIANTS, Grader
+from journal import StaleCursorError
+from kana_table import MODE_COLUMNS, KanaTable, get_kana_table
+from metrics import span
+from retention import Rollup, load_rollup
+from store import DATA_DIR, ResultStore, open_profile_store, open_result_store
+
+MODES = tuple(MODE_COLUMNS)
+CHAR_TYPES = ("basic", "youon", "all", "other")  # 复习题等没有字符类型的记为 other
+
+_VERSION = 1
+_CHUNK = 1 << 16  # 每次向量化汇总的记录数
+_DAY = 86400.0
+_QUARTER = 900.0  # 时区的 UTC 偏移只在整刻钟变化
+
+
+def _lookup(table: KanaTable, column: str) -> Dict[str, int]:
+    """某一列的文字 -> 五十音表位置；罗马音包括其他常见写法，假名同时接受平假名和片假名"""
+    lookup: Dict[str, int] = {}
+    if column == "romaji":
+        for i, romaji in enumerate(table.romaji):
+            lookup.setdefault(romaji, i)
+        for standard, variants in ROMAJI_VARIANTS.items():
+            for variant in variants:
+                lookup.setdefault(variant, lookup[standard])
+    else:
+        for i, kana in enumerate(table.hiragana):
+            lookup.setdefault(kana, i)
+        for i, kana in enumerate(table.katakana):
+            lookup.setdefault(kana, i)
+    return lookup
+
+
+def _utc_offset(timestamp: float) -> float:
+    try:
+        offset = datetime.fromtimestamp(timestamp).astimezone().utcoffset()
+    except (OverflowError, OSError, ValueError):
+        return 0.0
+    return (offset or timedelta()).total_seconds()
+
+
+def _local_days(timestamps: np.ndarray) -> np.ndarray:
+    """时间戳 -> 本地日期距 1970-01-01 的天数，与 date.fromtimestamp 一致
+
+    夏令时会改变 UTC 偏移，每一刻钟取一次当时的偏移，同一刻钟内的记录共用。
+    """
+    quarters, inverse = np.unique(np.floor(timestamps / _QUARTER), return_inverse=True)
+    offsets = np.array([_utc_offset(q * _QUARTER) for q in quarters])
+    days: np.ndarray = np.floor((timestamps + offsets[inverse]) / _DAY).astype(np.int64)
+    return days
+
+
+def _timestamp(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class ResultViews:
+    """答题记录的物化汇总视图
+
+    按 (模式, 字符类型) 的整题对错、按 (模式, 假名) 的逐字对错、
+    按 (模式, 标准答案假名, 实际作答假名) 的混淆矩阵以及按天的整题对错。
+    新记录先按块转换成 NumPy 列，再用 bincount 一次累加到各视图；
+    游标记录已经汇总到的位置，refresh 只读取之后追加的记录。
+    """
+
+    def __init__(self, table: Optional[KanaTable] = None) -> None:
+        self.table = table if table is not None else get_kana_table()
+        self._answered = [_lookup(self.table, MODE_COLUMNS[mode][1]) for mode in MODES]
+        self.reset()
+
+    def reset(self) -> None:
+        """清空全部视图和游标"""
+        n, m, c = len(self.table), len(MODES), len(CHAR_TYPES)
+        self.cursor: Optional[str] = None
+        self.records = 0
+        self.q_attempts = np.zeros((m, c), dtype=np.int64)
+        self.q_correct = np.zeros((m, c), dtype=np.int64)
+        self.k_attempts = np.zeros((m, n), dtype=np.int64)
+        self.k_correct = np.zeros((m, n), dtype=np.int64)
+        # 最后一列为无法识别或没有作答
+        self.confusion = np.zeros((m, n, n + 1), dtype=np.int64)
+        self.days = np.zeros(0, dtype=np.int64)
+        self.d_attempts = np.zeros((0, m), dtype=np.int64)
+        self.d_correct = np.zeros((0, m), dtype=np.int64)
+
+    def update(self, records: Iterable[Dict[str, Any]]) -> int:
+        """把新记录累加到各视图，返回处理的记录数"""
+        total = 0
+        chunk: List[Dict[str, Any]] = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) == _CHUNK:
+                total += self._update_chunk(chunk)
+                chunk = []
+        if chunk:
+            total += self._update_chunk(chunk)
+        return total
+
+    def _update_chunk(self, records: List[Dict[str, Any]]) -> int:
+        """把一块记录转换成列，再向量化累加"""
+        mode_ids = {mode: i for i, mode in enumerate(MODES)}
+        type_ids = {t: i for i, t in enumerate(CHAR_TYPES)}
+        other = type_ids["other"]
+        unknown = len(self.table)
+        tokenize = Grader.tokenize
+
+        r_mode: List[int] = []
+        r_type: List[int] = []
+        r_ok: List[bool] = []
+        r_time: List[float] = []
+        c_mode: List[int] = []
+        c_expected: List[int] = []
+        c_answered: List[int] = []
+        c_ok: List[bool] = []
+        for record in records:
+            m = mode_ids.get(record.get("mode", ""))
+            if m is None:
+                continue
+            r_mode.append(m)
+            r_type.append(type_ids.get(record.get("char_type", ""), other))
+            r_ok.append(bool(record.get("is_correct")))
+            r_time.append(_timestamp(record.get("timestamp")))
+
+            answered_lookup = self._answered[m]
+            if record.get("indices") is not None or record.get("chars"):
+                # 优先用记录中的五十音表位置，罗马音题目的 ji 才能区分じ和ぢ
+                expected = self.table.record_indices(record)
+            else:
+                tokens = tokenize(str(record.get("correct_answer", "")))
+                expected = [answered_lookup.get(t, -1) for t in tokens]
+            answered = [
+                answered_lookup.get(t, unknown)
+                for t in tokenize(str(record.get("user_answer", "")))
+            ]
+            results = record.get("char_results") or []
+            for pos, e in enumerate(expected):
+                if e < 0:
+                    continue
+                a = answered[pos] if pos < len(answered) else unknown
+                ok = bool(results[pos]) if pos < len(results) else a == e
+                c_mode.append(m)
+                c_expected.append(e)
+                # 判为正确的作答（如同音的じ/ぢ）算作对角线
+                c_answered.append(e if ok else a)
+                c_ok.append(ok)
+
+        self._accumulate(
+            np.array(r_mode, dtype=np.int64),
+            np.array(r_type, dtype=np.int64),
+            np.array(r_ok, dtype=bool),
+            np.array(r_time, dtype=np.float64),
+            np.array(c_mode, dtype=np.int64),
+            np.array(c_expected, dtype=np.int64),
+            np.array(c_answered, dtype=np.int64),
+            np.array(c_ok, dtype=bool),
+        )
+        self.records += len(r_mode)
+        return len(r_mode)
+
+    def _accumulate(
+        self,
+        r_mode: np.ndarray,
+        r_type: np.ndarray,
+        r_ok: np.ndarray,
+        r_time: np.ndarray,
+        c_mode: np.ndarray,
+        c_expected: np.ndarray,
+        c_answered: np.ndarray,
+        c_ok: np.ndarray,
+    ) -> None:
+        n, m, c = len(self.table), len(MODES), len(CHAR_TYPES)
+
+        flat = r_mode * c + r_type
+        self.q_attempts += np.bincount(flat, minlength=m * c).reshape(m, c)
+        self.q_correct += (
+            np.bincount(flat, r_ok, minlength=m * c).astype(np.int64).reshape(m, c)
+        )
+
+        flat = c_mode * n + c_expected
+        self.k_attempts += np.bincount(flat, minlength=m * n).reshape(m, n)
+        self.k_correct += (
+            np.bincount(flat, c_ok, minlength=m * n).astype(np.int64).reshape(m, n)
+        )
+        self.confusion += np.bincount(
+            flat * (n + 1) + c_answered, minlength=m * n * (n + 1)
+        ).reshape(m, n, n + 1)
+
+        valid = np.isfinite(r_time)
+        if valid.any():
+            day = _local_days(r_time[valid])
+            self._add_daily(day, r_mode[valid], np.ones(len(day)), r_ok[valid])
+
+    def _add_daily(
+        self,
+        day: np.ndarray,
+        mode: np.ndarray,
+        attempts: np.ndarray,
+        correct: np.ndarray,
+    ) -> None:
+        """按 (天, 模式) 累加作答题数和答对题数，新出现的日期插入到有序的日期数组中"""
+        m = len(MODES)
+        days = np.union1d(self.days, day)
+        slots = np.searchsorted(days, day) * m + mode
+        d_attempts = np.zeros((len(days), m), dtype=np.int64)
+        d_correct = np.zeros((len(days), m), dtype=np.int64)
+        old = np.searchsorted(days, self.days)
+        d_attempts[old] = self.d_attempts
+        d_correct[old] = self.d_correct
+        for target, weights in ((d_attempts, attempts), (d_correct, correct)):
+            target += (
+                np.bincount(slots, weights, minlength=len(days) * m)
+                .astype(np.int64)
+                .reshape(-1, m)
+            )
+        self.days, self.d_attempts, self.d_correct = days, d_attempts, d_correct
+
+    def add_rollup(self, rollup: Rollup) -> None:
+        """加上保留策略汇总掉的旧记录（没有作答内容，只计入对角线上答对的部分）"""
+        mode_ids = {mode: i for i, mode in enumerate(MODES)}
+        type_ids = {t: i for i, t in enumerate(CHAR_TYPES)}
+        epoch = date(1970, 1, 1)
+        days: List[int] = []
+        modes: List[int] = []
+        attempts: List[int] = []
+        correct: List[int] = []
+        for day, mode, char_type, a, c in rollup.question_counts():
+            m = mode_ids.get(mode)
+            if m is None:
+                continue
+            t = type_ids.get(char_type, type_ids["other"])
+            self.q_attempts[m, t] += a
+            self.q_correct[m, t] += c
+            days.append((day - epoch).days)
+            modes.append(m)
+            attempts.append(a)
+            correct.append(c)
+        if days:
+            self._add_daily(
+                np.array(days, dtype=np.int64),
+                np.array(modes, dtype=np.int64),
+                np.array(attempts, dtype=np.float64),
+                np.array(correct, dtype=np.float64),
+            )
+        for mode, index, a, c in rollup.kana_counts():
+            m = mode_ids.get(mode)
+            if m is None:
+                continue
+            self.k_attempts[m, index] += a
+            self.k_correct[m, index] += c
+            self.confusion[m, index, index] += c
+        self.records += rollup.records
+
+    def refresh(self, store: ResultStore) -> int:
+        """汇总游标之后新追加的记录；记录文件被重写时从头重建，返回处理的记录数
+
+        从头汇总时先加上保留策略汇总掉的旧记录（见 retention.py）。
+        """
+        with span("analytics_refresh"):
+            try:
+                if self.cursor is None:
+                    self.add_rollup(load_rollup(store.path, self.table))
+                count = self.update(store.iter_new_records(self.cursor))
+            except StaleCursorError:
+                self.reset()
+                self.add_rollup(load_rollup(store.path, self.table))
+                count = self.update(store.iter_new_records(None))
+            self.cursor = store.cursor
+        return count
+
+    # ---- 报表 ----
+
+    def _mode_slice(self, mode: Optional[str]) -> slice:
+        if mode is None:
+            return slice(None)
+        i = MODES.index(mode)
+        return slice(i, i + 1)
+
+    def by_mode(self) -> List[Tuple[str, str, int, int]]:
+        """每个 (模式, 字符类型) 的 (作答题数, 答对题数)"""
+        return [
+            (mode, char_type, int(self.q_attempts[i, j]), int(self.q_correct[i, j]))
+            for i, mode in enumerate(MODES)
+            for j, char_type in enumerate(CHAR_TYPES)
+            if self.q_attempts[i, j]
+        ]
+
+    def by_row(self, mode: Optional[str] = None) -> List[Tuple[str, int, int]]:
+        """五十音表每一行（あ行、か行……）的逐字 (作答次数, 答对次数)"""
+        s = self._mode_slice(mode)
+        rows = np.array(self.table.row_ids, dtype=np.int64)
+        size = len(self.table.row_names)
+        attempts = np.bincount(rows, self.k_attempts[s].sum(axis=0), minlength=size)
+        correct = np.bincount(rows, self.k_correct[s].sum(axis=0), minlength=size)
+        return [
+            (name, int(attempts[i]), int(correct[i]))
+            for i, name in enumerate(self.table.row_names)
+            if attempts[i]
+        ]
+
+    def trend(
+        self, days: int = 14, mode: Optional[str] = None
+    ) -> List[Tuple[date, int, int]]:
+        """最近 days 个有记录的日期的 (日期, 作答题数, 答对题数)"""
+        s = self._mode_slice(mode)
+        attempts = self.d_attempts[:, s].sum(axis=1)
+        correct = self.d_correct[:, s].sum(axis=1)
+        keep = np.nonzero(attempts)[0][-days:]
+        return [
+            (
+                date(1970, 1, 1) + timedelta(days=int(self.days[i])),
+                int(attempts[i]),
+                int(correct[i]),
+            )
+            for i in keep
+        ]
+
+    def confusion_matrix(self, mode: Optional[str] = None) -> np.ndarray:
+        """[标准答案假名, 实际作答假名] 的次数，最后一列为无法识别或没有作答"""
+        matrix: np.ndarray = self.confusion[self._mode_slice(mode)].sum(axis=0)
+        return matrix
+
+    def top_confusions(
+        self, n: int = 10, mode: Optional[str] = None
+    ) -> List[Tuple[str, str, int]]:
+        """最常见的 (标准答案, 实际作答, 次数)，按平假名显示"""
+        matrix = self.confusion_matrix(mode).copy()
+        size = len(self.table)
+        matrix[np.arange(size), np.arange(size)] = 0
+        flat = matrix.ravel()
+        top = np.argsort(flat, kind="stable")[::-1][:n]
+        labels = list(self.table.hiragana) + ["？"]
+        return [
+            (labels[i // (size + 1)], labels[i % (size + 1)], int(flat[i]))
+            for i in top
+            if flat[i]
+        ]
+
+    # ---- 持久化 ----
+
+    def save(self, path: Union[str, Path]) -> None:
+        path = Path(path)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=np.array(_VERSION),
+                table_size=np.array(len(self.table)),
+                cursor=np.array(self.cursor or ""),
+                records=np.array(self.records),
+                q_attempts=self.q_attempts,
+                q_correct=self.q_correct,
+                k_attempts=self.k_attempts,
+                k_correct=self.k_correct,
+                confusion=self.confusion,
+                days=self.days,
+                d_attempts=self.d_attempts,
+                d_correct=self.d_correct,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(
+        cls, path: Union[str, Path], table: Optional[KanaTable] = None
+    ) -> "ResultViews":
+        """读取保存的视图；文件不存在、损坏或与五十音表不匹配时返回空视图"""
+        views = cls(table)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != _VERSION or int(data["table_size"]) != len(
+                    views.table
+                ):
+                    return views
+                for name in (
+                    "q_attempts",
+                    "q_correct",
+                    "k_attempts",
+                    "k_correct",
+                    "confusion",
+                    "days",
+                    "d_attempts",
+                    "d_correct",
+                ):
+                    setattr(views, name, data[name])
+                views.cursor = str(data["cursor"]) or None
+                views.records = int(data["records"])
+        except (OSError, ValueError, KeyError):
+            return cls(table)
+        return views
+
+
+def format_report(
+    views: ResultViews, mode: Optional[str] = None, days: int = 14, top: int = 10
+) -> str:
+    """把各视图渲染成文字报表"""
+
+    def pct(attempts: int, correct: int) -> str:
+        return f"{correct / attempts * 100:5.1f}%" if attempts else "    -"
+
+    lines = [f"共 {views.records} 条答题记录"]
+    lines.append("\n== 按模式和字符类型 ==")
+    for m, char_type, attempts, correct in views.by_mode():
+        if mode is None or m == mode:
+            lines.append(
+                f"{m:<14} {char_type:<6} {attempts:>8} 题  {pct(attempts, correct)}"
+            )
+    lines.append("\n== 按行（逐字）==")
+    for name, attempts, correct in views.by_row(mode):
+        lines.append(f"{name:<8} {attempts:>8} 次  {pct(attempts, correct)}")
+    lines.append(f"\n== 最近 {days} 天 ==")
+    for day, attempts, correct in views.trend(days, mode):
+        lines.append(f"{day.isoformat()} {attempts:>8} 题  {pct(attempts, correct)}")
+    lines.append("\n== 最常混淆（标准答案 → 实际作答）==")
+    for expected, answered, count in views.top_confusions(top, mode):
+        lines.append(f"{expected} → {answered} {count:>8} 次")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="答题记录统计报表")
+    parser.add_argument("--profile", help="学习者名称")
+    parser.add_argument("--data-dir", default=str(DATA_DIR), help="学习者数据目录")
+    parser.add_argument(
+        "--results", default="hiragana_quiz_results.jsonl", help="记录文件"
+    )
+    parser.add_argument("--mode", choices=MODES, help="只看某个练习模式")
+    parser.add_argument("--days", type=int, default=14, help="趋势显示的天数")
+    parser.add_argument("--top", type=int, default=10, help="显示多少组混淆")
+    parser.add_argument("--rebuild", action="store_true", help="丢弃缓存的视图重新汇总")
+    args = parser.parse_args()
+
+    if args.profile:
+        store = open_profile_store(args.profile, args.data_dir)
+    else:
+        store = open_result_store(args.results)
+    views_path = store.path.with_suffix(".views")
+
+    start = time.perf_counter()
+    views = ResultViews() if args.rebuild else ResultViews.load(views_path)
+    added = views.refresh(store)
+    if added or args.rebuild:
+        views.save(views_path)
+    refreshed = time.perf_counter()
+    report = format_report(views, args.mode, args.days, args.top)
+    rendered = time.perf_counter()
+    store.close()
+
+    print(report)
+    print(
+        f"\n新汇总 {added} 条记录 {(refreshed - start) * 1000:.0f} ms，"
+        f"生成报表 {(rendered - refreshed) * 1000:.1f} ms"
+    )
@@ -0,0 +1,136 @@
+import secrets
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from kana_table import MODE_COLUMNS, KanaTable, format_question, get_kana_table
+from quiz_item import QuizItem
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    """SplitMix64 混合函数，对 uint64 数组逐元素计算（溢出自动回绕）"""
+    z = x + _GOLDEN
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def derive_set_seeds(seed: int, n_sets: int) -> np.ndarray:
+    """由总种子派生每套题目的种子，第 i 套的种子只取决于 seed 和 i"""
+    base = np.full(n_sets, seed & 0xFFFFFFFFFFFFFFFF, dtype=np.uint64)
+    return _splitmix64(base ^ _splitmix64(np.arange(n_sets, dtype=np.uint64)))
+
+
+class QuizBatches:
+    """列式存储的多套题目
+
+    indices[套, 题, 字符] 是五十音表中的位置，只有在需要时才拼成题目文本。
+    """
+
+    def __init__(
+        self,
+        indices: np.ndarray,
+        set_seeds: np.ndarray,
+        mode: str,
+        char_type: str,
+        table: KanaTable,
+    ) -> None:
+        self.indices = indices
+        self.set_seeds = set_seeds
+        self.mode = mode
+        self.char_type = char_type
+        self.table = table
+
+        source_col, target_col = MODE_COLUMNS[mode]
+        self._source = table.column(source_col)
+        self._target = table.column(target_col)
+
+    def __len__(self) -> int:
+        return int(self.indices.shape[0])
+
+    @property
+    def num_questions(self) -> int:
+        return int(self.indices.shape[1])
+
+    @property
+    def chars_per_question(self) -> int:
+        return int(self.indices.shape[2])
+
+    def chars(self, set_no: int, question_no: int) -> List[str]:
+        return [self._source[i] for i in self.indices[set_no, question_no].tolist()]
+
+    def answers(self, set_no: int, question_no: int) -> List[str]:
+        return [self._target[i] for i in self.indices[set_no, question_no].tolist()]
+
+    def question(self, set_no: int, question_no: int) -> str:
+        return format_question(self.mode, self.chars(set_no, question_no))
+
+    def answer(self, set_no: int, question_no: int) -> str:
+        return " ".join(self.answers(set_no, question_no))
+
+    def to_items(self, set_no: int) -> List[QuizItem]:
+        """把一套题目转换成与 HiraganaQuiz.generate_quiz_items 相同的 QuizItem"""
+        return [
+            QuizItem(self.indices[set_no, q].tolist(), self.mode)
+            for q in range(self.num_questions)
+        ]
+
+    def __iter__(self) -> Iterator[List[QuizItem]]:
+        for set_no in range(len(self)):
+            yield self.to_items(set_no)
+
+
+def generate_quiz_batches(
+    n_sets: int,
+    num_questions: int = 5,
+    chars_per_question: int = 2,
+    mode: str = "hira_to_roma",
+    char_type: str = "all",
+    seed: Optional[int] = None,
+    set_seeds: Optional[Sequence[int]] = None,
+    table: Optional[KanaTable] = None,
+) -> QuizBatches:
+    """一次生成多套题目，每套内字符不重复
+
+    每套题目给每个候选字符算一个由 (套种子, 字符位置) 决定的随机键，取键最小的
+    num_questions * chars_per_question 个（argpartition，不做完整洗牌），
+    全部套数在一次向量化运算中完成。传入同一个 set_seeds 中的种子即可单独重现某一套。
+    """
+    if mode not in MODE_COLUMNS:
+        raise ValueError(f"Unknown mode: {mode}")
+    if table is None:
+        table = get_kana_table()
+
+    span = table.span(char_type)
+    k = num_questions * chars_per_question
+    if k > len(span):
+        raise ValueError(f"每套最多 {len(span)} 个字符，当前需要 {k} 个")
+
+    if set_seeds is None:
+        if seed is None:
+            seed = secrets.randbits(64)
+        seeds = derive_set_seeds(seed, n_sets)
+    else:
+        seeds = np.asarray(set_seeds, dtype=np.uint64)
+        n_sets = len(seeds)
+
+    positions = np.arange(len(span), dtype=np.uint64) * _GOLDEN
+    keys = _splitmix64(seeds[:, None] ^ positions[None, :])
+
+    if k < len(span):
+        picked = np.argpartition(keys, k - 1, axis=1)[:, :k]
+    else:
+        picked = np.broadcast_to(np.arange(k), (n_sets, k))
+    order = np.argsort(np.take_along_axis(keys, picked, axis=1), axis=1)
+    picked = np.take_along_axis(picked, order, axis=1)
+
+    indices = (picked + span.start).astype(np.uint16)
+    return QuizBatches(
+        indices.reshape(n_sets, num_questions, chars_per_question),
+        seeds,
+        mode,
+        char_type,
+        table,
+    )
@@ -0,0 +1,61 @@
+"""统计报表的规模测试，在仓库根目录运行：python -m benchmarks.bench_analytics
+
+先从头汇总一份合成的答题记录，再追加一批新记录只做增量汇总，
+最后测量从保存的视图加载并生成各项报表的耗时。
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from analytics import ResultViews, format_report
+from benchmarks.bench_suite import DATA_DIR, make_results
+from store import JournalResultStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="统计报表的规模测试")
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--append", type=int, default=1000, help="增量汇总的新记录数")
+    args = parser.parse_args()
+
+    source = make_results(DATA_DIR / f"results-{args.records}.jsonl", args.records)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "results.jsonl"
+        shutil.copy(source, path)
+        views_path = path.with_suffix(".views")
+
+        store = JournalResultStore(path, Path(tmp) / "reviewed.json")
+        start = time.perf_counter()
+        views = ResultViews()
+        views.refresh(store)
+        views.save(views_path)
+        full = time.perf_counter() - start
+
+        with open(source, "r", encoding="utf-8") as f:
+            extra = [json.loads(next(f)) for _ in range(args.append)]
+        store.append(extra)
+        start = time.perf_counter()
+        views = ResultViews.load(views_path)
+        added = views.refresh(store)
+        views.save(views_path)
+        incremental = time.perf_counter() - start
+        assert added == args.append and views.records == args.records + args.append
+
+        start = time.perf_counter()
+        views = ResultViews.load(views_path)
+        format_report(views)
+        report = time.perf_counter() - start
+        store.close()
+
+    print(f"{args.records} 条记录")
+    print(f"从头汇总并保存     {full * 1000:>10.0f} ms")
+    print(f"增量汇总 {args.append} 条   {incremental * 1000:>10.1f} ms")
+    print(f"加载视图并生成报表 {report * 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""批量出题吞吐量测试，在仓库根目录运行：python -m benchmarks.bench_batch"""
+
+import argparse
+import time
+
+from batch import generate_quiz_batches
+
+TARGET_QPS = 100_000  # 目标：单核每秒生成 10 万道题
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="批量出题吞吐量测试")
+    parser.add_argument("--sets", type=int, default=10000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--chars", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    generate_quiz_batches(10, args.questions, args.chars, seed=0)  # 预热
+
+    best = float("inf")
+    for i in range(args.repeat):
+        start = time.perf_counter()
+        batches = generate_quiz_batches(args.sets, args.questions, args.chars, seed=i)
+        best = min(best, time.perf_counter() - start)
+
+    total = args.sets * args.questions
+    qps = total / best
+    print(f"生成: {total} 题 / {best * 1000:.1f} ms = {qps:,.0f} 题/秒")
+
+    sample = min(len(batches), 1000)
+    start = time.perf_counter()
+    for set_no in range(sample):
+        for question_no in range(args.questions):
+            batches.question(set_no, question_no)
+            batches.answer(set_no, question_no)
+    elapsed = time.perf_counter() - start
+    print(f"格式化题目和答案: {sample * args.questions / elapsed:,.0f} 题/秒")
+
+    start = time.perf_counter()
+    for set_no in range(sample):
+        batches.to_items(set_no)
+    elapsed = time.perf_counter() - start
+    print(f"转换为 QuizItem: {sample * args.questions / elapsed:,.0f} 题/秒")
+
+    status = "达标" if qps >= TARGET_QPS else "未达标"
+    print(f"目标 {TARGET_QPS:,} 题/秒：{status}")
+    if qps < TARGET_QPS:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
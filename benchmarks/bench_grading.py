@@ -0,0 +1,42 @@
+"""判题引擎吞吐量测试，在仓库根目录运行：python -m benchmarks.bench_grading"""
+
+import argparse
+import random
+import time
+
+from grading import ROMAJI_VARIANTS, get_grader
+from kana_table import get_kana_table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="判题引擎吞吐量测试")
+    parser.add_argument("--sheets", type=int, default=200000)
+    parser.add_argument("--chars", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    romaji = list(get_kana_table().romaji)
+    sheets = []
+    for _ in range(args.sheets):
+        expected = rng.sample(romaji, args.chars)
+        answer = [
+            rng.choice(ROMAJI_VARIANTS.get(r, (r,))) if rng.random() < 0.3 else r
+            for r in expected
+        ]
+        if rng.random() < 0.1:
+            answer[0] = "x"
+        sheets.append((expected, " ".join(answer)))
+
+    grader = get_grader()
+    start = time.perf_counter()
+    results = grader.grade_batch(sheets)
+    elapsed = time.perf_counter() - start
+
+    tokens = args.sheets * args.chars
+    correct = sum(result.is_correct for result in results)
+    print(f"答卷: {args.sheets}，正确 {correct}，用时 {elapsed * 1000:.1f} ms")
+    print(f"吞吐: {tokens / elapsed:,.0f} 字符/秒，{args.sheets / elapsed:,.0f} 份/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""多进程并发练习测试，在仓库根目录运行：python -m benchmarks.bench_profiles
+
+多个进程同时为若干学习者保存答题记录（同一学习者也会有多个进程同时写入），
+期间反复触发日志压缩，最后检查每个学习者的记录、已复习标记和逐字统计是否完整。
+"""
+
+import argparse
+import multiprocessing
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+from main import HiraganaQuiz
+from mistake import MistakeReviewer
+from stats import MasteryStats
+from store import JournalResultStore
+
+
+def practise(args: Tuple[str, str, int, int]) -> int:
+    """一个进程：练习 sessions 次，每次 20 题，答错的题标记为已复习"""
+    data_dir, profile, worker, sessions = args
+    quiz = HiraganaQuiz(profile=profile, data_dir=data_dir)
+    reviewer = MistakeReviewer(store=quiz.store, profile=profile, data_dir=data_dir)
+    assert isinstance(quiz.store, JournalResultStore)
+    quiz.store.journal.compact_every = 200  # 频繁压缩，检查与追加并发时不丢记录
+    for session in range(sessions):
+        items = quiz.generate_quiz_items(10, "hira_to_roma", 2, "all")
+        for i, item in enumerate(items):
+            record = quiz.make_record(item, "x", False, "hira_to_roma", "all")
+            # 题目中带上进程号和序号，保证每条错题唯一
+            record["question"] = f"{record['question']} #{worker}-{session}-{i}"
+            quiz.results.append(record)
+        quiz.save_results()
+        reviewer.save_reviewed(quiz.results[-1]["question"])
+    quiz.store.close()
+    return sessions * 10
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="多进程并发练习测试")
+    parser.add_argument("--profiles", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=4, help="每个学习者的进程数")
+    parser.add_argument("--sessions", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = [
+            (tmp, f"learner{p}", w, args.sessions)
+            for p in range(args.profiles)
+            for w in range(args.workers)
+        ]
+        start = time.perf_counter()
+        with multiprocessing.Pool(len(jobs)) as pool:
+            written = sum(pool.map(practise, jobs))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{len(jobs)} 个进程写入 {written} 条记录，用时 {elapsed:.2f} 秒"
+            f"（{written / elapsed:,.0f} 条/秒）"
+        )
+
+        ok = True
+        expected = args.workers * args.sessions * 10
+        for p in range(args.profiles):
+            reviewer = MistakeReviewer(profile=f"learner{p}", data_dir=tmp)
+            records = list(reviewer.store.iter_records())
+            questions = {r["question"] for r in records}
+            marks = reviewer.store.reviewed_questions()
+            reviewed = [q for q in questions if q in marks]
+            stats = MasteryStats.load(Path(tmp) / f"learner{p}" / "results.stats")
+            attempts = sum(stats.attempts) if stats is not None else 0
+            line = (
+                f"learner{p}: 记录 {len(records)}/{expected}，"
+                f"不重复 {len(questions)}，已复习 {len(reviewed)}，统计字数 {attempts}"
+            )
+            if not (
+                len(records) == len(questions) == expected
+                and len(reviewed) == args.workers * args.sessions
+                and attempts == 2 * expected
+            ):
+                ok = False
+                line += "  <- 不完整"
+            print(line)
+
+    print("没有丢失数据" if ok else "发现数据丢失")
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
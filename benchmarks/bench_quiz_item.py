@@ -0,0 +1,82 @@
+"""题目表示的内存测试，在仓库根目录运行：python -m benchmarks.bench_quiz_item
+
+分别用旧版字典题目、QuizItem 和 pack_items 打包的字节串保存同一批题目，
+比较常驻内存和序列化后的大小。
+"""
+
+import argparse
+import json
+import random
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from kana_table import MODE_COLUMNS, format_question, get_kana_table
+from quiz_item import QuizItem, pack_items, unpack_items
+
+
+def dict_item(indices: List[int], mode: str) -> Dict[str, Any]:
+    """旧版 generate_quiz_items 生成的字典题目"""
+    table = get_kana_table()
+    source_col, target_col = MODE_COLUMNS[mode]
+    chars = [table.column(source_col)[i] for i in indices]
+    answers = [table.column(target_col)[i] for i in indices]
+    return {
+        "type": "multi_char_quiz",
+        "question": format_question(mode, chars),
+        "answer": " ".join(answers),
+        "details": {"chars": chars, "answers": answers, "mode": mode},
+    }
+
+
+def measure(build: Callable[[], Any]) -> int:
+    """build() 返回的对象常驻占用的字节数"""
+    tracemalloc.start()
+    obj = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="题目表示的内存测试")
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--chars", type=int, default=2, help="每题字符数")
+    parser.add_argument("--mode", default="hira_to_roma", choices=list(MODE_COLUMNS))
+    args = parser.parse_args()
+
+    table = get_kana_table()
+    span = table.span("all")
+    rng = random.Random(0)
+    picks = [rng.sample(span, args.chars) for _ in range(args.items)]
+
+    dict_bytes = measure(lambda: [dict_item(p, args.mode) for p in picks])
+    item_bytes = measure(lambda: [QuizItem(p, args.mode) for p in picks])
+    items = [QuizItem(p, args.mode) for p in picks]
+    packed_bytes = measure(lambda: pack_items(items))
+    assert unpack_items(pack_items(items)) == items
+
+    dict_json = len(
+        json.dumps([dict_item(p, args.mode) for p in picks], ensure_ascii=False).encode(
+            "utf-8"
+        )
+    )
+    packed_len = len(pack_items(items))
+
+    n = args.items
+    print(f"{n} 道题，每题 {args.chars} 个字符（{args.mode}）")
+    print(f"{'表示':<12} {'内存(MB)':>10} {'每题(字节)':>12}")
+    for name, size in (
+        ("字典", dict_bytes),
+        ("QuizItem", item_bytes),
+        ("pack_items", packed_bytes),
+    ):
+        print(f"{name:<12} {size / 1e6:>10.2f} {size / n:>12.1f}")
+    print(
+        f"序列化大小：JSON {dict_json / 1e6:.2f} MB，"
+        f"pack_items {packed_len / 1e6:.2f} MB（{dict_json / packed_len:.0f} 倍）"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""保留策略压缩测试，在仓库根目录运行：python -m benchmarks.bench_retention
+
+复制一份合成的答题记录（约两成错题，其中一半已复习），只保留最新的 --keep
+比例的原始记录，其余汇总删除，报告回收的空间和读取记录、查询错题的提速。
+"""
+
+import argparse
+import shutil
+import tempfile
+from pathlib import Path
+
+from benchmarks.bench_suite import DATA_DIR, make_results
+from retention import RetentionPolicy, compact_results, load_rollup
+from store import JournalResultStore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="保留策略压缩测试")
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--keep", type=float, default=0.1, help="保留的最新记录比例")
+    args = parser.parse_args()
+
+    source = make_results(DATA_DIR / f"results-{args.records}.jsonl", args.records)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "results.jsonl"
+        shutil.copy(source, path)
+        reviewed = source.with_suffix(".reviewed.json")
+        shutil.copy(reviewed, Path(tmp) / "reviewed.json")
+        store = JournalResultStore(path, Path(tmp) / "reviewed.json")
+        mistakes = len(store.unreviewed_mistakes())
+
+        # 合成记录的时间戳为 1.7e9 + 序号，按比例算出截止时间
+        now = 1.7e9 + args.records * (1 - args.keep)
+        report = compact_results(store, RetentionPolicy(0), now=now)
+        assert len(store.unreviewed_mistakes()) == mistakes
+        kept = sum(1 for _ in store.iter_records())
+        assert kept + load_rollup(path).records == args.records
+        store.close()
+
+    print(f"{args.records} 条记录，保留最新 {args.keep:.0%}，剩余原始记录 {kept} 条")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""已复习集合写入开销测试，在仓库根目录运行：python -m benchmarks.bench_reviewed
+
+已有不同数量的已复习题目时，一次复习答对 N 题（逐题标记，结束时落盘）的耗时和写入字节数。
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from reviewed import ReviewedSet
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="已复习集合写入开销测试")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--answers", type=int, default=50, help="一次复习答对的题数")
+    args = parser.parse_args()
+
+    print(f"{'已复习数':>10} {'读取(ms)':>10} {'标记(ms)':>10} {'写入字节':>10}")
+    for size in map(int, args.sizes.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "reviewed.hashes"
+            existing = ReviewedSet(path, flush_every=1 << 30)
+            existing.update(f"old question {i}" for i in range(size))
+            existing.close()
+
+            start = time.perf_counter()
+            reviewed = ReviewedSet(path)
+            len(reviewed)
+            loaded = time.perf_counter()
+            before = path.stat().st_size
+            for i in range(args.answers):
+                reviewed.add(f"new question {i}")
+            reviewed.close()
+            marked = time.perf_counter()
+            written = path.stat().st_size - before
+            print(
+                f"{size:>10} {(loaded - start) * 1000:>10.1f} "
+                f"{(marked - loaded) * 1000:>10.2f} {written:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""加权抽样测试，在仓库根目录运行：python -m benchmarks.bench_sampler
+
+在大词表上比较每次作答后更新权重和每次抽题的耗时，以及按权重整体重抽（O(n)）的耗时。
+"""
+
+import argparse
+import random
+import time
+
+from sampler import AdaptiveSampler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="加权抽样测试")
+    parser.add_argument("--size", type=int, default=1_000_000, help="词表大小")
+    parser.add_argument("--answers", type=int, default=100_000, help="作答次数")
+    parser.add_argument("--per-quiz", type=int, default=20, help="每次抽题数")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start = time.perf_counter()
+    sampler = AdaptiveSampler(args.size, rng=rng)
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(args.answers):
+        i = rng.randrange(args.size)
+        sampler.observe(i, rng.random() < 0.8)
+    observed = time.perf_counter() - start
+
+    quizzes = max(args.answers // args.per_quiz, 1)
+    start = time.perf_counter()
+    for _ in range(quizzes):
+        sampler.sample(args.per_quiz)
+    sampled = time.perf_counter() - start
+
+    weights = [sampler.weight(i) for i in range(args.size)]
+    start = time.perf_counter()
+    rng.choices(range(args.size), weights, k=args.per_quiz)
+    rescan = time.perf_counter() - start
+
+    print(f"词表 {args.size:,} 条，建树 {built * 1000:.0f} ms")
+    print(f"更新权重: {observed / args.answers * 1e6:.2f} µs/次")
+    print(f"抽题: {sampled / quizzes / args.per_quiz * 1e6:.2f} µs/题")
+    print(f"整体重抽一次（random.choices）: {rescan * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""测验服务压测客户端，在仓库根目录运行：python -m benchmarks.bench_service
+
+默认在本进程内启动一个使用临时记录文件的服务；指定 --port 时连接已有服务。
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from service import QuizService
+from store import open_result_store
+
+
+async def _request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, payload: Dict[str, Any]
+) -> Dict[str, Any]:
+    writer.write(json.dumps(payload).encode("utf-8") + b"\n")
+    await writer.drain()
+    response: Dict[str, Any] = json.loads(await reader.readline())
+    if not response["ok"]:
+        raise RuntimeError(response["error"])
+    return response
+
+
+async def _client(
+    host: str, port: int, sessions: int, questions: int, latencies: List[float]
+) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    for _ in range(sessions):
+        start = time.perf_counter()
+        session = await _request(
+            reader,
+            writer,
+            {"op": "start", "engine": "kana", "num_questions": questions},
+        )
+        for i in range(len(session["questions"])):
+            await _request(
+                reader,
+                writer,
+                {
+                    "op": "answer",
+                    "session": session["session"],
+                    "index": i,
+                    "answer": "a i",
+                },
+            )
+        await _request(reader, writer, {"op": "finish", "session": session["session"]})
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run(args: argparse.Namespace) -> None:
+    service: Optional[QuizService] = None
+    server: Optional[asyncio.AbstractServer] = None
+    host, port = args.host, args.port
+    tmp = tempfile.TemporaryDirectory()
+    if port is None:
+        store = open_result_store(Path(tmp.name) / "results.jsonl")
+        service = QuizService(store)
+        await service.start()
+        server = await asyncio.start_server(service.serve_stream, host, 0)
+        port = server.sockets[0].getsockname()[1]
+
+    latencies: List[float] = []
+    per_client = args.sessions // args.concurrency
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _client(host, port, per_client, args.questions, latencies)
+            for _ in range(args.concurrency)
+        )
+    )
+    elapsed = time.perf_counter() - start
+
+    if server is not None and service is not None:
+        server.close()
+        await server.wait_closed()
+        await service.close()
+    tmp.cleanup()
+
+    latencies.sort()
+    n = len(latencies)
+    print(f"会话数: {n}，并发连接: {args.concurrency}，每会话 {args.questions} 题")
+    print(f"吞吐: {n / elapsed:,.0f} 会话/秒")
+    print(
+        f"会话耗时: p50 {latencies[n // 2] * 1000:.2f} ms，"
+        f"p95 {latencies[int(n * 0.95)] * 1000:.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="测验服务压测")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="连接已有服务，不指定则在本进程内启动")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
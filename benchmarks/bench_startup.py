@@ -0,0 +1,83 @@
+"""入口启动速度测试，在仓库根目录运行：python -m benchmarks.bench_startup
+
+对每个入口分别测量：
+  - 导入耗时：python -X importtime 报告的模块总导入时间
+  - 首次提示耗时：从启动子进程到标准输出出现第一个字节的时间
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (名称, 工作目录, 模块名, 启动参数)
+ENTRIES: List[Tuple[str, Path, str, List[str]]] = [
+    ("main.py", ROOT, "main", ["main.py"]),
+    ("main1.py", ROOT, "main1", ["main1.py"]),
+    ("mistake.py", ROOT, "mistake", ["mistake.py"]),
+    ("moji/words.py", ROOT / "moji", "words", ["words.py"]),
+    ("moji/csv2md.py", ROOT / "moji", "csv2md", ["csv2md.py", "--help"]),
+]
+
+_IMPORT_LINE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S.*)$")
+
+
+def import_time_ms(cwd: Path, module: str) -> float:
+    """模块（含其依赖）的累计导入时间"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    for line in proc.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match and match.group(2).strip() == module:
+            return int(match.group(1)) / 1000
+    return float("nan")
+
+
+def first_prompt_ms(cwd: Path, args: List[str]) -> Optional[float]:
+    """启动入口，直到标准输出出现第一个字节"""
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, *args],
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    assert proc.stdout is not None
+    first = proc.stdout.read(1)
+    elapsed = time.perf_counter() - start
+    proc.kill()
+    proc.wait()
+    return elapsed * 1000 if first else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="入口启动速度测试")
+    parser.add_argument("--repeat", type=int, default=5, help="每个入口重复次数")
+    parser.add_argument("--target", type=float, default=100.0, help="目标（毫秒）")
+    args = parser.parse_args()
+
+    print(f"{'入口':<16} {'导入(ms)':>10} {'首次提示(ms)':>14}")
+    for name, cwd, module, argv in ENTRIES:
+        imports = min(import_time_ms(cwd, module) for _ in range(args.repeat))
+        prompts = [first_prompt_ms(cwd, argv) for _ in range(args.repeat)]
+        timings = [t for t in prompts if t is not None]
+        prompt = min(timings) if timings else float("nan")
+        flag = "" if prompt <= args.target else "  (超出目标)"
+        print(f"{name:<16} {imports:>10.1f} {prompt:>14.1f}{flag}")
+
+
+if __name__ == "__main__":
+    main()
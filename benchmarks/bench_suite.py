@@ -0,0 +1,389 @@
+"""出题、判题、存储、转换的规模测试，在仓库根目录运行：python -m benchmarks.bench_suite
+
+每个（操作, 数据规模）在独立子进程中运行，测量：
+  - wall_ms：多次运行中最快一次的耗时
+  - peak_rss_mb：子进程的峰值常驻内存（包括准备数据）
+  - alloc_peak_kb / alloc_blocks：tracemalloc 统计的一次运行中的分配峰值和新分配块数
+
+合成数据按规模和种子生成，缓存在 benchmarks/.cache/ 下，重复运行时复用。
+结果写成 JSON；指定 --baseline 时与基线比较，耗时或内存超出阈值即报告回退并以 1 退出。
+
+benchmarks/baseline.json 是把本脚本放进引入本测试时的代码（提交 5ef41f8，之后各项优化
+之前）中、用默认参数生成的基线，"commit" 字段记录被测的提交（脚本被替换，所以带 -dirty）。
+那时 MistakeReviewer 还没有 limit 参数，基线中没有 first_50_mistakes 一项。
+耗时与机器有关，换机器后先在改动前的代码上重新生成基线，再在改动后的代码上比较：
+
+    python -m benchmarks.bench_suite --output benchmarks/baseline.json
+    python -m benchmarks.bench_suite --baseline benchmarks/baseline.json --threshold 0.2
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+DATA_DIR = Path(__file__).resolve().parent / ".cache"
+
+# 答题记录规模的操作使用 --results-sizes，词汇规模的操作使用 --vocab-sizes
+RESULT_CASES = (
+    "generate_quiz_items",
+    "save_results",
+    "load_mistakes",
+    "first_50_mistakes",
+    "load_mistakes_legacy_json",
+)
+VOCAB_CASES = ("word_gen_question", "csv_to_markdown")
+
+# 比较基线时检查的指标，以及低于多少的绝对差值视为噪声
+METRICS = {"wall_ms": 1.0, "peak_rss_mb": 1.0, "alloc_peak_kb": 16.0}
+
+
+# ---- 合成数据 ----
+
+
+def make_results(path: Path, n: int, seed: int = 0) -> Path:
+    """生成 n 条答题记录（JSON 行），错题约占两成，约一半错题已复习"""
+    if path.exists():
+        return path
+    from kana_table import MODE_COLUMNS, format_question, get_kana_table
+
+    table = get_kana_table()
+    rng = random.Random(seed)
+    modes = list(MODE_COLUMNS)
+    size = len(table.romaji)
+    reviewed = []
+    tmp_path = path.with_name(path.name + ".tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            mode = modes[i % len(modes)]
+            source, target = MODE_COLUMNS[mode]
+            idx = rng.sample(range(size), 2)
+            chars = [table.column(source)[j] for j in idx]
+            answers = [table.column(target)[j] for j in idx]
+            char_results = [rng.random() > 0.1 for _ in idx]
+            is_correct = all(char_results)
+            question = format_question(mode, chars)
+            record = {
+                "question": question,
+                "user_answer": " ".join(answers) if is_correct else "x x",
+                "correct_answer": " ".join(answers),
+                "is_correct": is_correct,
+                "mode": mode,
+                "char_type": "all",
+                "timestamp": str(1.7e9 + i),
+                "is_review": False,
+                "chars": chars,
+                "char_results": char_results,
+            }
+            if not is_correct and rng.random() < 0.5:
+                reviewed.append(question)
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+    reviewed_path = path.with_suffix(".reviewed.json")
+    with open(reviewed_path, "w", encoding="utf-8") as f:
+        json.dump(sorted(set(reviewed)), f, ensure_ascii=False)
+    return path
+
+
+def make_vocab(path: Path, n: int, seed: int = 0) -> Path:
+    """生成 n 行的单元词汇表 CSV（japan, romaji, chinese）"""
+    if path.exists():
+        return path
+    rng = random.Random(seed)
+    tmp_path = path.with_name(path.name + ".tmp")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["japan", "romaji", "chinese"])
+        for _ in range(n):
+            k = rng.randint(1, 6)
+            writer.writerow(
+                [
+                    "".join(chr(rng.randint(0x3041, 0x3093)) for _ in range(k)),
+                    "".join(rng.choice("aiueokstnhmyrw") for _ in range(2 * k)),
+                    "".join(chr(rng.randint(0x4E00, 0x9FA5)) for _ in range(k)),
+                ]
+            )
+    os.replace(tmp_path, path)
+    return path
+
+
+# ---- 各项操作：准备好数据后返回被测函数 ----
+
+
+def _history(n: int, work: Path) -> Tuple[Path, Path]:
+    """复制一份缓存的历史记录到工作目录（被测操作会追加写入）"""
+    source = make_results(DATA_DIR / f"results-{n}.jsonl", n)
+    results = work / "results.jsonl"
+    reviewed = work / "reviewed.json"
+    results.write_bytes(source.read_bytes())
+    reviewed.write_bytes(source.with_suffix(".reviewed.json").read_bytes())
+    return results, reviewed
+
+
+def case_generate_quiz_items(n: int, work: Path) -> Callable[[], Any]:
+    """共生成 n 道题：每次测验 20 题（每题 2 个字符），一次测验的字符不重复"""
+    from main import HiraganaQuiz
+
+    quiz = HiraganaQuiz(work / "results.jsonl")
+
+    def run() -> None:
+        for _ in range(max(1, n // 20)):
+            quiz.generate_quiz_items(20, "hira_to_roma", 2, "all")
+
+    return run
+
+
+def case_save_results(n: int, work: Path) -> Callable[[], Any]:
+    """在 n 条历史记录上启动测验、作答 20 题并保存（包括首次重建逐字统计）"""
+    from main import HiraganaQuiz
+
+    results, _ = _history(n, work)
+
+    def run() -> None:
+        results.with_suffix(".stats").unlink(missing_ok=True)
+        quiz = HiraganaQuiz(results)
+        for item in quiz.generate_quiz_items(20, "hira_to_roma", 2, "all"):
+            quiz.results.append(
+                quiz.make_record(item, "a i", False, "hira_to_roma", "all")
+            )
+        quiz.save_results()
+        quiz.store.close()
+
+    return run
+
+
+def case_load_mistakes(n: int, work: Path) -> Callable[[], Any]:
+    """从 n 条历史记录中读取未复习的错题"""
+    from mistake import MistakeReviewer
+
+    results, reviewed = _history(n, work)
+    return lambda: MistakeReviewer(str(results), str(reviewed)).load_mistakes()
+
+
+def case_first_50_mistakes(n: int, work: Path) -> Callable[[], Any]:
+    """从 n 条历史记录中流式读取前 50 道未复习的错题"""
+    from mistake import MistakeReviewer
+
+    results, reviewed = _history(n, work)
+    return lambda: MistakeReviewer(
+        str(results), str(reviewed), limit=50
+    ).load_mistakes()
+
+
+def case_load_mistakes_legacy_json(n: int, work: Path) -> Callable[[], Any]:
+    """从 n 条记录的旧版 JSON 数组文件中读取未复习的错题"""
+    from mistake import MistakeReviewer
+
+    results, reviewed = _history(n, work)
+    legacy = work / "results.json"
+    with open(results, "r", encoding="utf-8") as src:
+        with open(legacy, "w", encoding="utf-8") as dst:
+            dst.write("[\n")
+            for i, line in enumerate(src):
+                dst.write((",\n" if i else "") + line.rstrip("\n"))
+            dst.write("\n]\n")
+    return lambda: MistakeReviewer(str(legacy), str(reviewed)).load_mistakes()
+
+
+def case_word_gen_question(n: int, work: Path) -> Callable[[], Any]:
+    """从 n 行的单元出全部题目（列式缓存已建好）"""
+    sys.path.insert(0, str(ROOT / "moji"))
+    from words import WordQuiz  # type: ignore[import-not-found]
+
+    words_dir = work / "words"
+    words_dir.mkdir()
+    source = make_vocab(DATA_DIR / f"vocab-{n}.csv", n)
+    (words_dir / "ch1.csv").write_bytes(source.read_bytes())
+    quiz = WordQuiz(words_dir)
+    out_dir = work / "out"
+    quiz.gen_question(out_dir, 0, [1], -1)  # 预先编译列式缓存
+    return lambda: quiz.gen_question(out_dir, 0, [1], -1)
+
+
+def case_csv_to_markdown(n: int, work: Path) -> Callable[[], Any]:
+    """把 n 行的单元 CSV 转换为 Markdown 表格"""
+    sys.path.insert(0, str(ROOT / "moji"))
+    from csv2md import csv_to_markdown  # type: ignore[import-not-found]
+
+    source = make_vocab(DATA_DIR / f"vocab-{n}.csv", n)
+    output = work / "out.md"
+    return lambda: csv_to_markdown(str(source), str(output))
+
+
+CASES: Dict[str, Callable[[int, Path], Callable[[], Any]]] = {
+    "generate_quiz_items": case_generate_quiz_items,
+    "save_results": case_save_results,
+    "load_mistakes": case_load_mistakes,
+    "first_50_mistakes": case_first_50_mistakes,
+    "load_mistakes_legacy_json": case_load_mistakes_legacy_json,
+    "word_gen_question": case_word_gen_question,
+    "csv_to_markdown": case_csv_to_markdown,
+}
+
+
+def run_case(name: str, n: int, repeat: int) -> Dict[str, Any]:
+    """在当前进程中运行一项测试（由子进程调用）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        # 准备数据前就切换目录：被测代码写到当前目录的文件（旧版记录迁移等）
+        # 都留在临时目录，不会动到仓库根目录下的真实记录
+        os.chdir(work)
+        stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")  # 屏蔽被测代码的提示信息
+        try:
+            fn = CASES[name](n, work)
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - start)
+
+            tracemalloc.start()
+            before = len(tracemalloc.take_snapshot().traces)
+            fn()
+            blocks = len(tracemalloc.take_snapshot().traces) - before
+            _, alloc_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+            os.chdir(ROOT)
+
+    # Linux 上 ru_maxrss 的单位是 KB，macOS 上是字节
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = maxrss / (1 << 20) if sys.platform == "darwin" else maxrss / 1024
+    return {
+        "case": name,
+        "size": n,
+        "wall_ms": best * 1000,
+        "peak_rss_mb": rss_mb,
+        "alloc_peak_kb": alloc_peak / 1024,
+        "alloc_blocks": blocks,
+    }
+
+
+def spawn_case(name: str, n: int, repeat: int) -> Dict[str, Any]:
+    """在独立子进程中运行一项测试，使峰值内存互不影响"""
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_suite", "--run-case", name, str(n)]
+        + ["--repeat", str(repeat)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name}[{n}] 运行失败:\n{proc.stderr}")
+    result: Dict[str, Any] = json.loads(proc.stdout.splitlines()[-1])
+    return result
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """与基线比较，返回超出阈值的回退项"""
+    previous = {(r["case"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = previous.get((r["case"], r["size"]))
+        if old is None:
+            continue
+        for metric, noise in METRICS.items():
+            grown = r[metric] - old[metric]
+            if grown > noise and grown > old[metric] * threshold:
+                regressions.append(
+                    f"{r['case']}[{r['size']}] {metric}: "
+                    f"{old[metric]:.1f} -> {r[metric]:.1f}"
+                )
+    return regressions
+
+
+def _commit() -> str:
+    """被测代码所在的 git 提交（工作区有改动时加 -dirty），不在 git 仓库中时为空"""
+    try:
+        proc = subprocess.run(
+            ["git", "describe", "--always", "--dirty", "--exclude=*"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return ""
+    return proc.stdout.strip() if proc.returncode == 0 else ""
+
+
+def _sizes(text: str) -> List[int]:
+    """解析规模列表，支持 1e5 这样的写法"""
+    return [int(float(s)) for s in text.split(",") if s]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="出题、判题、存储、转换的规模测试")
+    parser.add_argument("--cases", default=",".join(CASES), help="要运行的操作")
+    parser.add_argument(
+        "--results-sizes", default="1e3,1e4,1e5", help="答题记录规模（最大 1e7）"
+    )
+    parser.add_argument(
+        "--vocab-sizes", default="1e2,1e3,1e4,1e5", help="词汇表行数（最大 1e6）"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="结果 JSON 文件")
+    parser.add_argument("--baseline", help="基线 JSON 文件，用于检查回退")
+    parser.add_argument("--threshold", type=float, default=0.2, help="回退阈值")
+    parser.add_argument(
+        "--run-case", nargs=2, metavar=("CASE", "SIZE"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.run_case:
+        name, size = args.run_case
+        print(json.dumps(run_case(name, int(size), args.repeat)))
+        return
+
+    results = []
+    print(f"{'操作':<20} {'规模':>9} {'耗时(ms)':>10} {'RSS(MB)':>9} {'分配(KB)':>10}")
+    for name in args.cases.split(","):
+        sizes = args.results_sizes if name in RESULT_CASES else args.vocab_sizes
+        for n in _sizes(sizes):
+            r = spawn_case(name, n, args.repeat)
+            results.append(r)
+            print(
+                f"{name:<20} {n:>9} {r['wall_ms']:>10.1f} "
+                f"{r['peak_rss_mb']:>9.1f} {r['alloc_peak_kb']:>10.0f}"
+            )
+
+    report = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"回退: {line}")
+        if regressions:
+            raise SystemExit(1)
+        print("与基线相比没有回退")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""词汇缓存加载速度测试，在仓库根目录运行：python -m benchmarks.bench_vocab_cache
+
+生成不同数量的合成单元，比较 pandas（python 引擎）读 CSV 与读取列式缓存的耗时。
+"""
+
+import argparse
+import csv
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from moji.vocab_cache import load_unit
+
+try:
+    import pandas as pd
+except ImportError:  # 没有 pandas 时只测缓存
+    pd = None
+
+
+def make_units(root: Path, count: int, rows: int) -> List[Path]:
+    rng = random.Random(count)
+    paths = []
+    for i in range(count):
+        path = root / f"ch{i}.csv"
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["japan", "romaji", "chinese"])
+            for _ in range(rows):
+                n = rng.randint(1, 6)
+                writer.writerow(
+                    [
+                        "".join(chr(rng.randint(0x3041, 0x3093)) for _ in range(n)),
+                        "".join(rng.choice("aiueokstnhmyrw") for _ in range(2 * n)),
+                        "".join(chr(rng.randint(0x4E00, 0x9FA5)) for _ in range(n)),
+                    ]
+                )
+        paths.append(path)
+    return paths
+
+
+def timed(fn: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="词汇缓存加载速度测试")
+    parser.add_argument("--rows", type=int, default=1000, help="每个单元的词条数")
+    parser.add_argument("--units", default="1,4,16,64", help="单元数量列表")
+    args = parser.parse_args()
+
+    print(f"{'单元数':>6} {'pandas(ms)':>12} {'缓存冷(ms)':>12} {'缓存热(ms)':>12}")
+    for count in map(int, args.units.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = make_units(Path(tmp), count, args.rows)
+
+            def load_cached() -> None:
+                for path in paths:
+                    with load_unit(path) as unit:
+                        for name in unit.columns:
+                            unit.column(name)
+
+            pandas_ms = float("nan")
+            if pd is not None:
+                pandas_ms = 1000 * timed(
+                    lambda: pd.concat(
+                        [
+                            pd.read_csv(p, encoding="utf-8", engine="python")
+                            for p in paths
+                        ],
+                        ignore_index=True,
+                    )
+                )
+            cold_ms = 1000 * timed(load_cached)
+            warm_ms = 1000 * timed(load_cached)
+            print(f"{count:>6} {pandas_ms:>12.1f} {cold_ms:>12.1f} {warm_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
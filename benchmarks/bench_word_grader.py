@@ -0,0 +1,84 @@
+"""单词作答卷批改测试，在仓库根目录运行：python -m benchmarks.bench_word_grader
+
+用现有单元生成若干份答案，每份答案下放若干张作答卷（约七成写对，
+其余是错字、假名写法或空白），分别用 1 个和多个进程批改，比较吞吐量。
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "moji"))
+from word_grader import (  # type: ignore[import-not-found]  # noqa: E402
+    find_sheets,
+    grade_all,
+)
+from words import WordQuiz  # type: ignore[import-not-found]  # noqa: E402
+
+
+def make_sheets(out_dir: Path, keys: int, sheets: int, questions: int) -> None:
+    rows: List[List[str]] = []
+    for path in sorted((ROOT / "moji" / "words").glob("ch*.csv")):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows.extend(list(csv.reader(f))[1:])
+    rng = random.Random(0)
+    for k in range(keys):
+        directory = out_dir / f"key{k:03d}"
+        directory.mkdir()
+        picked = rng.sample(rows, min(questions, len(rows)))
+        with open(directory / "answer.txt", "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["chinese", "japan"])
+            writer.writerows([row[2], row[0]] for row in picked)
+        for s in range(sheets):
+            with open(directory / f"sheet{s:04d}.csv", "w", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["chinese", "answer"])
+                for japan, romaji, chinese in picked:
+                    r = rng.random()
+                    answer = japan if r < 0.7 else romaji if r < 0.8 else ""
+                    if 0.8 <= r < 0.9:
+                        answer = japan[:-1] + "x"
+                    writer.writerow([chinese, answer])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="单词作答卷批改测试")
+    parser.add_argument("--keys", type=int, default=20, help="答案份数")
+    parser.add_argument("--sheets", type=int, default=100, help="每份答案的作答卷数")
+    parser.add_argument("--questions", type=int, default=30, help="每张卷子题数")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        submissions = Path(tmp) / "submissions"
+        submissions.mkdir()
+        make_sheets(submissions, args.keys, args.sheets, args.questions)
+        pairs = find_sheets(submissions)
+        quiz = WordQuiz(ROOT / "moji" / "words", results_file=Path(tmp) / "r.jsonl")
+
+        print(
+            f"{len(pairs)} 张作答卷，每张 {args.questions} 题，CPU {os.cpu_count()} 核"
+        )
+        for jobs in sorted({1, args.jobs}):
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                _, total, correct = grade_all(pairs, quiz, jobs=jobs)
+            elapsed = time.perf_counter() - start
+            print(
+                f"{jobs} 个进程：{elapsed:.2f} s，{len(pairs) / elapsed:.0f} 张/s"
+                f"（正确率 {correct / total * 100:.1f}%）"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""单词索引查找测试，在仓库根目录运行：python -m benchmarks.bench_word_index
+
+把现有单元的单词组合成一个大词表（默认 50 个单元，每个单元 2000 个词），
+测量首次建索引、再次读取、修改一个单元后的增量重建和几类查询的耗时。
+"""
+
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "moji"))
+from word_index import WordIndex  # type: ignore[import-not-found]  # noqa: E402
+
+
+def make_units(out_dir: Path, units: int, words: int) -> None:
+    """用现有单词随机拼接出新词，写成 chNN.csv"""
+    rows: List[List[str]] = []
+    for path in sorted((ROOT / "moji" / "words").glob("ch*.csv")):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows.extend(list(csv.reader(f))[1:])
+    rng = random.Random(0)
+    for unit in range(1, units + 1):
+        with open(out_dir / f"ch{unit}.csv", "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["japan", "romaji", "chinese"])
+            for _ in range(words):
+                a, b = rng.sample(rows, 2)
+                writer.writerow([a[0] + b[0], a[1] + b[1], a[2] + b[2]])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="单词索引查找测试")
+    parser.add_argument("--units", type=int, default=50)
+    parser.add_argument("--words", type=int, default=2000, help="每个单元的词数")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        words_dir = Path(tmp) / "words"
+        words_dir.mkdir()
+        make_units(words_dir, args.units, args.words)
+
+        start = time.perf_counter()
+        index = WordIndex(words_dir)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        index = WordIndex(words_dir)
+        loaded = time.perf_counter() - start
+        os.utime(words_dir / "ch1.csv")
+        start = time.perf_counter()
+        rebuilt = index.refresh()
+        refreshed = time.perf_counter() - start
+
+        print(f"{len(index):,} 个单词，{args.units} 个单元")
+        print(f"首次建索引 {built * 1000:.0f} ms，再次读取 {loaded * 1000:.0f} ms，")
+        print(f"修改 {len(rebuilt)} 个单元后增量重建 {refreshed * 1000:.0f} ms")
+        print(f"{'查询':<10} {'结果数':>8} {'耗时(ms)':>10}")
+        for query, limit in (
+            ("山", None),
+            ("もみじ", None),
+            ("momiji", None),
+            ("城市", None),
+            ("nihonryouri", None),
+            ("山", 20),
+        ):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                matches = index.search(query, fuzzy=False, limit=limit)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            label = query if limit is None else f"{query}({limit})"
+            print(f"{label:<10} {len(matches):>8} {elapsed * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import secrets
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from batch import derive_set_seeds, generate_quiz_batches
+from kana_table import MODE_COLUMNS
+from moji.utils import expand_range_list
+from moji.vocab_cache import load_unit
+
+# 单词练习模式 -> (题目列, 答案列)
+WORD_MODES = {"ja_to_zh": ("japan", "chinese"), "zh_to_ja": ("chinese", "japan")}
+WORDS_DIR = Path("moji/words")
+INDEX_NAME = "index.json"
+
+# 每套题目渲染后的 (题目 CSV, 答案 CSV)
+Pack = Tuple[str, str]
+
+
+class PackSpec:
+    """一批练习卷的出题参数（五十音或单词），可以写进索引并从索引还原"""
+
+    def __init__(
+        self,
+        kind: str,
+        mode: str,
+        num_questions: int,
+        chars_per_question: int = 1,
+        char_type: str = "all",
+        units: Sequence[int] = (),
+        words_dir: Union[str, Path] = WORDS_DIR,
+    ) -> None:
+        if kind == "kana":
+            if mode not in MODE_COLUMNS:
+                raise ValueError(f"Unknown mode: {mode}")
+        elif kind == "words":
+            if mode not in WORD_MODES:
+                raise ValueError(f"Unknown mode: {mode}")
+            if not units:
+                raise ValueError("单词练习卷至少需要一个单元")
+        else:
+            raise ValueError(f"Unknown kind: {kind}")
+        self.kind = kind
+        self.mode = mode
+        self.num_questions = num_questions
+        self.chars_per_question = chars_per_question
+        self.char_type = char_type
+        self.units = list(units)
+        self.words_dir = str(words_dir)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PackSpec":
+        return cls(**data)
+
+    def unit_paths(self) -> List[Path]:
+        return [Path(self.words_dir) / f"ch{num}.csv" for num in self.units]
+
+
+def _csv_text(header: Sequence[str], rows: Iterator[Sequence[str]]) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buf.getvalue()
+
+
+def _render(questions: List[Tuple[str, str]]) -> Pack:
+    return (
+        _csv_text(["question"], ([q] for q, _ in questions)),
+        _csv_text(["question", "answer"], iter(questions)),
+    )
+
+
+def _render_kana(spec: PackSpec, seeds: Sequence[int]) -> List[Pack]:
+    """同一批种子的五十音练习卷一次向量化生成"""
+    batches = generate_quiz_batches(
+        len(seeds),
+        spec.num_questions,
+        spec.chars_per_question,
+        spec.mode,
+        spec.char_type,
+        set_seeds=seeds,
+    )
+    return [
+        _render(
+            [
+                (batches.question(s, q), batches.answer(s, q))
+                for q in range(batches.num_questions)
+            ]
+        )
+        for s in range(len(batches))
+    ]
+
+
+# 每个工作进程缓存读过的单元：(单元路径...) -> (题目列, 答案列)
+_vocab_cache: Dict[Tuple[str, ...], Tuple[List[str], List[str]]] = {}
+
+
+def _load_vocab(spec: PackSpec) -> Tuple[List[str], List[str]]:
+    key = (spec.mode, *map(str, spec.unit_paths()))
+    if key not in _vocab_cache:
+        source_col, target_col = WORD_MODES[spec.mode]
+        sources: List[str] = []
+        targets: List[str] = []
+        for path in spec.unit_paths():
+            with load_unit(path) as unit:
+                sources.extend(unit.column(source_col))
+                targets.extend(unit.column(target_col))
+        _vocab_cache[key] = (sources, targets)
+    return _vocab_cache[key]
+
+
+def _render_words(spec: PackSpec, seeds: Sequence[int]) -> List[Pack]:
+    """每套单词练习卷用自己的种子从所选单元中不重复抽词"""
+    sources, targets = _load_vocab(spec)
+    k = min(spec.num_questions, len(sources))
+    packs = []
+    for seed in seeds:
+        rows = random.Random(seed).sample(range(len(sources)), k)
+        packs.append(_render([(sources[i], targets[i]) for i in rows]))
+    return packs
+
+
+def render_packs(spec: PackSpec, seeds: Sequence[int]) -> List[Pack]:
+    """按种子生成练习卷，同一个种子总是得到同一套题"""
+    if spec.kind == "kana":
+        return _render_kana(spec, seeds)
+    return _render_words(spec, seeds)
+
+
+def pack_name(pack_no: int) -> str:
+    return f"pack_{pack_no:05d}"
+
+
+def _write_pack(out_dir: Path, pack_no: int, pack: Pack) -> None:
+    directory = out_dir / pack_name(pack_no)
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "questions.txt").write_text(pack[0], encoding="utf-8")
+    (directory / "answers.txt").write_text(pack[1], encoding="utf-8")
+
+
+def _export_chunk(
+    spec: PackSpec, first: int, seeds: List[int], out_dir: Optional[str]
+) -> List[Pack]:
+    """工作进程：生成编号从 first 开始的一段练习卷
+
+    输出到目录时直接在进程内写文件并返回空列表，否则把内容交回主进程写入压缩包。
+    """
+    packs = render_packs(spec, seeds)
+    if out_dir is None:
+        return packs
+    for i, pack in enumerate(packs):
+        _write_pack(Path(out_dir), first + i, pack)
+    return []
+
+
+def export_packs(
+    spec: PackSpec,
+    n_packs: int,
+    out: Union[str, Path],
+    seed: Optional[int] = None,
+    archive: bool = False,
+    jobs: Optional[int] = None,
+    chunk_size: int = 256,
+) -> Dict[str, Any]:
+    """生成 n_packs 套练习卷，返回索引
+
+    第 i 套（从 1 开始）的种子由总种子派生，只取决于总种子和 i，
+    所以任意一套都可以单独重新生成。archive 为 False 时每套写到
+    out/pack_NNNNN/ 下，索引为 out/index.json；为 True 时 out 是一个 zip 文件，
+    练习卷按编号顺序流式写入，最后写入 index.json。
+    """
+    if seed is None:
+        seed = secrets.randbits(64)
+    seeds: List[int] = derive_set_seeds(seed, n_packs).tolist()
+    if spec.kind == "words":
+        for path in spec.unit_paths():
+            if not path.exists():
+                raise FileNotFoundError(f"Missing unit file: {path}")
+            load_unit(path).close()  # 先在主进程里编译好缓存，工作进程只读
+
+    out = Path(out)
+    out_dir = None if archive else str(out)
+    if out_dir is not None:
+        out.mkdir(parents=True, exist_ok=True)
+    chunks = [
+        (first, seeds[first - 1 : first - 1 + chunk_size])
+        for first in range(1, n_packs + 1, chunk_size)
+    ]
+
+    index = {
+        "spec": spec.to_dict(),
+        "seed": seed,
+        "packs": {pack_name(i + 1): s for i, s in enumerate(seeds)},
+    }
+    zf: Optional[zipfile.ZipFile] = None
+    tmp_path = out.with_name(out.name + ".tmp")
+    if archive:
+        zf = zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED)
+    try:
+        results: Iterator[List[Pack]]
+        if len(chunks) <= 1 or jobs == 1:
+            results = (_export_chunk(spec, f, s, out_dir) for f, s in chunks)
+            _stream(results, chunks, zf)
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = pool.map(
+                    _export_chunk,
+                    [spec] * len(chunks),
+                    [f for f, _ in chunks],
+                    [s for _, s in chunks],
+                    [out_dir] * len(chunks),
+                )
+                _stream(results, chunks, zf)
+        text = json.dumps(index, ensure_ascii=False, indent=2)
+        if zf is not None:
+            zf.writestr(INDEX_NAME, text)
+            zf.close()
+            os.replace(tmp_path, out)
+        else:
+            (out / INDEX_NAME).write_text(text, encoding="utf-8")
+    finally:
+        if zf is not None and tmp_path.exists():
+            zf.close()
+            os.remove(tmp_path)
+    return index
+
+
+def _stream(
+    results: Iterator[List[Pack]],
+    chunks: List[Tuple[int, List[int]]],
+    zf: Optional[zipfile.ZipFile],
+) -> None:
+    """按顺序接收各段结果，写入压缩包"""
+    for (first, _), packs in zip(chunks, results):
+        if zf is None:
+            continue
+        for i, (questions, answers) in enumerate(packs):
+            name = pack_name(first + i)
+            zf.writestr(f"{name}/questions.txt", questions)
+            zf.writestr(f"{name}/answers.txt", answers)
+
+
+def load_index(path: Union[str, Path]) -> Dict[str, Any]:
+    """读取目录或压缩包中的索引"""
+    path = Path(path)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            data: Dict[str, Any] = json.loads(zf.read(INDEX_NAME))
+            return data
+    if path.is_dir():
+        path = path / INDEX_NAME
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data
+
+
+def regenerate_pack(index: Dict[str, Any], pack_no: int) -> Pack:
+    """只根据索引中的参数和这一套的种子重新生成第 pack_no 套"""
+    spec = PackSpec.from_dict(index["spec"])
+    name = pack_name(pack_no)
+    if name not in index["packs"]:
+        raise KeyError(f"索引中没有第 {pack_no} 套")
+    return render_packs(spec, [index["packs"][name]])[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量导出可复现的练习卷")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-n", "--packs", type=int, default=100, help="练习卷套数")
+    common.add_argument("-q", "--questions", type=int, default=10, help="每套题数")
+    common.add_argument("-s", "--seed", type=int, help="总种子，不指定时随机生成")
+    common.add_argument("-o", "--out", default="packs", help="输出目录或 zip 文件")
+    common.add_argument("-z", "--archive", action="store_true", help="输出一个 zip")
+    common.add_argument("-j", "--jobs", type=int, help="并行进程数（默认CPU核数）")
+
+    kana = sub.add_parser("kana", parents=[common], help="五十音练习卷")
+    kana.add_argument("--mode", choices=list(MODE_COLUMNS), default="hira_to_roma")
+    kana.add_argument("--char-type", choices=["basic", "youon", "all"], default="all")
+    kana.add_argument("--chars", type=int, default=2, help="每题字符数")
+
+    words = sub.add_parser("words", parents=[common], help="单词练习卷")
+    words.add_argument("--mode", choices=list(WORD_MODES), default="ja_to_zh")
+    words.add_argument("--units", required=True, help="单元，如 10-12,14")
+    words.add_argument("--words-dir", default=str(WORDS_DIR))
+
+    regen = sub.add_parser("regen", help="按索引单独重新生成某一套")
+    regen.add_argument("index", help="导出目录、zip 文件或 index.json")
+    regen.add_argument("pack", type=int, help="练习卷编号")
+    regen.add_argument("-o", "--out", default="packs", help="输出目录")
+
+    args = parser.parse_args()
+    if args.command == "regen":
+        pack_no = args.pack
+        _write_pack(
+            Path(args.out), pack_no, regenerate_pack(load_index(args.index), pack_no)
+        )
+        print(f"已重新生成 {Path(args.out) / pack_name(pack_no)}")
+    else:
+        if args.command == "kana":
+            spec = PackSpec(
+                "kana", args.mode, args.questions, args.chars, args.char_type
+            )
+        else:
+            spec = PackSpec(
+                "words",
+                args.mode,
+                args.questions,
+                units=expand_range_list(args.units),
+                words_dir=args.words_dir,
+            )
+        index = export_packs(
+            spec, args.packs, args.out, args.seed, args.archive, args.jobs
+        )
+        print(f"已导出 {args.packs} 套练习卷到 {args.out}（种子 {index['seed']}）")
@@ -0,0 +1,105 @@
+from functools import lru_cache
+from operator import eq
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from kana_table import KanaTable, get_kana_table
+from metrics import incr, timed
+
+# 五十音表使用平文式（Hepburn）罗马音，这里列出其他常见写法（训令式、日本式等）
+ROMAJI_VARIANTS: Dict[str, Tuple[str, ...]] = {
+    "shi": ("si",),
+    "chi": ("ti",),
+    "tsu": ("tu",),
+    "fu": ("hu",),
+    "ji": ("zi", "di"),
+    "zu": ("du",),
+    "wo": ("o",),
+    "n": ("nn", "n'"),
+    "sha": ("sya",),
+    "shu": ("syu",),
+    "sho": ("syo",),
+    "cha": ("tya", "cya"),
+    "chu": ("tyu", "cyu"),
+    "cho": ("tyo", "cyo"),
+    "ja": ("zya", "jya", "dya"),
+    "ju": ("zyu", "jyu", "dyu"),
+    "jo": ("zyo", "jyo", "dyo"),
+}
+
+# 答案中可以用来分隔字符的符号，统一替换成空格
+_SEPARATORS = str.maketrans({c: " " for c in ",，、;；/"})
+
+
+class GradeResult(NamedTuple):
+    """判题结果：整题是否正确，以及每个位置是否正确"""
+
+    is_correct: bool
+    positions: List[bool]
+
+
+class Grader:
+    """判题引擎
+
+    事先为每个标准答案编译好可接受写法的集合，答案只分词一次，
+    每个位置的判断只需一次字典查找。
+    """
+
+    def __init__(self, table: Optional[KanaTable] = None) -> None:
+        table = table if table is not None else get_kana_table()
+        accepted: Dict[str, FrozenSet[str]] = {}
+        for romaji in set(table.romaji):
+            accepted[romaji] = frozenset((romaji, *ROMAJI_VARIANTS.get(romaji, ())))
+        self.accepted = accepted
+
+    @staticmethod
+    def tokenize(answer: str) -> List[str]:
+        """把答案切分成小写的字符列表"""
+        return answer.translate(_SEPARATORS).lower().split()
+
+    def grade(self, expected: Sequence[str], answer: str) -> GradeResult:
+        """判一道题，expected 为每个位置的标准答案"""
+        return self.grade_batch([(expected, answer)])[0]
+
+    @timed("grade")
+    def grade_batch(
+        self, sheets: Iterable[Tuple[Sequence[str], str]]
+    ) -> List[GradeResult]:
+        """一次判多份答卷，每份为 (标准答案列表, 作答字符串)"""
+        accepted_get = self.accepted.get
+        separators = _SEPARATORS
+        empty: FrozenSet[str] = frozenset()
+        results = []
+        for expected, answer in sheets:
+            tokens = answer.translate(separators).lower().split()
+            # 先逐位直接比较（C 实现），只有不相等的位置才查异体写法
+            positions = list(map(eq, tokens, expected))
+            if not all(positions):
+                for i, ok in enumerate(positions):
+                    if not ok and tokens[i] in accepted_get(expected[i], empty):
+                        positions[i] = True
+            n = len(expected)
+            if len(positions) < n:
+                positions.extend([False] * (n - len(positions)))
+            results.append(GradeResult(len(tokens) == n and all(positions), positions))
+        incr("graded_sheets", len(results))
+        return results
+
+
+@lru_cache(maxsize=None)
+def get_grader() -> Grader:
+    """每个进程共用一个判题引擎"""
+    return Grader()
+
+
+def expected_tokens(answer: str) -> List[str]:
+    """把空格分隔的标准答案拆成每个位置的答案"""
+    return answer.lower().split()
@@ -0,0 +1,271 @@
+import json
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, Optional, Union
+
+from utils import FileLock
+
+
+class StaleCursorError(ValueError):
+    """增量读取的游标已失效（记录文件被压缩替换或截断），需要从头读取"""
+
+
+class ResultJournal:
+    """追加写入的答题记录日志（每行一条 JSON 记录）
+
+    多个进程可以同时追加同一个日志：每次写入都持有跨进程文件锁，
+    压缩时也在文件锁内替换文件，其他进程发现文件被替换后重新打开。
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        fsync_every: int = 64,
+        compact_every: int = 10000,
+    ) -> None:
+        self.path = Path(path)
+        self.fsync_every = fsync_every  # 每累计多少条记录 fsync 一次
+        self.compact_every = compact_every  # 每追加多少条记录触发一次后台压缩
+
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(self.path)
+        self._fh: Optional[IO[str]] = None
+        self._unsynced = 0
+        self._appended = 0
+        self._compactor: Optional[threading.Thread] = None
+        self.cursor: Optional[str] = None  # iter_new_records 读到的位置
+        # 每次压缩开始前调用（不持有锁），用于先处理上次中断的压缩留下的文件
+        self.before_compact: Optional[Callable[[], None]] = None
+
+    def _open(self) -> IO[str]:
+        """打开日志文件（需持有文件锁）；文件被其他进程压缩替换后重新打开"""
+        if self._fh is not None and _replaced(self._fh, self.path):
+            self._fh.close()
+            self._fh = None
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, "a", encoding="utf-8")
+            if self._fh.tell() > 0 and not _ends_with_newline(self.path):
+                self._fh.write("\n")  # 上次写入被中断，避免与新记录粘在同一行
+        return self._fh
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        """追加记录，只写新增部分；返回写入条数"""
+        lines = [
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for record in records
+        ]
+        if not lines:
+            return 0
+
+        with self._lock, self._file_lock:
+            fh = self._open()
+            fh.write("".join(lines))
+            fh.flush()
+            self._unsynced += len(lines)
+            self._appended += len(lines)
+            if self._unsynced >= self.fsync_every:
+                self._fsync()
+
+        if self._appended >= self.compact_every:
+            self.compact_in_background()
+        return len(lines)
+
+    def _fsync(self) -> None:
+        if self._fh is not None and self._unsynced:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+        self._unsynced = 0
+
+    def sync(self) -> None:
+        """把尚未落盘的记录 fsync 到磁盘"""
+        with self._lock:
+            self._fsync()
+
+    def close(self) -> None:
+        """等待后台压缩结束并关闭日志"""
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._fsync()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            self._file_lock.close()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.iter_records()
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """逐行读取历史记录，跳过写了一半的行"""
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = _parse_line(line)
+                if record is not None:
+                    yield record
+
+    def iter_new_records(
+        self, cursor: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """从游标处继续读取新追加的完整记录，读完后 self.cursor 为新的游标
+
+        游标记录字节偏移以及偏移前最后一行的长度和 CRC32，cursor 为 None 时从头读。
+        文件被压缩替换或截断后偏移处不再是同一行，这时在产出记录之前抛出
+        StaleCursorError。
+        """
+        offset, last = 0, b""
+        if cursor is not None:
+            offset, length, crc = map(int, cursor.split(":"))
+        if not self.path.exists():
+            if offset:
+                raise StaleCursorError(self.path)
+            self.cursor = _make_cursor(0, b"")
+            return
+        with open(self.path, "rb") as f:
+            if offset:
+                f.seek(max(offset - length, 0))
+                last = f.read(length)
+                if len(last) != length or zlib.crc32(last) != crc:
+                    raise StaleCursorError(self.path)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # 其他进程正在写的行，下次再读
+                offset += len(line)
+                last = line
+                record = _decode_line(line)
+                if record is not None:
+                    yield record
+        self.cursor = _make_cursor(offset, last)
+
+    def compact_in_background(self) -> None:
+        """在后台线程中压缩日志"""
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+            self._appended = 0
+            self._compactor = threading.Thread(target=self.compact, daemon=True)
+            self._compactor.start()
+
+    def compact(
+        self,
+        key: Optional[str] = None,
+        keep: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        before_replace: Optional[Callable[[Path], None]] = None,
+        after_replace: Optional[Callable[[], None]] = None,
+    ) -> bool:
+        """重写日志：去掉损坏的行，统一为紧凑格式；返回是否完成替换
+
+        指定 key 时同一 key 的记录只保留最后一条（用于状态日志）；
+        指定 keep 时只保留 keep 返回 True 的记录（压缩开始后追加的记录总是保留）。
+        before_replace 在文件锁内、替换前以写好的临时文件路径调用，
+        after_replace 在同一段文件锁内、替换后立即调用，用于与替换一起提交其他文件。
+        大部分工作不持有锁，压缩期间新追加的内容在最后原样拷贝，
+        然后在文件锁内用 rename 原子替换，中途中断不会损坏原文件，也不会留下临时文件。
+        如果期间文件已被其他进程替换，放弃本次压缩。
+        """
+        if self.before_compact is not None:
+            self.before_compact()
+        with self._lock, self._file_lock:  # 在文件锁内取长度，不会截断别人正在写的行
+            if self._fh is not None:
+                self._fh.flush()
+            if not self.path.exists():
+                return False
+            end = self.path.stat().st_size
+
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.compact")
+        try:
+            with open(self.path, "rb") as src, open(tmp_path, "wb") as dst:
+                records: Iterable[Dict[str, Any]] = (
+                    record
+                    for record in map(_decode_line, _read_lines(src, end))
+                    if record is not None
+                )
+                if key is not None:
+                    latest = {record.get(key): record for record in records}
+                    records = latest.values()
+                if keep is not None:
+                    records = filter(keep, records)
+                for record in records:
+                    dst.write(
+                        json.dumps(
+                            record, ensure_ascii=False, separators=(",", ":")
+                        ).encode("utf-8")
+                        + b"\n"
+                    )
+
+                with self._lock, self._file_lock:
+                    if _replaced(src, self.path):
+                        dst.close()
+                        os.remove(tmp_path)
+                        return False
+                    if self._fh is not None:
+                        self._fh.flush()
+                    src.seek(end)
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                    if self._fh is not None:
+                        self._fh.close()
+                        self._fh = None
+                    if before_replace is not None:
+                        before_replace(tmp_path)
+                    os.replace(tmp_path, self.path)
+                    self._unsynced = 0
+                    if after_replace is not None:
+                        after_replace()
+        except BaseException:
+            # 中途出错或被中断时原文件不受影响，只需删掉写了一半的临时文件
+            if tmp_path.exists():
+                os.remove(tmp_path)
+            raise
+        return True
+
+
+def _make_cursor(offset: int, last_line: bytes) -> str:
+    return f"{offset}:{len(last_line)}:{zlib.crc32(last_line)}"
+
+
+def _read_lines(f: IO[bytes], end: int) -> Iterator[bytes]:
+    """读取文件 [0, end) 范围内的行"""
+    remaining = end
+    for line in f:
+        if remaining <= 0:
+            break
+        if len(line) > remaining:
+            line = line[:remaining]
+        remaining -= len(line)
+        yield line
+
+
+def _replaced(f: IO[Any], path: Path) -> bool:
+    """打开的文件是否已不是 path 指向的文件（被删除或被替换）"""
+    try:
+        current = os.stat(path)
+    except FileNotFoundError:
+        return True
+    opened = os.fstat(f.fileno())
+    return (opened.st_dev, opened.st_ino) != (current.st_dev, current.st_ino)
+
+
+def _decode_line(line: bytes) -> Optional[Dict[str, Any]]:
+    return _parse_line(line.decode("utf-8", errors="replace"))
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _parse_line(line: str) -> Optional[Dict[str, Any]]:
+    if not line.endswith("\n"):
+        return None  # 写入被中断的最后一行
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    return record if isinstance(record, dict) else None
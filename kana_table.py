@@ -0,0 +1,182 @@
+from array import array
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+from utils import load_kana_data
+
+# 三种文字对应的列名
+COLUMN_NAMES = {"hiragana": "平假名", "katakana": "片假名", "romaji": "罗马音"}
+
+# 练习模式 -> (题目列, 答案列)
+MODE_COLUMNS = {
+    "hira_to_roma": ("hiragana", "romaji"),
+    "kata_to_roma": ("katakana", "romaji"),
+    "roma_to_hira": ("romaji", "hiragana"),
+    "roma_to_kata": ("romaji", "katakana"),
+}
+
+
+class KanaTable:
+    """只读的五十音表
+
+    平假名、片假名、罗马音按行顺序存放在三个平行的元组中，同一位置是同一个音；
+    基础五十音在前，拗音在后。另外记录每行和每个类别的起止位置，
+    以及罗马音、假名到位置的反查表。
+    """
+
+    __slots__ = (
+        "hiragana",
+        "katakana",
+        "romaji",
+        "row_names",
+        "row_offsets",
+        "row_ids",
+        "category_offsets",
+        "_romaji_index",
+        "_kana_index",
+    )
+
+    hiragana: Tuple[str, ...]
+    katakana: Tuple[str, ...]
+    romaji: Tuple[str, ...]
+    row_names: Tuple[str, ...]
+    row_offsets: array  # type: ignore[type-arg]
+    row_ids: array  # type: ignore[type-arg]
+    category_offsets: Mapping[str, Tuple[int, int]]
+    _romaji_index: Mapping[str, int]
+    _kana_index: Mapping[str, int]
+
+    def __init__(self, basic_kana: Dict[str, Any], youon_kana: Dict[str, Any]) -> None:
+        hiragana: List[str] = []
+        katakana: List[str] = []
+        romaji: List[str] = []
+        row_names: List[str] = []
+        row_offsets = array("H", [0])
+        row_ids = array("H")
+        category_offsets: Dict[str, Tuple[int, int]] = {}
+
+        for category, rows in (("basic", basic_kana), ("youon", youon_kana)):
+            start = len(romaji)
+            for row_name, row in rows.items():
+                for key in row:
+                    if key not in COLUMN_NAMES:
+                        raise ValueError(f"Unknown key: {key}")
+                if (
+                    not len(row["hiragana"])
+                    == len(row["katakana"])
+                    == len(row["romaji"])
+                ):
+                    raise ValueError(f"Row length mismatch: {row_name}")
+
+                hiragana.extend(row["hiragana"])
+                katakana.extend(row["katakana"])
+                romaji.extend(row["romaji"])
+                row_ids.extend([len(row_names)] * len(row["romaji"]))
+                row_names.append(row_name)
+                row_offsets.append(len(romaji))
+            category_offsets[category] = (start, len(romaji))
+        category_offsets["all"] = (0, len(romaji))
+
+        # 反查表：同音字符（如 じ/ぢ）以先出现的为准
+        romaji_index: Dict[str, int] = {}
+        kana_index: Dict[str, int] = {}
+        for i, (hira, kata, roma) in enumerate(zip(hiragana, katakana, romaji)):
+            romaji_index.setdefault(roma, i)
+            kana_index.setdefault(hira, i)
+            kana_index.setdefault(kata, i)
+
+        set_ = object.__setattr__
+        set_(self, "hiragana", tuple(hiragana))
+        set_(self, "katakana", tuple(katakana))
+        set_(self, "romaji", tuple(romaji))
+        set_(self, "row_names", tuple(row_names))
+        set_(self, "row_offsets", row_offsets)
+        set_(self, "row_ids", row_ids)
+        set_(self, "category_offsets", MappingProxyType(category_offsets))
+        set_(self, "_romaji_index", MappingProxyType(romaji_index))
+        set_(self, "_kana_index", MappingProxyType(kana_index))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("KanaTable is read-only")
+
+    def __len__(self) -> int:
+        return len(self.romaji)
+
+    def column(self, name: str) -> Tuple[str, ...]:
+        """按列名取一整列：hiragana / katakana / romaji"""
+        if name not in COLUMN_NAMES:
+            raise ValueError(f"Unknown column: {name}")
+        return getattr(self, name)  # type: ignore[no-any-return]
+
+    def span(self, char_type: str) -> range:
+        """字符类型（basic / youon / all）对应的位置范围"""
+        if char_type not in self.category_offsets:
+            raise ValueError(f"Unknown char_type: {char_type}")
+        start, stop = self.category_offsets[char_type]
+        return range(start, stop)
+
+    def rows(self, char_type: str = "all") -> List[str]:
+        """字符类型包含的行名"""
+        span = self.span(char_type)
+        return [
+            name
+            for i, name in enumerate(self.row_names)
+            if span.start <= self.row_offsets[i] < span.stop
+        ]
+
+    def row_span(self, row_name: str) -> range:
+        """某一行（如 あ行）对应的位置范围"""
+        i = self.row_names.index(row_name)
+        return range(self.row_offsets[i], self.row_offsets[i + 1])
+
+    def index_of_romaji(self, romaji: str) -> int:
+        """罗马音 -> 位置，找不到时抛出 KeyError"""
+        return self._romaji_index[romaji]
+
+    def index_of_kana(self, kana: str) -> int:
+        """平假名或片假名 -> 位置，找不到时抛出 KeyError"""
+        return self._kana_index[kana]
+
+    def record_indices(self, record: Mapping[str, Any]) -> List[int]:
+        """答题记录中每个字符在五十音表中的位置，无法识别的为 -1
+
+        新记录直接保存位置（indices）；没有位置的旧记录按题目文字反查，
+        罗马音题目中同音的字符（じ/ぢ 等）只能归到先出现的那个。
+        """
+        mode = record.get("mode")
+        if mode not in MODE_COLUMNS:
+            return []
+        indices = record.get("indices")
+        if indices is not None:
+            size = len(self.romaji)
+            return [i if isinstance(i, int) and 0 <= i < size else -1 for i in indices]
+        if MODE_COLUMNS[mode][0] == "romaji":
+            lookup = self._romaji_index
+        else:
+            lookup = self._kana_index
+        return [lookup.get(char, -1) for char in record.get("chars") or []]
+
+    def to_romaji(self, kana: str) -> str:
+        return self.romaji[self._kana_index[kana]]
+
+    def to_hiragana(self, romaji: str) -> str:
+        return self.hiragana[self._romaji_index[romaji]]
+
+    def to_katakana(self, romaji: str) -> str:
+        return self.katakana[self._romaji_index[romaji]]
+
+
+@lru_cache(maxsize=None)
+def get_kana_table(path: str = "hiragana_data.json") -> KanaTable:
+    """每个进程只构建一次五十音表"""
+    return KanaTable(*load_kana_data(path))
+
+
+def format_question(mode: str, chars: Iterable[str]) -> str:
+    """生成题目文本"""
+    source, target = MODE_COLUMNS[mode]
+    return (
+        f"{COLUMN_NAMES[source]}「{'、'.join(chars)}」"
+        f"的对应{COLUMN_NAMES[target]}是什么？（用空格分隔）"
+    )
@@ -1,22 +1,73 @@
-import json
+import argparse
 import random
+import time
+from functools import cached_property
 from pathlib import Path
-from typing import Any, Dict, List
-
-from utils import load_kana_data, load_result_data
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from grading import Grader, get_grader
+from kana_table import MODE_COLUMNS, KanaTable, get_kana_table
+from metrics import incr, span, timed
+from quiz_item import QuizItem
+from sampler import SAMPLING_MODES, AdaptiveSampler
+from srs import SpacedRepetitionScheduler, state_path
+from stats import MODES, MasteryStats
+from store import (
+    DATA_DIR,
+    ResultStore,
+    open_profile_store,
+    open_result_store,
+    profile_dir,
+)
+from timing import TimingLog, encode_rows
+
+DEFAULT_RESULTS_FILE = "hiragana_quiz_results.jsonl"
 
 
 class HiraganaQuiz:
-    def __init__(self) -> None:
-        # 从JSON文件加载五十音图数据
-        self.basic_kana, self.youon_kana = load_kana_data()
-        self.total_hira: List[str] = []  # 所有的平假名
-        self.total_kata: List[str] = []  # 所有的片假名
-        self.total_roma: List[str] = []  # 所有的罗马音
-
-        # 结果记录文件
-        self.results_file = Path("hiragana_quiz_results.json")
-        self.results = load_result_data(self.results_file)
+    def __init__(
+        self,
+        results_file: Union[str, Path] = DEFAULT_RESULTS_FILE,
+        store: Optional[ResultStore] = None,
+        scheduler: Optional[SpacedRepetitionScheduler] = None,
+        max_due_per_quiz: int = 2,
+        profile: Optional[str] = None,
+        data_dir: Union[str, Path] = DATA_DIR,
+        sampling: str = "uniform",
+    ) -> None:
+        # 五十音表、判题引擎和统计都在第一次使用时才加载，尽快显示第一个提示
+
+        # 结果记录：追加写入，启动时不读取历史；.db 后缀使用 SQLite 存储
+        # 指定学习者时使用 data_dir/<profile>/ 下自己的分片，多个进程可同时练习
+        self.profile = profile
+        if store is None:
+            if profile is not None:
+                store = open_profile_store(profile, data_dir)
+            else:
+                store = open_result_store(results_file)
+        self.store = store
+        self.results_file = store.path if profile is not None else Path(results_file)
+        if profile is None and self.results_file.name == DEFAULT_RESULTS_FILE:
+            # 迁移同一目录下旧版 JSON 记录；自定义的记录文件不会有旧版文件
+            self.store.migrate(self.results_file.with_suffix(".json"))
+        self.results: List[Dict[str, Any]] = []  # 本次运行的答题记录
+        self._num_saved = 0
+
+        # 逐字掌握情况统计，与记录文件放在一起，随新记录增量更新
+        self.stats_file = self.results_file.with_suffix(".stats")
+        # 每个作答字符的时刻和耗时，定长二进制侧列，同样随保存追加
+        self.timing_file = self.results_file.with_suffix(".timing")
+        self._timing_rows = bytearray()
+
+        # 间隔重复：答错的题加入调度器，到期后混入新的测验
+        self.scheduler = scheduler
+        self.max_due_per_quiz = max_due_per_quiz
+
+        # 抽题方式：均匀随机，或按逐字错误率和久未练习程度加权
+        if sampling not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling: {sampling}")
+        self.sampling = sampling
+        self._samplers: Dict[Tuple[str, str], AdaptiveSampler] = {}
 
         # 练习模式
         self.modes = {
@@ -29,91 +80,71 @@ class HiraganaQuiz:
         # 字符类型
         self.char_types = {"basic": "基础五十音", "youon": "拗音", "all": "全部字符"}
 
-    def save_results(self) -> None:
-        """保存答题记录"""
-        self.results_file.write_text(
-            json.dumps(self.results, ensure_ascii=False, indent=2), encoding="utf-8"
+    @cached_property
+    def table(self) -> KanaTable:
+        """五十音表，每个进程只从JSON文件构建一次"""
+        return get_kana_table()
+
+    @cached_property
+    def grader(self) -> Grader:
+        return get_grader()
+
+    @cached_property
+    def stats(self) -> MasteryStats:
+        """逐字掌握情况统计，第一次访问时读取
+
+        没有统计文件或文件损坏时从历史记录重建，并加上保留策略汇总掉的旧记录。
+        """
+        from retention import load_rollup  # 读取统计时才导入，不拖慢启动
+
+        return MasteryStats.open(
+            self.stats_file,
+            self.store.iter_records(),
+            self.table,
+            base=lambda: load_rollup(self.store.path, self.table).kana_counts(),
         )
 
-    def _load_basic_total(self) -> None:
-        for _, row_value in self.basic_kana.items():
-            for key, value in row_value.items():
-                if key.startswith("hira"):
-                    self.total_hira.extend(value)
-                elif key.startswith("kata"):
-                    self.total_kata.extend(value)
-                elif key.startswith("roma"):
-                    self.total_roma.extend(value)
-                else:
-                    raise ValueError(f"Unknown key: {key}")
-
-    def _load_youon_total(self) -> None:
-        for _, row_value in self.youon_kana.items():
-            for key, value in row_value.items():
-                if key.startswith("hira"):
-                    self.total_hira.extend(value)
-                elif key.startswith("kata"):
-                    self.total_kata.extend(value)
-                elif key.startswith("roma"):
-                    self.total_roma.extend(value)
-                else:
-                    raise ValueError(f"Unknown key: {key}")
+    @cached_property
+    def timing(self) -> TimingLog:
+        return TimingLog(self.timing_file, self.table)
 
+    @timed("save_results")
+    def save_results(self) -> None:
+        """保存答题记录（只追加尚未保存的记录）"""
+        new_results = self.results[self._num_saved :]
+        stats = self.stats  # 先读取统计，避免从已包含新记录的历史重建后重复累加
+        self.store.append(new_results)
+        self.store.sync()
+        stats.update(new_results)
+        stats.save(self.stats_file)
+        self.timing.append(bytes(self._timing_rows))
+        self._timing_rows.clear()
+        if self.scheduler is not None:
+            self.scheduler.sync()
+        self._num_saved = len(self.results)
+
+    @timed("generate_quiz_item")
     def _generate_quiz_item(
-        self, mode: str, num_questions: int, chars_per_question: int
-    ) -> List[Dict[str, Any]]:
-        total = len(self.total_roma)
-        index = [i for i in range(total)]
-        random.shuffle(index)
-        total_nums = num_questions * chars_per_question
-        index = index[:total_nums]
-
-        selected_chars = []
-        answers = []
-
-        if mode == "hira_to_roma":
-            selected_chars.extend([self.total_hira[i] for i in index])
-            answers.extend([self.total_roma[i] for i in index])
-            source_type = "平假名"
-            target_type = "罗马音"
-        elif mode == "kata_to_roma":
-            selected_chars.extend([self.total_kata[i] for i in index])
-            answers.extend([self.total_roma[i] for i in index])
-            source_type = "片假名"
-            target_type = "罗马音"
-        elif mode == "roma_to_hira":
-            selected_chars.extend([self.total_roma[i] for i in index])
-            answers.extend([self.total_hira[i] for i in index])
-            source_type = "罗马音"
-            target_type = "平假名"
-        elif mode == "roma_to_kata":
-            selected_chars.extend([self.total_roma[i] for i in index])
-            answers.extend([self.total_hira[i] for i in index])
-            source_type = "罗马音"
-            target_type = "片假名"
-        else:
+        self, mode: str, num_questions: int, chars_per_question: int, char_type: str
+    ) -> List[QuizItem]:
+        if mode not in MODE_COLUMNS:
             raise ValueError(f"Unknown mode: {mode}")
 
-        items = []
-        for i in range(0, total_nums, chars_per_question):
-            selected_char = selected_chars[i : i + chars_per_question]
-            selected_answer = answers[i : i + chars_per_question]
-
-            question = f"{source_type}「{'、'.join(selected_char)}」的对应{target_type}是什么？（用空格分隔）"
-            answer = " ".join(selected_answer)
-
-            item = {
-                "type": "multi_char_quiz",
-                "question": question,
-                "answer": answer,
-                "details": {
-                    "chars": selected_chars,
-                    "answers": answers,
-                    "mode": mode,
-                },
-            }
-            items.append(item)
+        span = self.table.span(char_type)
+        total_nums = min(num_questions * chars_per_question, len(span))
+        if self.sampling == "adaptive":
+            sampler = self.sampler(mode, char_type)
+            index = [span[i] for i in sampler.sample(total_nums)]
+        else:
+            index = random.sample(span, total_nums)
+
+        # 每道题只保存自己的字符位置，题目和答案文字用到时再生成
+        items = [
+            QuizItem(index[i : i + chars_per_question], mode)
+            for i in range(0, total_nums, chars_per_question)
+        ]
 
+        incr("questions_generated", len(items))
         return items
 
     def generate_quiz_items(
@@ -122,22 +153,121 @@ class HiraganaQuiz:
         mode: str = "hira_to_roma",
         chars_per_question: int = 2,
         char_type: str = "all",
-    ) -> List[Dict[str, Any]]:
+    ) -> List[QuizItem]:
         """生成一批测验题目，每个题目包含多个字符"""
-        if char_type == "basic":
-            self._load_basic_total()
-        elif char_type == "youon":
-            self._load_youon_total()
-        elif char_type == "all":
-            self._load_basic_total()
-            self._load_youon_total()
-        else:
-            raise ValueError(f"Unknown char_type: {char_type}")
-
-        items = self._generate_quiz_item(mode, num_questions, chars_per_question)
+        items = self._generate_quiz_item(
+            mode, num_questions, chars_per_question, char_type
+        )
 
         return items
 
+    def sampler(self, mode: str, char_type: str) -> AdaptiveSampler:
+        """某个模式和字符范围的加权抽样器，第一次使用时用逐字统计初始化
+
+        有计时记录时，答对也答得慢的假名额外加权（见 TimingLog.fluency）。
+        """
+        key = (mode, char_type)
+        if key not in self._samplers:
+            span = self.table.span(char_type)
+            m = MODES.index(mode)
+            slots = [i * len(MODES) + m for i in span]
+            boost = None
+            if self.timing_file.exists():
+                fluency = self.timing.fluency(mode)
+                boost = [fluency[i] for i in span]
+            self._samplers[key] = AdaptiveSampler(
+                len(span),
+                attempts=[self.stats.attempts[s] for s in slots],
+                correct=[self.stats.correct[s] for s in slots],
+                boost=boost,
+            )
+        return self._samplers[key]
+
+    def observe_answer(self, item: QuizItem, record: Dict[str, Any]) -> None:
+        """把每个字符的对错交给已创建的加权抽样器"""
+        for (mode, char_type), sampler in self._samplers.items():
+            if mode != item.mode:
+                continue
+            span = self.table.span(char_type)
+            for index, is_correct in zip(item.indices, record["char_results"]):
+                if index in span:
+                    sampler.observe(index - span.start, is_correct)
+
+    def mix_due_items(self, items: List[QuizItem], mode: str) -> List[QuizItem]:
+        """用到期的复习题替换末尾的几道新题（没有逐字信息的旧记录不参与）"""
+        if self.scheduler is None or not items:
+            return items
+
+        limit = min(self.max_due_per_quiz, len(items))
+        due = self.scheduler.due(limit, mode=mode)
+        if not due:
+            return items
+
+        review_items = [
+            item
+            for item in (
+                QuizItem.from_record(state.payload, is_review=True) for state in due
+            )
+            if item is not None
+        ]
+        if not review_items:
+            return items
+        return items[: len(items) - len(review_items)] + review_items
+
+    def schedule_review(self, item: QuizItem, record: Dict[str, Any]) -> None:
+        """把答题结果交给间隔重复调度器"""
+        if self.scheduler is None:
+            return
+        if item.is_review:
+            self.scheduler.review_answer(record["question"], record["is_correct"])
+        elif not record["is_correct"]:
+            self.scheduler.add(record["question"], record)
+
+    def record_timing(
+        self, item: QuizItem, record: Dict[str, Any], latency_ns: int
+    ) -> None:
+        """记下一道题的作答耗时，随 save_results 写入计时侧列"""
+        self._timing_rows += encode_rows(
+            item.indices,
+            record["mode"],
+            record["char_results"],
+            float(record["timestamp"]),
+            latency_ns,
+        )
+
+    def check_answer(self, item: QuizItem, user_answer: str) -> bool:
+        """核对一道题的答案，接受训令式等常见罗马音写法"""
+        return self.grader.grade(item.answers, user_answer).is_correct
+
+    def make_record(
+        self,
+        item: QuizItem,
+        user_answer: str,
+        is_correct: bool,
+        mode: str,
+        char_type: str,
+        timestamp: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """生成一条答题记录，多字符题目同时记录每个字符的对错
+
+        timestamp 为作答时刻（Unix 秒），默认为当前时间。
+        """
+        answers = item.answers
+        return {
+            "question": item.question,
+            "user_answer": user_answer,
+            "correct_answer": " ".join(answers),
+            "is_correct": is_correct,
+            "mode": mode,
+            "char_type": char_type,
+            "timestamp": str(time.time() if timestamp is None else timestamp),
+            "is_review": item.is_review,  # 是否为复习题
+            "chars": item.chars,
+            # 五十音表位置：罗马音题目中 ji 既可能是じ也可能是ぢ，统计按位置计数
+            "indices": list(item.indices),
+            "char_results": self.grader.grade(answers, user_answer).positions,
+        }
+
     def run_batch_quiz(
         self,
         num_questions: int = 5,
@@ -155,46 +285,51 @@ class HiraganaQuiz:
         quiz_items = self.generate_quiz_items(
             num_questions, mode, chars_per_question, char_type
         )
+        quiz_items = self.mix_due_items(quiz_items, mode)
 
         # 显示所有题目
         print("\n==== 题目 ====")
         for i, item in enumerate(quiz_items, 1):
-            print(f"{i}. {item['question']}")
+            print(f"{i}. {item.question}")
 
         # 收集答案
         print("\n==== 请输入答案 ====")
+        # 每题从出现提示到提交答案的耗时用单调时钟计，作答时刻用墙上时间
         user_answers = []
+        answered_at = []
+        latencies = []
         for i in range(num_questions):
-            answer = input(f"第 {i+1} 题答案：").strip().lower()
+            with span("input_wait"):
+                prompted = time.perf_counter_ns()
+                answer = input(f"第 {i+1} 题答案：").strip().lower()
+                latencies.append(time.perf_counter_ns() - prompted)
+                answered_at.append(time.time())
             user_answers.append(answer)
 
         # 核对答案
         print("\n==== 核对答案 ====")
         score = 0
         mistakes = []
-        for i, (item, user_answer) in enumerate(zip(quiz_items, user_answers), 1):
-            is_correct = user_answer == item["answer"]
+        answers = zip(quiz_items, user_answers, answered_at, latencies)
+        for i, (item, user_answer, timestamp, latency_ns) in enumerate(answers, 1):
+            is_correct = self.check_answer(item, user_answer)
+            incr("answers_correct" if is_correct else "answers_wrong")
 
             if is_correct:
                 print(f"第 {i} 题：✅ 正确！")
                 score += 1
             else:
-                print(f"第 {i} 题：❌ 错误！正确答案是：{item['answer']}")
+                print(f"第 {i} 题：❌ 错误！正确答案是：{item.answer}")
                 mistakes.append((i, item, user_answer))
 
             # 记录结果
-            self.results.append(
-                {
-                    "question": item["question"],
-                    "user_answer": user_answer,
-                    "correct_answer": item["answer"],
-                    "is_correct": is_correct,
-                    "mode": mode,
-                    "char_type": char_type,
-                    "timestamp": str(Path("").cwd().stat().st_mtime),
-                    "is_review": False,  # 是否为复习题
-                }
+            record = self.make_record(
+                item, user_answer, is_correct, mode, char_type, timestamp
             )
+            self.results.append(record)
+            self.record_timing(item, record, latency_ns)
+            self.schedule_review(item, record)
+            self.observe_answer(item, record)
 
         # 保存结果
         self.save_results()
@@ -207,7 +342,30 @@ class HiraganaQuiz:
 
 
 if __name__ == "__main__":
-    quiz = HiraganaQuiz()
+    parser = argparse.ArgumentParser(description="五十音批量练习")
+    parser.add_argument("--profile", help="学习者名称，记录保存在各自的数据目录")
+    parser.add_argument("--data-dir", default=str(DATA_DIR), help="学习者数据目录")
+    parser.add_argument(
+        "--sampling",
+        choices=list(SAMPLING_MODES),
+        default="uniform",
+        help="抽题方式：uniform 均匀随机，adaptive 多出错题和久未练习的字",
+    )
+    args = parser.parse_args()
+
+    if args.profile:
+        srs_path = profile_dir(args.profile, args.data_dir) / "srs_state.jsonl"
+        quiz = HiraganaQuiz(
+            scheduler=SpacedRepetitionScheduler(srs_path),
+            profile=args.profile,
+            data_dir=args.data_dir,
+            sampling=args.sampling,
+        )
+    else:
+        quiz = HiraganaQuiz(
+            scheduler=SpacedRepetitionScheduler(state_path(DEFAULT_RESULTS_FILE)),
+            sampling=args.sampling,
+        )
 
     # 选择练习模式
     print("请选择练习模式：")
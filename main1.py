@@ -1,15 +1,13 @@
 from typing import Any, Dict, List
 
-from utils import load_kana_data
+from grading import expected_tokens, get_grader
+from kana_table import get_kana_table
 
 
 class Quiz:
     def __init__(self) -> None:
-        self.basic_kana, _ = load_kana_data()
-        self.row_name = list(self.basic_kana.keys())
-        self.total_hira: List[str] = []  # 所有的平假名
-        self.total_kata: List[str] = []  # 所有的片假名
-        self.total_roma: List[str] = []  # 所有的罗马音
+        self.table = get_kana_table()  # 与 HiraganaQuiz 共用同一份五十音表
+        self.row_name = self.table.rows("basic")
 
         self.modes: List[str] = [
             "罗马音->片假名",
@@ -30,8 +28,9 @@ class Quiz:
             target_type = "片假名"
             for i in range(row_choice + 1):
                 row_name = self.row_name[i]
-                selected_char = self.basic_kana[row_name]["romaji"]
-                selected_answer = self.basic_kana[row_name]["katakana"]
+                row = self.table.row_span(row_name)
+                selected_char = [self.table.romaji[j] for j in row]
+                selected_answer = [self.table.katakana[j] for j in row]
                 question = f"{source_type}「{'、'.join(selected_char)}」的对应{target_type}是什么？（用空格分隔）"
                 answer = " ".join(selected_answer)
 
@@ -52,8 +51,9 @@ class Quiz:
             target_type = "平假名"
             for i in range(row_choice + 1):
                 row_name = self.row_name[i]
-                selected_char = self.basic_kana[row_name]["romaji"]
-                selected_answer = self.basic_kana[row_name]["hiragana"]
+                row = self.table.row_span(row_name)
+                selected_char = [self.table.romaji[j] for j in row]
+                selected_answer = [self.table.hiragana[j] for j in row]
                 question = f"{source_type}「{'、'.join(selected_char)}」的对应{target_type}是什么？（用空格分隔）"
                 answer = " ".join(selected_answer)
 
@@ -73,6 +73,10 @@ class Quiz:
 
         return items
 
+    def check_answer(self, item: Dict[str, Any], answer: str) -> bool:
+        """核对一道题的答案"""
+        return get_grader().grade(expected_tokens(item["answer"]), answer).is_correct
+
     def gen_question(self, mode_choice: int, row_choice: int) -> None:
 
         items = self._gen_quiz_items(mode_choice, row_choice)
@@ -84,7 +88,7 @@ class Quiz:
 
             print("\n==== 请输入答案 ====")
             answer = input(f"第 {i} 题答案: ").strip().lower()
-            is_correct = answer == item["answer"]
+            is_correct = self.check_answer(item, answer)
 
             if is_correct:
                 print("✅ 正确！")
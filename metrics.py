@@ -0,0 +1,199 @@
+"""轻量的耗时与计数统计
+
+通过环境变量开启，未开启时几乎没有开销：
+
+    MOJI_METRICS=metrics.prom python main.py    # 退出时导出 Prometheus 文本格式
+    MOJI_METRICS=metrics.json python main.py    # 其他后缀导出 JSON
+    MOJI_PROFILE=cprofile python main.py        # 同时用 cProfile 记录整个运行过程
+    MOJI_PROFILE=tracemalloc python main.py     # 同时记录内存分配
+
+性能分析结果写到 MOJI_PROFILE_OUT（默认 moji_profile.prof / moji_tracemalloc.txt）。
+
+@timed 在导入时决定是否包装函数：未开启时直接返回原函数，调用没有任何额外开销。
+span() 未开启时返回一个共用的空上下文，incr() 只做一次判断。
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+    Union,
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+METRICS_PATH = os.environ.get("MOJI_METRICS", "")
+PROFILE_MODE = os.environ.get("MOJI_PROFILE", "")
+ENABLED = bool(METRICS_PATH)
+
+_NULL: ContextManager[None] = nullcontext()
+
+
+class Registry:
+    """耗时区间（次数、总耗时、最长耗时）与计数器"""
+
+    def __init__(self) -> None:
+        self.spans: Dict[str, List[float]] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.spans.get(name)
+            if entry is None:
+                self.spans[name] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                if seconds > entry[2]:
+                    entry[2] = seconds
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "spans": {
+                    name: {"count": int(c), "total_s": total, "max_s": longest}
+                    for name, (c, total, longest) in sorted(self.spans.items())
+                },
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def to_prometheus(self) -> str:
+        data = self.to_dict()
+        lines = [
+            "# HELP moji_span_seconds Time spent in instrumented code.",
+            "# TYPE moji_span_seconds summary",
+        ]
+        for name, span in data["spans"].items():
+            lines.append(f'moji_span_seconds_count{{span="{name}"}} {span["count"]}')
+            lines.append(
+                f'moji_span_seconds_sum{{span="{name}"}} {span["total_s"]:.9f}'
+            )
+        lines += [
+            "# HELP moji_span_max_seconds Longest single call.",
+            "# TYPE moji_span_max_seconds gauge",
+        ]
+        for name, span in data["spans"].items():
+            lines.append(f'moji_span_max_seconds{{span="{name}"}} {span["max_s"]:.9f}')
+        lines += [
+            "# HELP moji_events_total Event counters.",
+            "# TYPE moji_events_total counter",
+        ]
+        for name, value in data["counters"].items():
+            lines.append(f'moji_events_total{{name="{name}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Union[str, Path]) -> None:
+        """导出到文件：.prom 为 Prometheus 文本格式，其他为 JSON"""
+        path = Path(path)
+        if path.suffix == ".prom":
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+
+
+registry = Registry()
+
+
+@contextmanager
+def _span(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(name, time.perf_counter() - start)
+
+
+def span(name: str) -> ContextManager[None]:
+    """统计一段代码的耗时"""
+    return _span(name) if ENABLED else _NULL
+
+
+def incr(name: str, value: float = 1) -> None:
+    """计数器加 value"""
+    if ENABLED:
+        registry.incr(name, value)
+
+
+def timed(name: str) -> Callable[[F], F]:
+    """统计函数耗时的装饰器；未开启时原样返回函数"""
+
+    def decorate(fn: F) -> F:
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                registry.observe(name, time.perf_counter() - start)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+def _start_profiler(mode: str) -> Optional[Callable[[], None]]:
+    """按 MOJI_PROFILE 开始记录，返回退出时保存结果的函数"""
+    if mode == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        out = os.environ.get("MOJI_PROFILE_OUT", "moji_profile.prof")
+
+        def dump_cprofile() -> None:
+            profiler.disable()
+            profiler.dump_stats(out)
+
+        return dump_cprofile
+    if mode == "tracemalloc":
+        import tracemalloc
+
+        tracemalloc.start(25)
+        out = os.environ.get("MOJI_PROFILE_OUT", "moji_tracemalloc.txt")
+
+        def dump_tracemalloc() -> None:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(out, "w", encoding="utf-8") as f:
+                f.write(f"current={current} peak={peak}\n")
+                for stat in snapshot.statistics("lineno")[:50]:
+                    f.write(f"{stat}\n")
+
+        return dump_tracemalloc
+    return None
+
+
+def _at_exit(dump_profile: Optional[Callable[[], None]]) -> None:
+    if dump_profile is not None:
+        dump_profile()
+    if ENABLED:
+        registry.export(METRICS_PATH)
+
+
+if ENABLED or PROFILE_MODE:
+    atexit.register(_at_exit, _start_profiler(PROFILE_MODE))
@@ -1,51 +1,140 @@
-import json
+import argparse
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Set
+from typing import Any, Container, Dict, Iterator, List, Optional, Union
+
+from grading import get_grader
+from journal import StaleCursorError
+from metrics import incr, span, timed
+from srs import SpacedRepetitionScheduler, state_path
+from store import (
+    DATA_DIR,
+    ResultStore,
+    open_profile_store,
+    open_result_store,
+    profile_dir,
+)
 
 
 class MistakeReviewer:
     def __init__(
-        self, json_file: str, reviewed_file: str = "reviewed_mistakes.json"
+        self,
+        json_file: str = "hiragana_quiz_results.jsonl",
+        reviewed_file: str = "reviewed_mistakes.json",
+        store: Optional[ResultStore] = None,
+        mode: Optional[str] = None,
+        scheduler: Optional[SpacedRepetitionScheduler] = None,
+        due_limit: int = 20,
+        profile: Optional[str] = None,
+        data_dir: Union[str, Path] = DATA_DIR,
+        since: Optional[float] = None,
+        limit: Optional[int] = None,
     ) -> None:
-        self.json_file = Path(json_file)
+        # 指定学习者时读取 data_dir/<profile>/ 下的记录，忽略 json_file / reviewed_file
+        self.profile = profile
+        if store is None:
+            if profile is not None:
+                store = open_profile_store(profile, data_dir)
+            else:
+                store = open_result_store(json_file, reviewed_file)
+        self.store = store
+        self.json_file = store.path if profile is not None else Path(json_file)
         self.reviewed_file = Path(reviewed_file)
-        self.reviewed = self.load_reviewed()  # 先初始化 self.reviewed
-        self.mistakes = self.load_mistakes()  # 再调用依赖 self.reviewed 的方法
+        self.mode = mode  # 只复习指定练习模式的错题，None 表示全部
+        self.scheduler = scheduler  # 间隔重复调度器，None 表示答对一次即掌握
+        self.due_limit = due_limit  # 每次最多复习的到期题目数
+        self.since = since  # 只复习该时间戳之后的错题，None 表示全部
+        self.limit = limit  # 最多读取的错题数，读够即停止，None 表示不限
+        self._mistakes: Optional[List[Any]] = None  # 第一次访问时才读取记录
+
+    @property
+    def reviewed(self) -> Container[str]:
+        return self.load_reviewed()
+
+    @property
+    def mistakes(self) -> List[Any]:
+        """未复习的错题，第一次访问时加载"""
+        if self._mistakes is None:
+            self._mistakes = self.load_mistakes()
+        return self._mistakes
+
+    @mistakes.setter
+    def mistakes(self, mistakes: List[Any]) -> None:
+        self._mistakes = mistakes
 
+    def iter_mistakes(self) -> Iterator[Dict[str, Any]]:
+        """逐条读取未复习的错题，不把整个记录文件读进内存"""
+        return self.store.iter_mistakes(
+            mode=self.mode, since=self.since, limit=self.limit
+        )
+
+    @timed("load_mistakes")
     def load_mistakes(self) -> List[Any]:
         """加载未复习的错题数据"""
         try:
-            with open(self.json_file, "r", encoding="utf-8") as f:
-                all_mistakes = json.load(f)
-                # 过滤已复习的题目和正确题目
-                return [
-                    item
-                    for item in all_mistakes
-                    if not item["is_correct"] and item["question"] not in self.reviewed
-                ]
+            if self.scheduler is not None:
+                return self.load_due_mistakes()
+            # 过滤已复习的题目和正确题目
+            return list(self.iter_mistakes())
         except FileNotFoundError:
             print("错误：未找到错题文件")
             return []
-        except json.JSONDecodeError:
+        except ValueError:  # 包括 json.JSONDecodeError，旧版 JSON 文件损坏或被截断
             print("错误：JSON文件格式不正确")
             return []
 
-    def load_reviewed(self) -> Set[str]:
+    def load_due_mistakes(self) -> List[Any]:
+        """从间隔重复调度器中取出已到期的错题，since 和 limit 同样生效"""
+        assert self.scheduler is not None
+        self.import_mistakes()
+        limit = (
+            self.due_limit if self.limit is None else min(self.due_limit, self.limit)
+        )
+        due = self.scheduler.due(limit, mode=self.mode, since=self.since)
+        return [state.payload for state in due]
+
+    def import_mistakes(self) -> int:
+        """把上次导入之后写入记录文件的错题加入调度器，返回新加入的题数
+
+        游标与调度状态保存在一起，答题服务等其他进程写入的错题下次也会加入；
+        记录文件被重写（如保留策略压缩）时从头导入，已在调度器中的题目不会重复加入。
+        """
+        assert self.scheduler is not None
+        scheduler = self.scheduler
+        reviewed = self.store.reviewed_questions()
+
+        def add(records: Iterator[Dict[str, Any]]) -> int:
+            added = 0
+            for record in records:
+                question = record["question"]
+                if (
+                    record["is_correct"]
+                    or question in reviewed
+                    or question in scheduler
+                ):
+                    continue
+                scheduler.add(question, record)
+                added += 1
+            return added
+
+        try:
+            added = add(
+                self.store.iter_new_records(scheduler.load_cursor(self.store.path))
+            )
+        except StaleCursorError:
+            added = add(self.store.iter_new_records(None))
+        scheduler.sync()
+        scheduler.save_cursor(self.store.path, self.store.cursor)
+        return added
+
+    def load_reviewed(self) -> Container[str]:
         """加载已复习的题目记录"""
-        if self.reviewed_file.exists():
-            try:
-                with open(self.reviewed_file, "r", encoding="utf-8") as f:
-                    return set(json.load(f))
-            except Exception as _:
-                return set()
-        return set()
+        return self.store.reviewed_questions()
 
+    @timed("save_reviewed")
     def save_reviewed(self, question: str) -> None:
         """保存已复习的题目"""
-        reviewed = self.reviewed.copy()
-        reviewed.add(question)
-        with open(self.reviewed_file, "w", encoding="utf-8") as f:
-            json.dump(list(reviewed), f, ensure_ascii=False, indent=2)
+        self.store.mark_reviewed([question])
 
     def display_mistakes(self) -> None:
         """显示所有未复习的错题详情"""
@@ -72,6 +161,11 @@ class MistakeReviewer:
             for mistake in self.mistakes
         ]
 
+    def check_answer(self, question_data: Dict[str, Any], user_answer: str) -> bool:
+        """核对复习题答案（忽略大小写和多余空格，接受训令式等常见罗马音写法）"""
+        correct_answer_list = [ans.lower() for ans in question_data["answer"]]
+        return get_grader().grade(correct_answer_list, user_answer).is_correct
+
     def run_review_quiz(self) -> None:
         """运行复习测验并标记已掌握的题目"""
         review_questions = self.generate_review_questions()
@@ -86,19 +180,33 @@ class MistakeReviewer:
         for i, question_data in enumerate(review_questions, 1):
             print(f"\n第 {i}/{total} 题")
             print(question_data["question"])
-            user_answer = input("请输入答案：").strip().lower()
+            with span("input_wait"):
+                user_answer = input("请输入答案：").strip().lower()
 
-            user_answer_list = user_answer.split()
             correct_answer_list = [ans.lower() for ans in question_data["answer"]]
-            is_correct = user_answer_list == correct_answer_list
+            is_correct = self.check_answer(question_data, user_answer)
+            incr("reviews_correct" if is_correct else "reviews_wrong")
 
-            if is_correct:
+            if self.scheduler is not None:
+                state = self.scheduler.review_answer(
+                    question_data["question"], is_correct
+                )
+                if is_correct:
+                    print(f"✅ 正确！{state.interval:g} 天后再复习")
+                    score += 1
+                else:
+                    print(f"❌ 错误！正确答案：{' '.join(correct_answer_list)}")
+            elif is_correct:
                 print("✅ 正确！该题已标记为已掌握")
                 score += 1
                 self.save_reviewed(question_data["question"])  # 标记为已复习
             else:
                 print(f"❌ 错误！正确答案：{' '.join(correct_answer_list)}")
 
+        if self.scheduler is not None:
+            self.scheduler.sync()
+        self.store.sync()  # 本次复习的已掌握标记一次写入
+
         print("\n=== 复习完成 ===")
         print(f"得分：{score}/{total}")
         print(f"正确率：{score/total*100:.1f}%")
@@ -106,10 +214,44 @@ class MistakeReviewer:
         print(f"剩余未掌握题目数量：{total - score}")
 
 
+def parse_since(text: str) -> float:
+    """把命令行中的 --since 解析为时间戳：数字或 ISO 格式日期时间"""
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
 if __name__ == "__main__":
-    # 替换为你的JSON文件路径
-    json_file = "hiragana_quiz_results.json"
-    reviewer = MistakeReviewer(json_file)
+    parser = argparse.ArgumentParser(description="错题复习")
+    # 记录文件路径，.db 后缀表示 SQLite 存储
+    parser.add_argument("results", nargs="?", default="hiragana_quiz_results.jsonl")
+    parser.add_argument("--profile", help="学习者名称，读取各自数据目录中的记录")
+    parser.add_argument("--data-dir", default=str(DATA_DIR), help="学习者数据目录")
+    parser.add_argument(
+        "--since", type=parse_since, help="只复习此后的错题（时间戳或 2024-05-01）"
+    )
+    parser.add_argument("--limit", type=int, help="最多复习多少道错题")
+    parser.add_argument(
+        "--no-srs",
+        action="store_true",
+        help="不使用间隔重复，答对一次即标记为已复习（记在已复习题目文件中）",
+    )
+    args = parser.parse_args()
+
+    options: Dict[str, Any] = {"since": args.since, "limit": args.limit}
+    if args.profile:
+        srs_path = profile_dir(args.profile, args.data_dir) / "srs_state.jsonl"
+    else:
+        srs_path = state_path(args.results)
+    if not args.no_srs:
+        options["scheduler"] = SpacedRepetitionScheduler(srs_path)
+    if args.profile:
+        reviewer = MistakeReviewer(
+            profile=args.profile, data_dir=args.data_dir, **options
+        )
+    else:
+        reviewer = MistakeReviewer(args.results, **options)
 
     # 显示未复习的错题
     reviewer.display_mistakes()
@@ -118,4 +260,5 @@ if __name__ == "__main__":
     review_choice = input("\n是否开始复习测验？(y/n): ").strip().lower()
     if review_choice == "y":
         reviewer.run_review_quiz()
-        print("\n下次复习将自动跳过已掌握的题目")
+        if reviewer.scheduler is not None:
+            print("\n答对的题目会按间隔重复安排下次复习")
@@ -1,6 +1,45 @@
-import pandas as pd
 import argparse
+import csv
+import hashlib
+import json
 import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TABLE_HEADER = "| 日语 | 罗马音 | 中文 |\n| ---- | ---- | ---- |\n"
+CSV_HEADER = ["japan", "romaji", "chinese"]
+MANIFEST_NAME = ".manifest.json"
+
+
+def _cell(text: str) -> str:
+    """单元格内的竖线需要转义，否则会破坏表格"""
+    return text.strip().replace("|", "\\|")
+
+
+def write_table(input_file: str, output_file: str) -> int:
+    """逐行把CSV写成Markdown表格（先写临时文件再改名），返回写入的词条数"""
+    tmp_file = output_file + ".tmp"
+    count = 0
+    try:
+        with open(input_file, 'r', encoding='utf-8', newline='') as src, \
+                open(tmp_file, 'w', encoding='utf-8') as dst:
+            dst.write(TABLE_HEADER)
+            for line_no, row in enumerate(csv.reader(src), 1):
+                if not row:
+                    continue
+                # 首行是列名时跳过
+                if line_no == 1 and [c.strip().lower() for c in row] == CSV_HEADER:
+                    continue
+                japanese, romaji, chinese = row
+                dst.write(f"| {_cell(japanese)} | {_cell(romaji)} | {_cell(chinese)} |\n")
+                count += 1
+    except BaseException:
+        # 转换失败时不留下半截的临时文件
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    os.replace(tmp_file, output_file)
+    return count
 
 
 def csv_to_markdown(input_file: str, output_file: str) -> None:
@@ -10,45 +49,127 @@ def csv_to_markdown(input_file: str, output_file: str) -> None:
         raise FileNotFoundError(f"输入文件 {input_file} 不存在")
 
     try:
-        # 读取CSV文件，假设文件有三列：日语、罗马音、中文
-        df = pd.read_csv(input_file, encoding='utf-8', header=None, names=['Japanese', 'Romaji', 'Chinese'])
-
-        # 构建Markdown表格
-        md_table = "| 日语 | 罗马音 | 中文 |\n| ---- | ---- | ---- |\n"
-        for index, row in df.iterrows():
-            md_table += f"| {row['Japanese']} | {row['Romaji']} | {row['Chinese']} |\n"
-
-        # 保存Markdown文件
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(md_table)
+        # 逐行读取CSV文件，假设文件有三列：日语、罗马音、中文
+        if write_table(input_file, output_file) == 0:
+            print("错误：CSV文件为空")
+            return
 
         print(f"✅ 成功将 {input_file} 转换为 Markdown 表格并保存至 {output_file}")
 
-    except pd.errors.EmptyDataError:
-        print("错误：CSV文件为空")
-    except pd.errors.ParserError:
+    except (csv.Error, ValueError):
         print("错误：CSV文件解析失败，请检查文件格式")
     except Exception as e:
         print(f"处理文件时发生错误：{str(e)}")
 
 
-def main():
+def _file_hash(path: Path) -> str:
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+def _load_manifest(path: Path) -> Dict[str, str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return dict(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def build_directory(words_dir: str, out_dir: str, jobs: Optional[int] = None,
+                    force: bool = False) -> List[str]:
+    """把目录下所有单元CSV转换为 out_dir/chNN.md
+
+    manifest 记录每个单元CSV的内容哈希，内容没变且输出存在的单元直接跳过；
+    源CSV已删除的单元从 manifest 中去掉，并删除它的 .md 输出。
+    需要重建的单元交给进程池并行转换，返回重建的单元名。
+    """
+    words_path, out_path = Path(words_dir), Path(out_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_path / MANIFEST_NAME
+    manifest = _load_manifest(manifest_path)
+
+    units = sorted(words_path.glob("ch*.csv"))
+    removed = sorted(set(manifest) - {csv_path.stem for csv_path in units})
+    for unit in removed:
+        del manifest[unit]
+        md_path = out_path / f"{unit}.md"
+        if md_path.exists():
+            os.remove(md_path)
+            print(f"已删除 {md_path}（源文件 {unit}.csv 已不存在）")
+
+    stale: Dict[str, str] = {}
+    for csv_path in units:
+        digest = _file_hash(csv_path)
+        md_path = out_path / (csv_path.stem + ".md")
+        if not force and manifest.get(csv_path.stem) == digest and md_path.exists():
+            continue
+        stale[csv_path.stem] = digest
+
+    built: List[str] = []
+    if len(stale) == 1:
+        # 只有一个单元时不必启动进程池
+        unit = next(iter(stale))
+        try:
+            write_table(str(words_path / f"{unit}.csv"), str(out_path / f"{unit}.md"))
+            built.append(unit)
+        except Exception as e:
+            print(f"处理 {unit} 时发生错误：{str(e)}")
+    elif stale:
+        # 进程池只在并行转换时才导入，不拖慢启动
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                unit: pool.submit(write_table, str(words_path / f"{unit}.csv"),
+                                  str(out_path / f"{unit}.md"))
+                for unit in stale
+            }
+            for unit, future in futures.items():
+                try:
+                    future.result()
+                    built.append(unit)
+                except Exception as e:
+                    print(f"处理 {unit} 时发生错误：{str(e)}")
+
+    if built or removed:
+        for unit in built:
+            manifest[unit] = stale[unit]
+        tmp_path = manifest_path.with_name(MANIFEST_NAME + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
+    return built
+
+
+def main() -> None:
     """命令行参数解析主函数"""
     parser = argparse.ArgumentParser(description='将CSV文件转换为Markdown表格')
 
-    # 输入CSV文件路径（必填参数）
-    parser.add_argument('-i', '--input', required=True,
-                        help='输入CSV文件路径（需包含日语、罗马音、中文三列）')
+    # 输入CSV文件路径，与 --build 二选一
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('-i', '--input',
+                       help='输入CSV文件路径（需包含日语、罗马音、中文三列）')
+    group.add_argument('-b', '--build', metavar='WORDS_DIR',
+                       help='转换目录下所有单元CSV，只重建内容有变化的单元')
 
     # 输出Markdown文件路径（可选，默认生成在当前目录）
-    parser.add_argument('-o', '--output', default='vocab_table.md',
-                        help='输出Markdown文件路径（默认：vocab_table.md）')
+    parser.add_argument('-o', '--output', default=None,
+                        help='输出Markdown文件路径（默认：vocab_table.md）；'
+                             '--build 时为输出目录（默认：vocab_md）')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='--build 时的并行进程数（默认：CPU 核数）')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='--build 时忽略 manifest，全部重建')
 
     # 解析命令行参数
     args = parser.parse_args()
 
     # 执行转换
-    csv_to_markdown(args.input, args.output)
+    if args.build:
+        out_dir = args.output or 'vocab_md'
+        built = build_directory(args.build, out_dir, args.jobs, args.force)
+        print(f"✅ 已重建 {len(built)} 个单元：{', '.join(built) or '无'}，输出目录 {out_dir}")
+    else:
+        csv_to_markdown(args.input, args.output or 'vocab_table.md')
 
 
 if __name__ == "__main__":
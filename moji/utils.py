@@ -1,12 +1,44 @@
-from typing import List
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Union
 
 
 def expand_range_list(range_str: str) -> List[int]:
-    result = []
-    for part in range_str.split(','):
-        if '-' in part:
-            start, end = map(int, part.split('-'))
+    result: List[int] = []
+    for part in range_str.split(","):
+        if "-" in part:
+            start, end = map(int, part.split("-"))
             result.extend(range(start, end + 1))
         else:
             result.append(int(part))
     return result
+
+
+@contextmanager
+def file_lock(path: Union[str, Path]) -> Iterator[None]:
+    """跨进程的建议性文件锁，锁文件为 path + ".lock"
+
+    与仓库根目录 utils.FileLock 使用同一个锁文件和同样的加锁方式，两边可以互斥。
+    """
+    lock_path = Path(str(path) + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+b") as fh:
+        if sys.platform == "win32":
+            import msvcrt
+
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,176 @@
+import csv
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+# 文件布局：
+#   头部 <4sHHII>：魔数、版本、列数、行数、元数据长度
+#   元数据 JSON：列名、源文件的 mtime_ns / size / sha1
+#   每列 (行数 + 1) 个 uint32 偏移量（小端），指向后面的 UTF-8 数据区
+#   UTF-8 数据区：所有单元格按列依次拼接，每个单元格后跟一个 \0，
+#   这样整列可以一次解码再切分
+_MAGIC = b"MJVC"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHII")
+
+
+class VocabUnit:
+    """一个单元的词汇表，按列存放，从缓存文件内存映射读取"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, ncols, nrows, meta_len = _HEADER.unpack_from(self._mm)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"不是有效的词汇缓存文件: {path}")
+
+        start = _HEADER.size
+        self.meta: Dict[str, Any] = json.loads(self._mm[start : start + meta_len])
+        self.columns: List[str] = self.meta["columns"]
+        self.nrows: int = nrows
+
+        pos = start + meta_len
+        self._offsets = []
+        for _ in range(ncols):
+            size = 4 * (nrows + 1)
+            offsets = memoryview(self._mm)[pos : pos + size].cast("I")
+            if sys.byteorder != "little":
+                swapped = array("I", offsets.tobytes())
+                swapped.byteswap()
+                offsets = memoryview(swapped)
+            self._offsets.append(offsets)
+            pos += size
+        self._blob_start = pos
+
+    def __len__(self) -> int:
+        return self.nrows
+
+    def column(self, name: str) -> List[str]:
+        """解码一整列"""
+        if not self.nrows:
+            return []
+        offsets = self._offsets[self.columns.index(name)]
+        start = self._blob_start + offsets[0]
+        end = self._blob_start + offsets[self.nrows] - 1
+        return self._mm[start:end].decode("utf-8").split("\0")
+
+    def row(self, index: int) -> Dict[str, str]:
+        base = self._blob_start
+        return {
+            name: self._mm[
+                base + offsets[index] : base + offsets[index + 1] - 1
+            ].decode("utf-8")
+            for name, offsets in zip(self.columns, self._offsets)
+        }
+
+    def close(self) -> None:
+        for offsets in self._offsets:
+            offsets.release()
+        self._mm.close()
+
+    def __enter__(self) -> "VocabUnit":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def _file_sha1(path: Path) -> str:
+    return hashlib.sha1(path.read_bytes()).hexdigest()
+
+
+def write_cache(
+    cache_path: Path,
+    columns: Sequence[str],
+    rows: Sequence[Sequence[str]],
+    source: Dict[str, Any],
+) -> None:
+    """把按行的数据写成列式缓存文件（先写临时文件再改名）"""
+    blob = bytearray()
+    offset_arrays = []
+    for col in range(len(columns)):
+        offsets = array("I", [len(blob)])
+        for row in rows:
+            blob += (row[col] if col < len(row) else "").encode("utf-8") + b"\0"
+            offsets.append(len(blob))
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        offset_arrays.append(offsets.tobytes())
+
+    meta = json.dumps({"columns": list(columns), **source}).encode("utf-8")
+    header = _HEADER.pack(_MAGIC, _VERSION, len(columns), len(rows), len(meta))
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    # 临时文件名带进程号，多个进程同时编译同一单元时不会写同一个临时文件
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(meta)
+            for offsets_bytes in offset_arrays:
+                f.write(offsets_bytes)
+            f.write(blob)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        if tmp_path.exists():
+            os.remove(tmp_path)
+        raise
+
+
+def compile_unit(csv_path: Path, cache_path: Path) -> None:
+    """把单元 CSV 编译成缓存文件"""
+    stat = csv_path.stat()
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        columns = next(reader)
+        rows = [row for row in reader if row]
+    source = {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha1": _file_sha1(csv_path),
+    }
+    write_cache(cache_path, columns, rows, source)
+
+
+def cache_path_for(csv_path: Path, cache_dir: Optional[Path] = None) -> Path:
+    """缓存文件默认放在单元目录下的 .cache 目录里"""
+    cache_dir = cache_dir if cache_dir is not None else csv_path.parent / ".cache"
+    return cache_dir / (csv_path.stem + ".vcol")
+
+
+def load_unit(
+    csv_path: Union[str, Path], cache_dir: Optional[Path] = None
+) -> VocabUnit:
+    """读取单元词汇表，缓存过期（源文件 mtime/大小变化且内容哈希不同）时自动重建"""
+    csv_path = Path(csv_path)
+    cache_path = cache_path_for(csv_path, cache_dir)
+    if cache_path.exists():
+        unit = VocabUnit(cache_path)
+        stat = csv_path.stat()
+        meta = unit.meta
+        if meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+            return unit
+        if meta["sha1"] == _file_sha1(csv_path):
+            # 内容没变，只是 mtime 变了：沿用缓存中的数据，更新记录的 mtime
+            rows = [list(r) for r in zip(*(unit.column(c) for c in unit.columns))]
+            columns = unit.columns
+            source = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha1": meta["sha1"],
+            }
+            unit.close()
+            write_cache(cache_path, columns, rows, source)
+            return VocabUnit(cache_path)
+        unit.close()
+
+    compile_unit(csv_path, cache_path)
+    return VocabUnit(cache_path)
@@ -0,0 +1,252 @@
+import argparse
+import csv
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+from word_index import WordIndex, normalize
+from words import WordQuiz
+
+# 一个答案里并列的多种写法：城市，街道 / 紅葉（もみじ）
+_ALTERNATIVES = re.compile(r"[,、;/()\[\]【】「」]")
+_KATAKANA = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+KEY_NAMES = ("answer.txt", "answers.txt")
+
+# 答案卷中的一行：(题目, 作答, 标准答案, 单词, 是否正确)
+GradedRow = Tuple[str, str, str, str, bool]
+
+
+def normalize_answer(text: str) -> str:
+    """在单词索引的规范化之上，片假名转成平假名，去掉标点和符号"""
+    text = normalize(text).translate(_KATAKANA)
+    return "".join(c for c in text if unicodedata.category(c)[0] not in "PS")
+
+
+def alternatives(text: str) -> Set[str]:
+    """答案中用逗号、顿号、括号等隔开的各种写法，都规范化后返回"""
+    parts = _ALTERNATIVES.split(unicodedata.normalize("NFKC", text))
+    return {alt for alt in map(normalize_answer, parts) if alt}
+
+
+def within_distance(a: str, b: str, limit: int) -> bool:
+    """两个字符串的编辑距离是否不超过 limit，某一行全部超过时提前结束"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    if limit == 0:
+        return a == b
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        if min(current) > limit:
+            return False
+        previous = current
+    return previous[-1] <= limit
+
+
+class AnswerKey:
+    """一份答案（WordQuiz.gen_question 生成的 answer.txt）
+
+    第一列为题目，第二列为答案，表头说明是 japan,chinese（日译中）还是
+    chinese,japan（中译日）。题目按规范化后的文字查找，和作答卷的行顺序无关。
+    """
+
+    def __init__(
+        self, path: Union[str, Path], readings: Optional[Dict[str, List[str]]] = None
+    ) -> None:
+        self.path = Path(path)
+        # 规范化后的题目 -> (标准答案, 单词, 可以接受的写法)
+        self.answers: Dict[str, Tuple[str, str, Set[str]]] = {}
+        with open(self.path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            header = [name.strip() for name in next(reader, [])]
+            if header[:2] not in (["japan", "chinese"], ["chinese", "japan"]):
+                raise ValueError(f"无法识别的答案表头: {self.path}")
+            japan_first = header[0] == "japan"
+            for row in reader:
+                if len(row) < 2:
+                    continue
+                question, answer = row[0], row[1]
+                japan = question if japan_first else answer
+                accepted = alternatives(answer)
+                if not japan_first and readings:
+                    # 中译日时，单词的假名读音和罗马音也算对
+                    for reading in readings.get(japan, []):
+                        accepted |= alternatives(reading)
+                self.answers[normalize_answer(question)] = (answer, japan, accepted)
+
+    def grade(self, question: str, answer: str, typos: float) -> Optional[GradedRow]:
+        """批改一题，题目不在答案中时返回 None
+
+        作答的每一种写法都要能对上某个可接受的写法，
+        允许的编辑距离为可接受写法长度的 typos 倍（向下取整）。
+        """
+        found = self.answers.get(normalize_answer(question))
+        if found is None:
+            return None
+        expected, japan, accepted = found
+        given = alternatives(answer)
+        ok = bool(given) and all(
+            any(within_distance(alt, ref, int(len(ref) * typos)) for ref in accepted)
+            for alt in given
+        )
+        return question, answer, expected, japan, ok
+
+
+def _iter_sheet(path: Path) -> Iterator[Tuple[str, str]]:
+    """作答卷中的 (题目, 作答)，跳过表头和空行"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if row and row[0].strip():
+                yield row[0], row[1] if len(row) > 1 else ""
+
+
+# 每个工作进程缓存读过的答案，以及由主进程传入的单词读音
+_keys: Dict[str, AnswerKey] = {}
+_readings: Dict[str, List[str]] = {}
+
+
+def _init_worker(readings: Dict[str, List[str]]) -> None:
+    global _readings
+    _readings = readings
+    _keys.clear()
+
+
+def _key_for(path: str) -> AnswerKey:
+    if path not in _keys:
+        _keys[path] = AnswerKey(path, _readings)
+    return _keys[path]
+
+
+def grade_sheet(sheet: str, key: str, typos: float) -> Tuple[List[GradedRow], int]:
+    """批改一张作答卷，返回批改结果和答案中找不到的题数"""
+    answer_key = _key_for(key)
+    graded = []
+    unknown = 0
+    for question, answer in _iter_sheet(Path(sheet)):
+        row = answer_key.grade(question, answer, typos)
+        if row is None:
+            unknown += 1
+        else:
+            graded.append(row)
+    return graded, unknown
+
+
+def find_sheets(
+    submissions: Union[str, Path],
+    key: Optional[Union[str, Path]] = None,
+    pattern: str = "*.csv",
+) -> List[Tuple[Path, Path]]:
+    """找出目录下所有作答卷和对应的答案
+
+    指定 key 时所有作答卷共用这一份答案，否则使用作答卷所在目录中的 answer.txt。
+    """
+    pairs = []
+    for sheet in sorted(Path(submissions).rglob(pattern)):
+        if sheet.name in KEY_NAMES:
+            continue
+        if key is not None:
+            pairs.append((sheet, Path(key)))
+            continue
+        for name in KEY_NAMES:
+            if (sheet.parent / name).exists():
+                pairs.append((sheet, sheet.parent / name))
+                break
+        else:
+            raise FileNotFoundError(f"找不到 {sheet} 对应的答案")
+    return pairs
+
+
+def word_readings(words_dir: Union[str, Path]) -> Dict[str, List[str]]:
+    """单词 -> [假名读音, 罗马音]，取自单词索引"""
+    readings: Dict[str, List[str]] = {}
+    for segment in WordIndex(words_dir).segments.values():
+        for japan, reading, romaji, _ in segment.entries:
+            readings.setdefault(japan, [reading, romaji])
+    return readings
+
+
+def _write_graded(path: Path, rows: Sequence[GradedRow]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["question", "answer", "expected", "is_correct"])
+        writer.writerows((q, a, e, int(ok)) for q, a, e, _, ok in rows)
+
+
+def grade_all(
+    pairs: Sequence[Tuple[Path, Path]],
+    quiz: WordQuiz,
+    typos: float = 0.2,
+    jobs: Optional[int] = None,
+    out_dir: Optional[Union[str, Path]] = None,
+    chunk_size: int = 16,
+) -> Tuple[int, int, int]:
+    """并行批改所有作答卷，返回 (作答卷数, 题数, 答对题数)
+
+    每张卷子批改完按顺序追加到单词答题记录（供 adaptive 抽题使用，
+    持有与答题日志相同的跨进程文件锁，见 WordQuiz.append_results），
+    指定 out_dir 时同时写出逐题批改结果。
+    """
+    readings = word_readings(quiz.root_path)
+    sheets = [str(sheet) for sheet, _ in pairs]
+    keys = [str(key) for _, key in pairs]
+    results: Iterator[Tuple[List[GradedRow], int]]
+    pool: Optional[ProcessPoolExecutor] = None
+    if len(pairs) <= chunk_size or jobs == 1:
+        _init_worker(readings)
+        results = map(grade_sheet, sheets, keys, [typos] * len(pairs))
+    else:
+        pool = ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(readings,))
+        results = pool.map(
+            grade_sheet, sheets, keys, [typos] * len(pairs), chunksize=chunk_size
+        )
+
+    total = correct = 0
+    try:
+        for (sheet, _), (graded, unknown) in zip(pairs, results):
+            quiz.append_results((japan, ok) for _, _, _, japan, ok in graded)
+            score = sum(row[4] for row in graded)
+            total += len(graded)
+            correct += score
+            note = f"，{unknown} 题不在答案中" if unknown else ""
+            print(f"{sheet}: {score}/{len(graded)}{note}")
+            if out_dir is not None:
+                _write_graded(Path(out_dir) / f"{sheet.stem}.graded.csv", graded)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return len(pairs), total, correct
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批改交上来的单词作答卷")
+    parser.add_argument("submissions", help="作答卷所在目录")
+    parser.add_argument(
+        "--key", help="所有作答卷共用的答案，默认用各自目录下的 answer.txt"
+    )
+    parser.add_argument("--pattern", default="*.csv", help="作答卷文件名")
+    parser.add_argument("--words-dir", default="words", help="单词目录（用于假名读音）")
+    parser.add_argument("--results", default="word_results.jsonl", help="单词答题记录")
+    parser.add_argument("--out", help="逐题批改结果的输出目录")
+    parser.add_argument("--typos", type=float, default=0.2, help="允许的错字比例")
+    parser.add_argument("-j", "--jobs", type=int, help="并行进程数（默认CPU核数）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pairs = find_sheets(args.submissions, args.key, args.pattern)
+    quiz = WordQuiz(args.words_dir, results_file=args.results)
+    n_sheets, total, correct = grade_all(pairs, quiz, args.typos, args.jobs, args.out)
+    elapsed = time.perf_counter() - start
+    accuracy = f"{correct / total * 100:.1f}%" if total else "-"
+    print(
+        f"共批改 {n_sheets} 张作答卷 {total} 题，正确率 {accuracy}，用时 {elapsed:.2f} s"
+    )
@@ -0,0 +1,363 @@
+import csv
+import json
+import os
+import re
+import struct
+import sys
+import time
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+# 文件布局：
+#   头部 <4sHIII>：魔数、版本、元数据长度、偏移量个数、行号个数
+#   元数据 JSON：单元名、源文件、单词、规范化后的查找键、n-gram 列表
+#   每个 n-gram 倒排表在行号数组中的起止偏移（uint32，小端）
+#   所有倒排表的行号依次拼接（uint32，小端）
+_MAGIC = b"MJWI"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHIII")
+# 每个单词可以按这四个字段查找
+FIELDS = ("japan", "reading", "romaji", "chinese")
+
+# 笔记生词表中的一行：| 紅葉（もみじ） | momiji | 红叶 |
+_NOTE_ROW = re.compile(r"^\|\s*([^|（(]+?)\s*[（(]\s*([^）)]+?)\s*[）)]\s*\|")
+# 罗马音里的长音符号统一去掉，shīzun 和 shizun 都能查到
+_MACRONS = str.maketrans("āīūēōâîûêô", "aiueoaiueo")
+
+
+def normalize(text: str) -> str:
+    """统一全角半角、大小写和罗马音长音符号，去掉空白（Fuji san 和 fujisan 一样）"""
+    text = unicodedata.normalize("NFKC", text).lower().translate(_MACRONS)
+    return "".join(text.split())
+
+
+def ngrams(text: str) -> Set[str]:
+    """单字和相邻两字，单字用于一个字的查询，两字用于更长的查询"""
+    grams = set(text)
+    grams.update(text[i : i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def _query_grams(text: str) -> Set[str]:
+    if len(text) < 2:
+        return set(text)
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+class WordEntry:
+    """索引中的一个单词"""
+
+    __slots__ = ("unit", "row", "japan", "reading", "romaji", "chinese")
+
+    def __init__(
+        self, unit: str, row: int, japan: str, reading: str, romaji: str, chinese: str
+    ) -> None:
+        self.unit = unit
+        self.row = row
+        self.japan = japan
+        self.reading = reading
+        self.romaji = romaji
+        self.chinese = chinese
+
+    def __repr__(self) -> str:
+        reading = f"（{self.reading}）" if self.reading != self.japan else ""
+        return (
+            f"{self.unit}#{self.row} {self.japan}{reading} {self.romaji} {self.chinese}"
+        )
+
+
+class Segment:
+    """一个单元的索引段：单词列表和 n-gram 倒排表，单元或笔记变化时只重建这一段"""
+
+    def __init__(
+        self,
+        unit: str,
+        source: Dict[str, List[int]],
+        entries: List[List[str]],
+        keys: Optional[List[str]] = None,
+        grams: Optional[List[str]] = None,
+        offsets: Optional["array[int]"] = None,
+        rows: Optional["array[int]"] = None,
+    ) -> None:
+        self.unit = unit
+        self.source = source  # 源文件名 -> [mtime_ns, 大小]
+        self.entries = entries  # 每行为 FIELDS 顺序的四个字段
+        # 每行规范化后的各字段用 \0 连接，查询整个词时一次 in 判断即可
+        if keys is None:
+            keys = ["\0".join(map(normalize, entry)) for entry in entries]
+        self.keys = keys
+        if grams is None or offsets is None or rows is None:
+            postings: Dict[str, List[int]] = {}
+            for row, key in enumerate(keys):
+                for gram in ngrams(key) - {"\0"}:
+                    if "\0" not in gram:
+                        postings.setdefault(gram, []).append(row)
+            grams = sorted(postings)
+            offsets = array("I", [0])
+            rows = array("I")
+            for gram in grams:
+                rows.extend(postings[gram])
+                offsets.append(len(rows))
+        # 倒排表：第 i 个 n-gram 的行号为 rows[offsets[i]:offsets[i + 1]]
+        self._gram_ids = {gram: i for i, gram in enumerate(grams)}
+        self._offsets = offsets
+        self._rows = rows
+
+    def posting(self, gram: str) -> "array[int]":
+        i = self._gram_ids.get(gram)
+        if i is None:
+            return array("I")
+        return self._rows[self._offsets[i] : self._offsets[i + 1]]
+
+    def candidates(self, grams: Set[str]) -> List[int]:
+        """可能包含全部 n-gram 的行，从最短的倒排表开始求交集"""
+        lists = sorted(map(self.posting, grams), key=len)
+        if not lists or not lists[0]:
+            return []
+        if len(lists) == 1:
+            return list(lists[0])
+        # 候选已经很少时不再求交集，剩下的交给调用方逐行确认
+        rows = set(lists[0])
+        for posting in lists[1:]:
+            if len(rows) <= 32:
+                break
+            rows.intersection_update(posting)
+        return sorted(rows)
+
+    def scores(self, grams: Set[str]) -> Dict[int, int]:
+        """每行命中的 n-gram 个数，用于模糊查找"""
+        counts: Dict[int, int] = {}
+        for gram in grams:
+            for row in self.posting(gram):
+                counts[row] = counts.get(row, 0) + 1
+        return counts
+
+    def entry(self, row: int) -> WordEntry:
+        return WordEntry(self.unit, row, *self.entries[row])
+
+    def save(self, path: Path) -> None:
+        grams = sorted(self._gram_ids, key=self._gram_ids.__getitem__)
+        meta = json.dumps(
+            {
+                "unit": self.unit,
+                "source": self.source,
+                "entries": self.entries,
+                "keys": self.keys,
+                "grams": grams,
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        offsets, rows = array("I", self._offsets), array("I", self._rows)
+        if sys.byteorder != "little":
+            offsets.byteswap()
+            rows.byteswap()
+        header = _HEADER.pack(_MAGIC, _VERSION, len(meta), len(offsets), len(rows))
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.write(meta)
+            f.write(offsets.tobytes())
+            f.write(rows.tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["Segment"]:
+        """读取索引段，文件不存在、版本不符或已损坏时返回 None"""
+        try:
+            data = path.read_bytes()
+            magic, version, meta_len, n_offsets, n_rows = _HEADER.unpack_from(data)
+            if magic != _MAGIC or version != _VERSION:
+                return None
+            pos = _HEADER.size
+            meta = json.loads(data[pos : pos + meta_len])
+            pos += meta_len
+            offsets = array("I", data[pos : pos + 4 * n_offsets])
+            pos += 4 * n_offsets
+            rows = array("I", data[pos : pos + 4 * n_rows])
+        except (OSError, struct.error, ValueError):
+            return None
+        if len(offsets) != n_offsets or len(rows) != n_rows:
+            return None
+        if sys.byteorder != "little":
+            offsets.byteswap()
+            rows.byteswap()
+        return cls(
+            meta["unit"],
+            meta["source"],
+            meta["entries"],
+            meta["keys"],
+            meta["grams"],
+            offsets,
+            rows,
+        )
+
+
+def _source_files(csv_path: Path, notes_dir: Path) -> List[Path]:
+    """单元 CSV 和同名笔记目录（如 ch10/）下的 Markdown 笔记"""
+    notes = notes_dir / csv_path.stem
+    return [csv_path, *sorted(notes.glob("*.md"))] if notes.is_dir() else [csv_path]
+
+
+def _stat_source(files: Iterable[Path]) -> Dict[str, List[int]]:
+    source = {}
+    for path in files:
+        stat = path.stat()
+        source[path.name] = [stat.st_mtime_ns, stat.st_size]
+    return source
+
+
+def _note_readings(paths: Iterable[Path]) -> Dict[str, str]:
+    """从笔记的表格中读取 汉字（假名） 形式的读音"""
+    readings: Dict[str, str] = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                match = _NOTE_ROW.match(line)
+                if match:
+                    readings.setdefault(match.group(1), match.group(2))
+    return readings
+
+
+def build_segment(csv_path: Path, notes_dir: Path) -> Segment:
+    """为一个单元建立索引段，读音取自笔记，没有时用单词本身"""
+    files = _source_files(csv_path, notes_dir)
+    readings = _note_readings(files[1:])
+    entries = []
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            japan = row.get("japan") or ""
+            if not japan:
+                continue
+            entries.append(
+                [
+                    japan,
+                    readings.get(japan, japan),
+                    row.get("romaji") or "",
+                    row.get("chinese") or "",
+                ]
+            )
+    return Segment(csv_path.stem, _stat_source(files), entries)
+
+
+class WordIndex:
+    """所有单元词汇的倒排索引
+
+    按单词（汉字写法）、假名读音、罗马音和中文释义的单字和两字 n-gram 建立倒排表，
+    每个单元一个索引段，保存在单元目录的 .cache/ 下；单元 CSV 或笔记有变化、
+    新增单元时只重建对应的段。
+    """
+
+    def __init__(
+        self,
+        words_dir: Union[str, Path],
+        notes_dir: Optional[Union[str, Path]] = None,
+        cache_dir: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self.words_dir = Path(words_dir)
+        self.notes_dir = Path(notes_dir) if notes_dir else self.words_dir.parent
+        self.cache_dir = Path(cache_dir) if cache_dir else self.words_dir / ".cache"
+        self.segments: Dict[str, Segment] = {}
+        self.refresh()
+
+    def refresh(self) -> List[str]:
+        """重建有变化的单元，去掉已删除的单元，返回重建的单元名"""
+        rebuilt = []
+        units = sorted(self.words_dir.glob("ch*.csv"), key=_unit_order)
+        segments: Dict[str, Segment] = {}
+        for csv_path in units:
+            unit = csv_path.stem
+            source = _stat_source(_source_files(csv_path, self.notes_dir))
+            segment = self.segments.get(unit)
+            cache_path = self.cache_dir / f"{unit}.widx"
+            if segment is None or segment.source != source:
+                segment = Segment.load(cache_path)
+            if segment is None or segment.source != source:
+                segment = build_segment(csv_path, self.notes_dir)
+                segment.save(cache_path)
+                rebuilt.append(unit)
+            segments[unit] = segment
+        self.segments = segments
+        return rebuilt
+
+    def __len__(self) -> int:
+        return sum(len(segment.entries) for segment in self.segments.values())
+
+    def search(
+        self,
+        query: str,
+        fields: Sequence[str] = FIELDS,
+        units: Optional[Iterable[str]] = None,
+        fuzzy: bool = True,
+        limit: Optional[int] = None,
+    ) -> List[WordEntry]:
+        """查找字段中包含 query 的单词
+
+        先用倒排表求出包含全部 n-gram 的候选，再确认确实包含整个查询；
+        fuzzy 为 True 且结果不足 limit 时，补上命中一半以上 n-gram 的相近单词。
+        """
+        text = normalize(query.strip())
+        if not text:
+            return []
+        grams = _query_grams(text)
+        columns = [FIELDS.index(field) for field in fields]
+        segments = [
+            self.segments[u] for u in (units or self.segments) if u in self.segments
+        ]
+
+        whole = len(columns) == len(FIELDS)
+        results: List[WordEntry] = []
+        seen: Set[Tuple[str, int]] = set()
+        for segment in segments:
+            for row in segment.candidates(grams):
+                key = segment.keys[row]
+                if (
+                    text in key
+                    if whole
+                    else any(text in key.split("\0")[c] for c in columns)
+                ):
+                    results.append(segment.entry(row))
+                    seen.add((segment.unit, row))
+                    if limit is not None and len(results) >= limit:
+                        return results
+
+        if fuzzy and len(grams) > 1:
+            threshold = (len(grams) + 1) // 2
+            ranked = []
+            for segment in segments:
+                for row, score in segment.scores(grams).items():
+                    if score >= threshold and (segment.unit, row) not in seen:
+                        ranked.append((-score, segment.unit, row, segment))
+            ranked.sort(key=lambda r: r[:3])
+            for _, _, row, segment in ranked:
+                if limit is not None and len(results) >= limit:
+                    break
+                results.append(segment.entry(row))
+        return results
+
+
+def _unit_order(path: Path) -> Tuple[int, int, str]:
+    """ch2 排在 ch10 前面"""
+    digits = path.stem[2:]
+    return (0, int(digits), "") if digits.isdigit() else (1, 0, path.stem)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit("用法: python word_index.py 关键词 [单词目录]")
+    start = time.perf_counter()
+    index = WordIndex(sys.argv[2] if len(sys.argv) > 2 else "words")
+    loaded = time.perf_counter()
+    matches = index.search(sys.argv[1])
+    searched = time.perf_counter()
+
+    for entry in matches:
+        print(entry)
+    print(
+        f"共 {len(matches)} 条（索引 {len(index)} 个单词，"
+        f"读取 {(loaded - start) * 1000:.1f} ms，查找 {(searched - loaded) * 1000:.3f} ms）"
+    )
@@ -1,11 +1,59 @@
+import json
+import os
 from pathlib import Path
-from typing import Union, List
-from utils import expand_range_list
-import pandas as pd
+from typing import (
+    IO,
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
+
+from vocab_cache import load_unit
+from word_index import WordIndex
+
+from utils import expand_range_list, file_lock
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+try:
+    # 统计模块在仓库根目录，需要根目录在导入路径上（PYTHONPATH=..）才能开启
+    from metrics import span, timed
+except ImportError:
+    from contextlib import nullcontext
+
+    def span(name: str) -> ContextManager[None]:
+        return nullcontext()
+
+    def timed(name: str) -> Callable[[F], F]:
+        return lambda fn: fn
+
+
+try:
+    # 加权抽样器同样在仓库根目录
+    from sampler import AdaptiveSampler as _AdaptiveSampler
+
+    AdaptiveSampler: Optional[Type[_AdaptiveSampler]] = _AdaptiveSampler
+except ImportError:
+    AdaptiveSampler = None
 
 
 class WordQuiz:
-    def __init__(self, root_path: Union[str, Path]) -> None:
+    def __init__(
+        self,
+        root_path: Union[str, Path],
+        sampling: str = "uniform",
+        results_file: Union[str, Path] = "word_results.jsonl",
+        compact_every: int = 10000,
+    ) -> None:
         if isinstance(root_path, str):
             root_path = Path(root_path)
 
@@ -13,23 +61,198 @@ class WordQuiz:
         self.modes = ["日译中", "中译日"]
         self.units = [f for f in self.root_path.iterdir() if f.is_file()]
 
-    def gen_question(self, out_dir: Union[str, Path], mode_choice: int, unit_choice: List[int], question_num: int) -> None:
+        # 抽题方式：uniform 均匀随机；adaptive 按答题记录中的错误率和久未练习程度加权
+        self.samplings = ["uniform", "adaptive"]
+        if sampling not in self.samplings:
+            raise ValueError(f"error sampling: {sampling}")
+        self.sampling = sampling
+        self._index: Optional[WordIndex] = None  # 单词索引，按关键词出题时才读取
+
+        # 单词答题记录，每行一条 {"japan": ..., "is_correct": ...}，按作答先后追加。
+        # 单词记录没有假名答题记录的字符和模式，不写进 ResultStore，而是单独一个文件，
+        # 追加和压缩与答题日志一样在同一个跨进程文件锁（results_file + ".lock"）内进行
+        self.results_file = Path(results_file)
+        self.compact_every = compact_every  # 每追加多少条记录压缩一次
+        self._appended = 0
+        # 每个单词的作答汇总，随答题记录增量更新，见 word_counts
+        self.counts_file = self.results_file.with_suffix(".counts.json")
+
+    @property
+    def index(self) -> WordIndex:
+        if self._index is None:
+            self._index = WordIndex(self.root_path)
+        return self._index
+
+    def iter_results(self) -> Iterator[Tuple[str, bool]]:
+        """按先后顺序读取单词答题记录，跳过损坏的行"""
+        if not self.results_file.exists():
+            return
+        with open(self.results_file, "rb") as f:
+            for _, japan, is_correct in _read_results(f, 0):
+                yield japan, is_correct
+
+    def word_counts(self) -> Tuple[Dict[str, List[int]], int]:
+        """每个单词的 [作答次数, 答对次数, 最后一次作答的序号] 和总作答次数
+
+        汇总保存在答题记录旁边，记着记录文件的 inode 和已汇总到的字节偏移，
+        每次只读取之后追加的记录；记录文件被压缩替换（inode 改变）或比偏移短
+        （被清空）时从头汇总。
+        """
+        counts, offset, total, inode = {}, 0, 0, None
+        try:
+            with open(self.counts_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            counts, offset, total = data["words"], data["offset"], data["answers"]
+            inode = data.get("inode")
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            pass
+        if not self.results_file.exists():
+            return {}, 0
+
+        with open(self.results_file, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != inode or stat.st_size < offset:
+                counts, offset, total = {}, 0, 0
+            if stat.st_size == offset:
+                return counts, total
+            end = offset
+            for end, japan, is_correct in _read_results(f, offset):
+                total += 1
+                entry = counts.setdefault(japan, [0, 0, 0])
+                entry[0] += 1
+                entry[1] += is_correct
+                entry[2] = total
+        if end != offset:
+            # 先写临时文件再改名；文件名带进程号，多个进程同时更新时互不覆盖临时文件
+            data = {
+                "inode": stat.st_ino,
+                "offset": end,
+                "answers": total,
+                "words": counts,
+            }
+            tmp_path = self.counts_file.with_name(
+                f"{self.counts_file.name}.{os.getpid()}.tmp"
+            )
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.counts_file)
+        return counts, total
+
+    def append_results(self, results: Iterable[Tuple[str, bool]]) -> None:
+        """把 (单词, 是否答对) 追加到单词答题记录（持有文件锁），累计够数后压缩"""
+        lines = [_result_line(japan, is_correct) for japan, is_correct in results]
+        if not lines:
+            return
+        with file_lock(self.results_file):
+            self.results_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.results_file, "a", encoding="utf-8") as f:
+                if f.tell() > 0 and not _ends_with_newline(self.results_file):
+                    f.write("\n")  # 上次写入被中断，避免与新记录粘在同一行
+                f.writelines(lines)
+        self._appended += len(lines)
+        if self._appended >= self.compact_every:
+            self.compact_results()
+
+    def compact_results(self) -> None:
+        """重写单词答题记录：去掉损坏的行，统一为紧凑格式
+
+        在文件锁内写好临时文件再用 rename 原子替换，中途中断不会损坏原文件；
+        替换后记录文件的 inode 改变，word_counts 据此从头重新汇总。
+        """
+        self._appended = 0
+        with file_lock(self.results_file):
+            if not self.results_file.exists():
+                return
+            tmp_path = self.results_file.with_name(
+                f"{self.results_file.name}.{os.getpid()}.compact"
+            )
+            try:
+                with open(self.results_file, "rb") as src, open(
+                    tmp_path, "w", encoding="utf-8"
+                ) as dst:
+                    dst.writelines(
+                        _result_line(japan, is_correct)
+                        for _, japan, is_correct in _read_results(src, 0)
+                    )
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.replace(tmp_path, self.results_file)
+            except BaseException:
+                if tmp_path.exists():
+                    os.remove(tmp_path)
+                raise
+
+    def sample_rows(self, words: List[str], question_num: int) -> List[int]:
+        """按错误率和久未练习程度不放回地抽取行号，权重来自每个单词的作答汇总"""
+        if AdaptiveSampler is None:
+            raise ImportError(
+                "adaptive 抽题需要仓库根目录在导入路径上（PYTHONPATH=..）"
+            )
+        counts, total = self.word_counts()
+        attempts, correct, last_seen = [], [], []
+        for word in words:
+            entry = counts.get(word)
+            if entry is None:
+                attempts.append(0)
+                correct.append(0)
+                last_seen.append(float("-inf"))
+            else:
+                attempts.append(entry[0])
+                correct.append(entry[1])
+                last_seen.append(entry[2] - total)
+        sampler = AdaptiveSampler(
+            len(words), attempts=attempts, correct=correct, last_seen=last_seen
+        )
+        return sampler.sample(question_num)
+
+    @timed("word_gen_question")
+    def gen_question(
+        self,
+        out_dir: Union[str, Path],
+        mode_choice: int,
+        unit_choice: List[int],
+        question_num: int,
+        query: Optional[str] = None,
+    ) -> None:
+        """从所选单元出题；给出 query 时改为从包含该关键词的单词中出题（unit_choice 为空表示全部单元）"""
+        import pandas as pd  # 用到时再导入，避免拖慢启动
+
         if isinstance(out_dir, str):
             out_dir = Path(out_dir)
 
         if not out_dir.exists():
             out_dir.mkdir(parents=True, exist_ok=True)
 
-        if mode_choice > len(self.modes)-1:
+        if mode_choice > len(self.modes) - 1:
             raise ValueError(f"error mode: {mode_choice}")
 
         unit_paths = [self.root_path / f"ch{num}.csv" for num in unit_choice]
-        dataframes = []
         for path in unit_paths:
             if path not in self.units:
                 raise FileNotFoundError(f"Missing unit files")
+        dataframes = []
+        if query is not None:
+            units = [path.stem for path in unit_paths] or None
+            matches = self.index.search(query, units=units, fuzzy=False)
+            if not matches:
+                raise ValueError(f"没有包含 {query} 的单词")
+            dataframes.append(
+                pd.DataFrame(
+                    {
+                        "japan": [m.japan for m in matches],
+                        "romaji": [m.romaji for m in matches],
+                        "chinese": [m.chinese for m in matches],
+                    }
+                )
+            )
+            unit_paths = []
+        for path in unit_paths:
             try:
-                df = pd.read_csv(path, encoding="utf-8", engine="python")
+                # 从列式缓存读取，CSV 只在首次或修改后编译一次
+                with span("load_unit"), load_unit(path) as unit:
+                    df = pd.DataFrame(
+                        {name: unit.column(name) for name in unit.columns}
+                    )
                 dataframes.append(df)
             except Exception as e:
                 print(f"Error reading {path}: {e}")
@@ -42,7 +265,11 @@ class WordQuiz:
         elif question_num < -1:
             raise ValueError(f"error question num: {question_num}")
 
-        sample_df = combined_df.sample(question_num, random_state=42)
+        if self.sampling == "adaptive":
+            rows = self.sample_rows(combined_df["japan"].tolist(), question_num)
+            sample_df = combined_df.iloc[rows]
+        else:
+            sample_df = combined_df.sample(question_num)
         question_path = out_dir / "quesions.txt"
         answer_path = out_dir / "answer.txt"
         if mode_choice == 0:
@@ -64,6 +291,34 @@ class WordQuiz:
         print(f"save answers to {answer_path.as_posix()}")
 
 
+def _result_line(japan: str, is_correct: bool) -> str:
+    record = {"japan": japan, "is_correct": bool(is_correct)}
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _read_results(f: IO[bytes], offset: int) -> Iterator[Tuple[int, str, bool]]:
+    """从字节偏移 offset 开始读取记录，产出 (该行结束的偏移, 单词, 是否答对)
+
+    写了一半的最后一行不读取，下次从它的开头继续。
+    """
+    f.seek(offset)
+    for line in f:
+        if not line.endswith(b"\n"):
+            return
+        offset += len(line)
+        try:
+            record = json.loads(line)
+            yield offset, record["japan"], bool(record["is_correct"])
+        except (ValueError, KeyError, TypeError):
+            continue
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
 if __name__ == "__main__":
     quiz = WordQuiz(r"words")
 
@@ -76,15 +331,23 @@ if __name__ == "__main__":
     except Exception as e:
         raise ValueError(f"Unknown mode: {e}")
 
-    print("你想复习哪些单元: ")
+    print("你想复习哪些单元(也可以输入 /关键词 按关键词出题，如 /山): ")
     out_str = " ".join(path.stem for path in quiz.units)
     print(out_str)
 
-    unit_choice = str(input())
-    unit_choice = expand_range_list(unit_choice)
+    unit_input = str(input())
+    query = None
+    unit_choice = []
+    if unit_input.startswith("/"):
+        query = unit_input[1:]
+    else:
+        unit_choice = expand_range_list(unit_input)
 
     print("想要练习多少题(-1表示全部): ")
     question_num = int(input())
 
+    print("抽题方式(0. 随机 1. 多练错得多、久没练的词，默认0): ")
+    quiz.sampling = quiz.samplings[int(input() or "0")]
+
     out_dir = r"results/"
-    quiz.gen_question(out_dir, mode_choice, unit_choice, question_num)
+    quiz.gen_question(out_dir, mode_choice, unit_choice, question_num, query)
@@ -0,0 +1,131 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from kana_table import MODE_COLUMNS, format_question, get_kana_table
+
+_MODES = tuple(MODE_COLUMNS)
+_REVIEW_FLAG = 0x80
+
+
+class QuizItem:
+    """一道五十音测验题
+
+    只保存字符在五十音表中的位置（每个位置 1 字节）、练习模式和是否为复习题，
+    题目和答案文字在访问时才从五十音表生成。也支持 item["question"] 这样的
+    只读访问，便于和 Quiz、MistakeReviewer 生成的字典题目混用。
+    """
+
+    __slots__ = ("indices", "mode", "is_review")
+
+    def __init__(
+        self, indices: Iterable[int], mode: str, is_review: bool = False
+    ) -> None:
+        if mode not in MODE_COLUMNS:
+            raise ValueError(f"Unknown mode: {mode}")
+        self.indices = bytes(indices)  # 五十音表不超过 256 个字符
+        self.mode = mode
+        self.is_review = is_review
+
+    @property
+    def chars(self) -> List[str]:
+        """题目中的每个字符"""
+        source = get_kana_table().column(MODE_COLUMNS[self.mode][0])
+        return [source[i] for i in self.indices]
+
+    @property
+    def answers(self) -> List[str]:
+        """每个位置的标准答案"""
+        target = get_kana_table().column(MODE_COLUMNS[self.mode][1])
+        return [target[i] for i in self.indices]
+
+    @property
+    def question(self) -> str:
+        return format_question(self.mode, self.chars)
+
+    @property
+    def answer(self) -> str:
+        return " ".join(self.answers)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "question":
+            return self.question
+        if key == "answer":
+            return self.answer
+        if key == "is_review":
+            return self.is_review
+        if key == "type":
+            return "review_quiz" if self.is_review else "multi_char_quiz"
+        if key == "details":
+            return {"chars": self.chars, "answers": self.answers, "mode": self.mode}
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, QuizItem):
+            return NotImplemented
+        return (self.indices, self.mode, self.is_review) == (
+            other.indices,
+            other.mode,
+            other.is_review,
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.indices, self.mode, self.is_review))
+
+    def __repr__(self) -> str:
+        review = ", is_review=True" if self.is_review else ""
+        return f"QuizItem({list(self.indices)}, {self.mode!r}{review})"
+
+    def pack(self) -> bytes:
+        """紧凑的二进制形式：1 字节模式（最高位为复习标记）、1 字节长度、各位置
+
+        用于保存或传输题目批次；答题记录文件仍是 JSON 行，格式不受影响。
+        """
+        flags = _MODES.index(self.mode) | (_REVIEW_FLAG if self.is_review else 0)
+        return bytes((flags, len(self.indices))) + self.indices
+
+    @classmethod
+    def unpack(cls, data: bytes, offset: int = 0) -> Tuple["QuizItem", int]:
+        """从 offset 处读取一道题，返回 (题目, 下一道题的位置)"""
+        flags, size = data[offset], data[offset + 1]
+        end = offset + 2 + size
+        item = cls(
+            data[offset + 2 : end],
+            _MODES[flags & ~_REVIEW_FLAG],
+            bool(flags & _REVIEW_FLAG),
+        )
+        return item, end
+
+    @classmethod
+    def from_record(
+        cls, record: Dict[str, Any], is_review: bool = False
+    ) -> Optional["QuizItem"]:
+        """从答题记录还原题目；记录中没有逐字信息或字符不在五十音表中时返回 None
+
+        优先使用记录中保存的五十音表位置，旧记录才按题目文字反查。
+        """
+        mode = record.get("mode")
+        if mode not in MODE_COLUMNS:
+            return None
+        indices = get_kana_table().record_indices(record)
+        if not indices or min(indices) < 0:
+            return None
+        return cls(indices, mode, is_review)
+
+
+def pack_items(items: Iterable[QuizItem]) -> bytes:
+    """把一批题目打包成字节串"""
+    return b"".join(item.pack() for item in items)
+
+
+def unpack_items(data: bytes) -> List[QuizItem]:
+    items = []
+    offset = 0
+    while offset < len(data):
+        item, offset = QuizItem.unpack(data, offset)
+        items.append(item)
+    return items
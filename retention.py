@@ -0,0 +1,318 @@
+import argparse
+import json
+import os
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from kana_table import MODE_COLUMNS, KanaTable, get_kana_table
+from stats import MasteryStats
+from store import DATA_DIR, JournalResultStore, open_profile_store, open_result_store
+from utils import FileLock, atomic_write_bytes
+
+_VERSION = 1
+_DAY = 86400.0
+
+# 日期 -> 模式 -> {"questions": {字符类型: [作答, 答对]}, "kana": {平假名: [作答, 答对]}}
+DayCounts = Dict[str, Dict[str, Dict[str, Dict[str, List[int]]]]]
+
+
+class RetentionPolicy:
+    """答题记录的保留策略
+
+    早于 max_age_days 天的原始记录汇总成按天的统计后删除；
+    keep_unreviewed 为 True 时未复习的错题无论多旧都保留原始记录，供错题复习使用。
+    """
+
+    def __init__(self, max_age_days: float = 180, keep_unreviewed: bool = True) -> None:
+        if max_age_days < 0:
+            raise ValueError("保留天数不能为负数")
+        self.max_age_days = max_age_days
+        self.keep_unreviewed = keep_unreviewed
+
+    def cutoff(self, now: Optional[float] = None) -> float:
+        """早于这个时间戳的记录可以汇总"""
+        return (time.time() if now is None else now) - self.max_age_days * _DAY
+
+
+class Rollup:
+    """已删除的原始记录按天、模式汇总的计数
+
+    每天每个模式保存整题的 (作答, 答对)（按字符类型）和每个假名的 (作答, 答对)，
+    统计和报表从头重建时用它补上已删除记录的部分。
+    """
+
+    def __init__(self, table: Optional[KanaTable] = None) -> None:
+        self.table = table if table is not None else get_kana_table()
+        self.records = 0
+        self.days: DayCounts = {}
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """把一条记录计入它所在的那一天（本地日期）"""
+        day = date.fromtimestamp(float(record["timestamp"])).isoformat()
+        mode = record.get("mode") or ""
+        entry = self.days.setdefault(day, {}).setdefault(
+            mode, {"questions": {}, "kana": {}}
+        )
+        is_correct = bool(record.get("is_correct"))
+        counts = entry["questions"].setdefault(
+            record.get("char_type") or "other", [0, 0]
+        )
+        counts[0] += 1
+        counts[1] += is_correct
+        if mode in MODE_COLUMNS:
+            indices = self.table.record_indices(record)
+            for index, char_ok in zip(indices, record.get("char_results") or []):
+                if index < 0:
+                    continue
+                counts = entry["kana"].setdefault(self.table.hiragana[index], [0, 0])
+                counts[0] += 1
+                counts[1] += bool(char_ok)
+        self.records += 1
+
+    def merge(self, other: "Rollup") -> None:
+        for day, modes in other.days.items():
+            for mode, entry in modes.items():
+                mine = self.days.setdefault(day, {}).setdefault(
+                    mode, {"questions": {}, "kana": {}}
+                )
+                for group in ("questions", "kana"):
+                    for name, (attempts, correct) in entry[group].items():
+                        counts = mine[group].setdefault(name, [0, 0])
+                        counts[0] += attempts
+                        counts[1] += correct
+        self.records += other.records
+
+    def question_counts(self) -> Iterator[Tuple[date, str, str, int, int]]:
+        """(日期, 模式, 字符类型, 作答题数, 答对题数)"""
+        for day, modes in sorted(self.days.items()):
+            for mode, entry in modes.items():
+                for char_type, (attempts, correct) in entry["questions"].items():
+                    yield date.fromisoformat(day), mode, char_type, attempts, correct
+
+    def kana_counts(self) -> Iterator[Tuple[str, int, int, int]]:
+        """(模式, 五十音表位置, 作答次数, 答对次数)，各天合计"""
+        totals: Dict[Tuple[str, int], List[int]] = {}
+        for modes in self.days.values():
+            for mode, entry in modes.items():
+                for kana, (attempts, correct) in entry["kana"].items():
+                    counts = totals.setdefault(
+                        (mode, self.table.index_of_kana(kana)), [0, 0]
+                    )
+                    counts[0] += attempts
+                    counts[1] += correct
+        for (mode, index), (attempts, correct) in totals.items():
+            yield mode, index, attempts, correct
+
+    def to_bytes(self, **extra: Any) -> bytes:
+        data = {"version": _VERSION, "records": self.records, "days": self.days}
+        data.update(extra)
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode(
+            "utf-8"
+        )
+
+    @classmethod
+    def load(
+        cls, path: Union[str, Path], table: Optional[KanaTable] = None
+    ) -> "Rollup":
+        """读取汇总文件，不存在时返回空汇总"""
+        rollup = cls(table)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return rollup
+        if data.get("version") != _VERSION:
+            raise ValueError(f"不支持的汇总文件版本: {path}")
+        rollup.records = data["records"]
+        rollup.days = data["days"]
+        return rollup
+
+
+def rollup_path(results_path: Union[str, Path]) -> Path:
+    return Path(results_path).with_suffix(".rollup")
+
+
+def _pending_path(results_path: Union[str, Path]) -> Path:
+    path = rollup_path(results_path)
+    return path.with_name(path.name + ".pending")
+
+
+def recover(results_path: Union[str, Path]) -> None:
+    """处理上次被中断的压缩留下的待提交汇总
+
+    待提交汇总里记着压缩后新日志文件的 inode：记录文件已经是那个文件，
+    说明日志已替换，提交汇总；否则日志没有替换，丢弃汇总。
+    """
+    pending = _pending_path(results_path)
+    if not pending.exists():
+        return
+    with FileLock(results_path):
+        if not pending.exists():
+            return
+        with open(pending, "r", encoding="utf-8") as f:
+            expected = json.load(f).get("journal")
+        try:
+            stat = os.stat(results_path)
+            replaced = [stat.st_dev, stat.st_ino] == expected
+        except FileNotFoundError:
+            replaced = False
+        if replaced:
+            os.replace(pending, rollup_path(results_path))
+        else:
+            os.remove(pending)
+
+
+def load_rollup(
+    results_path: Union[str, Path], table: Optional[KanaTable] = None
+) -> Rollup:
+    """读取记录文件对应的汇总（先处理被中断的压缩）"""
+    recover(results_path)
+    return Rollup.load(rollup_path(results_path), table)
+
+
+class RetentionReport:
+    """一次压缩的结果"""
+
+    def __init__(self) -> None:
+        self.completed = False
+        self.rolled_up = 0  # 汇总后删除的原始记录数
+        self.bytes_before = 0  # 记录文件和汇总文件的总大小
+        self.bytes_after = 0
+        self.load_before = 0.0  # 读取全部记录、查询未复习错题的耗时（秒）
+        self.load_after = 0.0
+
+    def __str__(self) -> str:
+        if not self.completed:
+            return "记录文件在压缩期间被其他进程替换，本次未做修改"
+        reclaimed = self.bytes_before - self.bytes_after
+        speedup = self.load_before / self.load_after if self.load_after else 0.0
+        return (
+            f"汇总并删除 {self.rolled_up} 条原始记录，"
+            f"文件 {self.bytes_before / 1e6:.2f} MB → {self.bytes_after / 1e6:.2f} MB"
+            f"（回收 {reclaimed / 1e6:.2f} MB）\n"
+            f"读取记录和查询错题 {self.load_before * 1000:.0f} ms → "
+            f"{self.load_after * 1000:.0f} ms（{speedup:.1f} 倍）"
+        )
+
+
+def _file_size(*paths: Path) -> int:
+    return sum(path.stat().st_size for path in paths if path.exists())
+
+
+def _time_load(store: JournalResultStore) -> float:
+    """MistakeReviewer 和统计重建都要完整读一遍记录"""
+    start = time.perf_counter()
+    for _ in store.iter_records():
+        pass
+    for _ in store.iter_mistakes():
+        pass
+    return time.perf_counter() - start
+
+
+def compact_results(
+    store: JournalResultStore,
+    policy: RetentionPolicy,
+    now: Optional[float] = None,
+    measure: bool = True,
+) -> RetentionReport:
+    """按保留策略压缩记录文件，返回回收的空间和读取提速
+
+    可以随时中断：汇总先写成待提交文件并记下新日志的 inode，
+    日志在文件锁内原子替换，同一段锁内紧接着提交汇总；如果在两次改名之间中断，
+    下次运行、读取汇总或任何一次日志压缩之前（见 JournalResultStore），
+    recover 根据日志是否已替换提交或丢弃汇总，原始记录不会丢失，也不会重复计数。
+    与练习进程同时运行也是安全的，压缩期间追加的记录原样保留。
+    """
+    if not isinstance(store, JournalResultStore) or store.path.suffix == ".json":
+        raise ValueError("只支持 JSON 行日志格式的记录文件")
+    recover(store.path)
+    store.sync()
+    table = get_kana_table()
+    # 统计文件之后按增量更新；压缩前先确保它已包含全部历史
+    MasteryStats.open(
+        store.path.with_suffix(".stats"),
+        store.iter_records(),
+        table,
+        base=lambda: Rollup.load(rollup_path(store.path), table).kana_counts(),
+    )
+
+    report = RetentionReport()
+    paths = (store.path, rollup_path(store.path))
+    report.bytes_before = _file_size(*paths)
+    if measure:
+        report.load_before = _time_load(store)
+
+    reviewed = store.reviewed_questions()
+    cutoff = policy.cutoff(now)
+    rolled = Rollup(table)
+
+    def keep(record: Dict[str, Any]) -> bool:
+        try:
+            timestamp = float(record["timestamp"])
+        except (KeyError, TypeError, ValueError):
+            return True  # 没有有效时间的记录无法归到某一天，原样保留
+        if timestamp >= cutoff:
+            return True
+        if (
+            policy.keep_unreviewed
+            and not record.get("is_correct")
+            and record.get("question") not in reviewed
+        ):
+            return True
+        rolled.add(record)
+        return False
+
+    def commit(tmp_path: Path) -> None:
+        merged = Rollup.load(rollup_path(store.path), table)
+        merged.merge(rolled)
+        stat = os.stat(tmp_path)
+        atomic_write_bytes(
+            _pending_path(store.path),
+            merged.to_bytes(journal=[stat.st_dev, stat.st_ino]),
+        )
+
+    def promote() -> None:
+        os.replace(_pending_path(store.path), rollup_path(store.path))
+
+    report.completed = store.journal.compact(
+        keep=keep, before_replace=commit, after_replace=promote
+    )
+    recover(store.path)
+    if report.completed:
+        report.rolled_up = rolled.records
+    report.bytes_after = _file_size(*paths)
+    if measure:
+        report.load_after = _time_load(store)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按保留策略汇总并删除旧的答题记录")
+    parser.add_argument("--profile", help="学习者名称")
+    parser.add_argument("--data-dir", default=str(DATA_DIR), help="学习者数据目录")
+    parser.add_argument(
+        "--results", default="hiragana_quiz_results.jsonl", help="记录文件"
+    )
+    parser.add_argument(
+        "--reviewed", default="reviewed_mistakes.json", help="已复习题目文件"
+    )
+    parser.add_argument("--days", type=float, default=180, help="原始记录保留天数")
+    parser.add_argument(
+        "--drop-mistakes", action="store_true", help="未复习的旧错题也汇总删除"
+    )
+    args = parser.parse_args()
+
+    if args.profile:
+        store = open_profile_store(args.profile, args.data_dir)
+    else:
+        store = open_result_store(args.results, args.reviewed)
+    if not isinstance(store, JournalResultStore):
+        raise SystemExit("只支持 JSON 行日志格式的记录文件")
+    try:
+        print(
+            compact_results(store, RetentionPolicy(args.days, not args.drop_mistakes))
+        )
+    finally:
+        store.close()
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import sys
+from array import array
+from pathlib import Path
+from typing import IO, Iterable, List, Optional, Set, Union
+
+from utils import FileLock
+
+_KEY_SIZE = 8  # 每个键为 8 字节（小端 uint64）
+
+
+def question_key(question: str) -> int:
+    """题目的稳定短哈希（blake2b 的 64 位摘要）"""
+    digest = hashlib.blake2b(question.encode("utf-8"), digest_size=_KEY_SIZE).digest()
+    return int.from_bytes(digest, "little")
+
+
+class ReviewedSet:
+    """已复习题目的集合
+
+    以题目的 64 位哈希为键，保存在只追加的二进制日志中（每个键 8 字节）。
+    新标记先缓存在内存里，累计 flush_every 个或调用 flush/close 时一次追加写入，
+    所以一次复习答对 N 题只需 O(N) 的写入量，与已复习题目总数无关。
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        flush_every: int = 64,
+        legacy_file: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.legacy_file = Path(legacy_file) if legacy_file is not None else None
+        self._keys: Optional[Set[int]] = None  # 第一次查询时才读取日志
+        self._pending: List[int] = []
+        self._file_lock = FileLock(self.path)
+
+    @property
+    def keys(self) -> Set[int]:
+        if self._keys is None:
+            self._migrate()
+            self._keys = set(_read_keys(self.path))
+        return self._keys
+
+    def __contains__(self, question: object) -> bool:
+        return isinstance(question, str) and question_key(question) in self.keys
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, question: str) -> None:
+        self.update([question])
+
+    def update(self, questions: Iterable[str]) -> None:
+        keys = self.keys
+        for question in questions:
+            key = question_key(question)
+            if key not in keys:
+                keys.add(key)
+                self._pending.append(key)
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """把缓存的新标记追加写入日志"""
+        if not self._pending:
+            return
+        data = array("Q", self._pending)
+        if sys.byteorder != "little":
+            data.byteswap()
+        with self._file_lock:
+            with open(self.path, "ab") as f:
+                _truncate_torn_tail(f)
+                f.write(data.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        self._pending = []
+
+    def close(self) -> None:
+        self.flush()
+        self._file_lock.close()
+
+    def _migrate(self) -> None:
+        """导入旧版按题目字符串保存的 JSON 文件，导入后改名为 .bak"""
+        legacy = self.legacy_file
+        if legacy is None or not legacy.exists():
+            return
+        with self._file_lock:
+            if not legacy.exists():
+                return  # 其他进程已经导入
+            try:
+                with open(legacy, "r", encoding="utf-8") as f:
+                    questions = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                questions = []
+            data = array("Q", map(question_key, questions))
+            if sys.byteorder != "little":
+                data.byteswap()
+            with open(self.path, "ab") as out:
+                _truncate_torn_tail(out)
+                out.write(data.tobytes())
+                out.flush()
+                os.fsync(out.fileno())
+            legacy.replace(legacy.with_name(legacy.name + ".bak"))
+
+
+def _read_keys(path: Path) -> "array[int]":
+    if not path.exists():
+        return array("Q")
+    data = path.read_bytes()
+    keys = array("Q", data[: len(data) - len(data) % _KEY_SIZE])
+    if sys.byteorder != "little":
+        keys.byteswap()
+    return keys
+
+
+def _truncate_torn_tail(f: IO[bytes]) -> None:
+    """上次写入被中断留下的不足 8 字节的尾巴直接截掉（需持有文件锁）"""
+    size = f.seek(0, os.SEEK_END)
+    if size % _KEY_SIZE:
+        f.truncate(size - size % _KEY_SIZE)
@@ -0,0 +1,187 @@
+import math
+import random
+from array import array
+from typing import Iterable, List, Optional, Sequence
+
+# 可选的抽样方式
+SAMPLING_MODES = {"uniform": "均匀随机", "adaptive": "按错误率和久未练习加权"}
+
+
+class FenwickSampler:
+    """按权重抽样的树状数组（Fenwick 树）
+
+    修改单个权重和抽一次样都是 O(log n)，适合权重随作答不断变化的场景。
+    """
+
+    def __init__(self, weights: Iterable[float]) -> None:
+        self._weights = array("d", weights)
+        n = len(self._weights)
+        if any(w < 0 for w in self._weights):
+            raise ValueError("权重不能为负数")
+        # O(n) 建树：每个节点把自己的和加到父节点上
+        tree = array("d", bytes(8 * (n + 1)))
+        for i, w in enumerate(self._weights, 1):
+            tree[i] += w
+            parent = i + (i & -i)
+            if parent <= n:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._top = 1 << (n.bit_length() - 1) if n else 0  # 不超过 n 的最大 2 的幂
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    @property
+    def total(self) -> float:
+        return self.prefix_sum(len(self._weights))
+
+    def weight(self, i: int) -> float:
+        return self._weights[i]
+
+    def prefix_sum(self, end: int) -> float:
+        """前 end 个权重之和"""
+        total = 0.0
+        tree = self._tree
+        while end > 0:
+            total += tree[end]
+            end &= end - 1
+        return total
+
+    def set(self, i: int, weight: float) -> None:
+        """修改第 i 个权重"""
+        if weight < 0:
+            raise ValueError("权重不能为负数")
+        delta = weight - self._weights[i]
+        self._weights[i] = weight
+        n = len(self._weights)
+        tree = self._tree
+        i += 1
+        while i <= n:
+            tree[i] += delta
+            i += i & -i
+
+    def find(self, target: float) -> int:
+        """前缀和第一次超过 target 的位置，从树顶逐位下降"""
+        n = len(self._weights)
+        tree = self._tree
+        pos = 0
+        step = self._top
+        while step:
+            nxt = pos + step
+            if nxt <= n and tree[nxt] <= target:
+                pos = nxt
+                target -= tree[nxt]
+            step >>= 1
+        return min(pos, n - 1)  # 浮点误差可能越过最后一个位置
+
+    def sample(self, rng: Optional[random.Random] = None) -> int:
+        """按权重抽一个位置"""
+        uniform = (rng or random).random
+        total = self.total
+        if total <= 0:
+            raise ValueError("所有权重都为 0")
+        for _ in range(64):
+            i = self.find(uniform() * total)
+            if self._weights[i] > 0:  # 浮点误差可能落在权重为 0 的位置上
+                return i
+        # 剩下的只是累积的浮点误差，所有权重实际都为 0
+        raise ValueError("所有权重都为 0")
+
+    def sample_distinct(self, k: int, rng: Optional[random.Random] = None) -> List[int]:
+        """不放回地按权重抽 k 个位置（抽中的权重暂时置 0，抽完再恢复）"""
+        if k > len(self._weights):
+            raise ValueError("Sample larger than population")
+        picked: List[int] = []
+        saved: List[float] = []
+        try:
+            for _ in range(k):
+                if self.total <= 0:
+                    break
+                i = self.sample(rng)
+                picked.append(i)
+                saved.append(self._weights[i])
+                self.set(i, 0.0)
+        finally:
+            for i, weight in zip(picked, saved):
+                self.set(i, weight)
+        return picked
+
+
+class AdaptiveSampler:
+    """按错误率和久未练习程度加权抽样
+
+    权重 = (平滑错误率 + floor) × 2^(距上次作答的次数 / half_life) × boost，
+    久未练习的加成最多约 max_boost 倍，boost 为每个条目固定的额外加权（如答得慢）；错误率按 (答错 + 1) / (作答 + 2) 计算，
+    没做过的条目按 0.5 计。时间加成中所有条目共有的部分在抽样时约掉，
+    所以每次作答只需更新一个条目的权重（O(log n)）。时间加成相对于基准计算，
+    每隔封顶所需作答次数的 1/8 重新确定一次基准并整体重建：久未练习的部分
+    在基准处提前 1/8 封顶，基准之后作答的条目最多再低这 1/8，
+    因此任意两个条目的时间加成之比不超过 max_boost，数值也不会溢出。
+    """
+
+    def __init__(
+        self,
+        size: int,
+        attempts: Optional[Sequence[int]] = None,
+        correct: Optional[Sequence[int]] = None,
+        half_life: Optional[float] = None,
+        max_boost: float = 8.0,
+        floor: float = 0.05,
+        rng: Optional[random.Random] = None,
+        boost: Optional[Sequence[float]] = None,
+        last_seen: Optional[Sequence[float]] = None,
+    ) -> None:
+        self.attempts = array(
+            "I", attempts if attempts is not None else bytes(4 * size)
+        )
+        self.correct = array("I", correct if correct is not None else bytes(4 * size))
+        if len(self.attempts) != size or len(self.correct) != size:
+            raise ValueError("计数数组长度与条目数不一致")
+        self.boost = array("d", boost if boost is not None else [1.0] * size)
+        if len(self.boost) != size:
+            raise ValueError("加权数组长度与条目数不一致")
+        self.floor = floor
+        self.rng = rng
+        # 默认半衰期为条目数：大约每个条目都轮到一次后，久未练习的加成翻倍
+        self._rate = math.log(2) / (half_life if half_life else max(size, 1))
+        self._horizon = math.log(max_boost) / self._rate  # 加成封顶所需的作答次数
+        self._period = max(self._horizon / 8, 1.0)  # 重新确定基准的间隔
+        self._cap = max(self._horizon - self._period, 0.0)  # 相对基准的封顶值
+        self.clock = 0  # 已观察到的作答次数
+        # 上次作答的时刻，以当前为 0 按作答次数倒数（-3 表示 3 次作答之前，
+        # -inf 表示没作答过）；没有给出时按久未练习处理
+        if last_seen is not None:
+            self.last_seen = array("d", last_seen)
+            if len(self.last_seen) != size:
+                raise ValueError("作答时刻数组长度与条目数不一致")
+        else:
+            self.last_seen = array("d", [-self._horizon]) * size
+        self._anchor = 0
+        self._tree = FenwickSampler(self._weight(i) for i in range(size))
+
+    def __len__(self) -> int:
+        return len(self.attempts)
+
+    def _weight(self, i: int) -> float:
+        error = (self.attempts[i] - self.correct[i] + 1) / (self.attempts[i] + 2)
+        stale = min(self._anchor - self.last_seen[i], self._cap)
+        return (error + self.floor) * math.exp(self._rate * stale) * self.boost[i]
+
+    def observe(self, i: int, is_correct: bool) -> None:
+        """记录一次作答，更新该条目的权重"""
+        self.attempts[i] += 1
+        self.correct[i] += bool(is_correct)
+        self.clock += 1
+        self.last_seen[i] = self.clock
+        if self.clock - self._anchor >= self._period:
+            self._anchor = self.clock
+            self._tree = FenwickSampler(self._weight(j) for j in range(len(self)))
+        else:
+            self._tree.set(i, self._weight(i))
+
+    def sample(self, k: int) -> List[int]:
+        """不放回地抽 k 个条目的位置"""
+        return self._tree.sample_distinct(k, self.rng)
+
+    def weight(self, i: int) -> float:
+        return self._tree.weight(i)
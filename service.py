@@ -0,0 +1,484 @@
+"""无界面的测验服务
+
+基于 asyncio，通过本地 TCP / Unix socket 或标准输入输出收发 JSON 行，
+一个进程同时承载多个学习者的测验会话。请求示例：
+
+    {"op": "start", "engine": "kana", "mode": "hira_to_roma", "num_questions": 5}
+    {"op": "answer", "session": "1", "index": 0, "answer": "ka ki"}
+    {"op": "finish", "session": "1"}
+    {"op": "stats"}
+
+每个请求都返回一行 JSON，成功时带 "ok": true，失败时带 "error"。
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Hashable, List, Optional, Set, Tuple
+
+from kana_table import get_kana_table
+from main import HiraganaQuiz
+from main1 import Quiz
+from mistake import MistakeReviewer
+from stats import MasteryStats
+from store import ResultStore, open_result_store
+from timing import TimingLog, encode_rows
+
+
+class Session:
+    """一个测验会话，结束后放回会话池复用"""
+
+    __slots__ = (
+        "session_id",
+        "engine",
+        "items",
+        "answered",
+        "score",
+        "mode",
+        "char_type",
+        "latencies",
+        "prompted",
+        "owner",
+        "touched",
+    )
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.session_id = ""
+        self.engine = ""
+        self.items: List[Any] = []  # QuizItem 或复习/行列练习的字典题目
+        self.answered: List[bool] = []
+        self.score = 0
+        self.mode = ""
+        self.char_type = ""
+        self.latencies: List[float] = []  # 每个请求的处理耗时（秒）
+        self.prompted = 0  # 题目发出或上一题作答时的单调时钟（纳秒）
+        self.owner: Optional[Hashable] = None  # 开启会话的连接
+        self.touched = 0.0  # 最近一次请求的单调时钟（秒）
+
+    def latency_stats(self) -> Dict[str, Any]:
+        """请求处理耗时统计（毫秒）"""
+        if not self.latencies:
+            return {"count": 0}
+        ordered = sorted(self.latencies)
+        n = len(ordered)
+        return {
+            "count": n,
+            "mean_ms": sum(ordered) / n * 1000,
+            "p50_ms": ordered[n // 2] * 1000,
+            "p95_ms": ordered[min(n - 1, int(n * 0.95))] * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
+
+
+class SessionPool:
+    """会话池：限制同时进行的会话数，并复用已结束的会话对象
+
+    没有 finish 的会话也会回收：连接断开时释放它开启的全部会话（release_owner），
+    超过 idle_ttl 秒没有请求的会话在下次开启或访问会话时释放。
+    """
+
+    def __init__(
+        self, max_sessions: int = 10000, idle_ttl: Optional[float] = 1800.0
+    ) -> None:
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl  # None 表示不按空闲时间回收
+        # 按最近一次请求排序，最久没有请求的在最前面
+        self.active: "OrderedDict[str, Session]" = OrderedDict()
+        self._owned: Dict[Hashable, Set[str]] = {}
+        self._free: List[Session] = []
+        self._next_id = 0
+
+    def acquire(self, owner: Optional[Hashable] = None) -> Session:
+        self.expire()
+        if len(self.active) >= self.max_sessions:
+            raise RuntimeError("会话数已达上限")
+        session = self._free.pop() if self._free else Session()
+        self._next_id += 1
+        session.session_id = str(self._next_id)
+        session.owner = owner
+        session.touched = time.monotonic()
+        self.active[session.session_id] = session
+        if owner is not None:
+            self._owned.setdefault(owner, set()).add(session.session_id)
+        return session
+
+    def get(self, session_id: str) -> Session:
+        self.expire()
+        try:
+            session = self.active[session_id]
+        except KeyError:
+            raise KeyError(f"未知会话: {session_id}") from None
+        session.touched = time.monotonic()
+        self.active.move_to_end(session_id)
+        return session
+
+    def release(self, session: Session) -> None:
+        del self.active[session.session_id]
+        owned = self._owned.get(session.owner) if session.owner is not None else None
+        if owned is not None:
+            owned.discard(session.session_id)
+            if not owned:
+                del self._owned[session.owner]
+        session.reset()
+        self._free.append(session)
+
+    def release_owner(self, owner: Hashable) -> int:
+        """释放某个连接开启的全部会话，返回释放的会话数"""
+        session_ids = self._owned.pop(owner, set())
+        for session_id in session_ids:
+            self.release(self.active[session_id])
+        return len(session_ids)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """释放空闲超过 idle_ttl 秒的会话，返回释放的会话数"""
+        if self.idle_ttl is None:
+            return 0
+        deadline = (time.monotonic() if now is None else now) - self.idle_ttl
+        count = 0
+        while self.active:
+            session = next(iter(self.active.values()))
+            if session.touched > deadline:
+                break
+            self.release(session)
+            count += 1
+        return count
+
+
+class ResultWriter:
+    """批量写入答题记录：攒够 batch_size 条或等待 flush_interval 秒后写一次"""
+
+    def __init__(
+        self,
+        store: ResultStore,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        stats: Optional[MasteryStats] = None,
+        stats_file: Optional[Path] = None,
+        timing: Optional[TimingLog] = None,
+    ) -> None:
+        self.store = store
+        self.stats = stats  # 逐字掌握统计，随写入的记录一起更新
+        self.stats_file = stats_file
+        self.timing = timing  # 作答计时侧列
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: "asyncio.Queue[Tuple[str, Dict[str, Any]]]" = asyncio.Queue()
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def put_record(self, record: Dict[str, Any]) -> None:
+        self.queue.put_nowait(("record", record))
+
+    def put_reviewed(self, question: str) -> None:
+        self.queue.put_nowait(("reviewed", {"question": question}))
+
+    def put_timing(self, rows: bytes) -> None:
+        self.queue.put_nowait(("timing", {"rows": rows}))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await loop.run_in_executor(None, self._write, batch)
+            except Exception as e:
+                print(f"写入答题记录失败: {e}", file=sys.stderr)
+            for _ in batch:
+                self.queue.task_done()
+
+    def _write(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        records = [payload for kind, payload in batch if kind == "record"]
+        reviewed = [
+            payload["question"] for kind, payload in batch if kind == "reviewed"
+        ]
+        if records:
+            self.store.append(records)
+            if self.stats is not None and self.stats_file is not None:
+                self.stats.update(records)
+                self.stats.save(self.stats_file)
+        if reviewed:
+            self.store.mark_reviewed(reviewed)
+        self.store.sync()
+        if self.timing is not None:
+            self.timing.append(
+                b"".join(payload["rows"] for kind, payload in batch if kind == "timing")
+            )
+
+    async def close(self) -> None:
+        await self.queue.join()
+        if self._task is not None:
+            self._task.cancel()
+
+
+class QuizService:
+    """把 HiraganaQuiz、Quiz、MistakeReviewer 作为出题和判题引擎的测验服务"""
+
+    def __init__(
+        self,
+        store: ResultStore,
+        max_sessions: int = 10000,
+        idle_ttl: Optional[float] = 1800.0,
+    ) -> None:
+        get_kana_table()  # 预先加载五十音表，所有会话共用
+        self.store = store
+        self.kana = HiraganaQuiz(store.path, store=store)
+        self.rows = Quiz()
+        self.reviewer = MistakeReviewer(str(store.path), store=store)  # 只用于判题
+        self.pool = SessionPool(max_sessions, idle_ttl)
+        self.writer = ResultWriter(
+            store,
+            stats=self.kana.stats,
+            stats_file=self.kana.stats_file,
+            timing=self.kana.timing,
+        )
+
+    async def start(self) -> None:
+        self.writer.start()
+
+    async def close(self) -> None:
+        await self.writer.close()
+        self.store.close()
+
+    def handle(
+        self, request: Dict[str, Any], owner: Optional[Hashable] = None
+    ) -> Dict[str, Any]:
+        """处理一个请求并返回响应，owner 为发来请求的连接"""
+        op = request.get("op")
+        if op == "start":
+            return self._start(request, owner)
+        if op == "answer":
+            return self._answer(request)
+        if op == "finish":
+            return self._finish(request)
+        if op == "stats":
+            return self._stats(request)
+        raise ValueError(f"Unknown op: {op}")
+
+    def review_items(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """读取未复习的错题作为复习题，每次用新的 MistakeReviewer，会话之间互不影响"""
+        reviewer = MistakeReviewer(
+            str(self.store.path), store=self.store, mode=request.get("mode")
+        )
+        return reviewer.generate_review_questions()
+
+    def _start(
+        self,
+        request: Dict[str, Any],
+        owner: Optional[Hashable] = None,
+        review_items: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        engine = request.get("engine", "kana")
+        items: List[Any]
+        if engine == "kana":
+            mode = request.get("mode", "hira_to_roma")
+            char_type = request.get("char_type", "all")
+            items = self.kana.generate_quiz_items(
+                int(request.get("num_questions", 5)),
+                mode,
+                int(request.get("chars_per_question", 2)),
+                char_type,
+            )
+        elif engine == "rows":
+            mode_choice = int(request.get("mode_choice", 0))
+            mode, char_type = self.rows.modes[mode_choice], "basic"
+            items = self.rows._gen_quiz_items(
+                mode_choice, int(request.get("row_choice", 0))
+            )
+        elif engine == "review":
+            if review_items is None:
+                review_items = self.review_items(request)
+            items = review_items
+            mode, char_type = request.get("mode") or "", ""
+        else:
+            raise ValueError(f"Unknown engine: {engine}")
+
+        session = self.pool.acquire(owner)
+        session.engine = engine
+        session.items = items
+        session.answered = [False] * len(items)
+        session.mode = mode
+        session.char_type = char_type
+        session.prompted = time.perf_counter_ns()
+        return {
+            "session": session.session_id,
+            "questions": [item["question"] for item in items],
+        }
+
+    def _answer(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        session = self.pool.get(str(request["session"]))
+        index = int(request["index"])
+        if not 0 <= index < len(session.items):
+            # 负数下标在列表上也能取到题目，这里必须显式拒绝
+            raise IndexError(f"题号超出范围: {index}")
+        item = session.items[index]
+        if session.answered[index]:
+            raise ValueError(f"第 {index} 题已作答")
+        user_answer = str(request.get("answer", "")).strip().lower()
+        # 题目一次全部发出，每题耗时从上一题作答（或发题）算起
+        now = time.perf_counter_ns()
+        latency_ns, session.prompted = now - session.prompted, now
+
+        if session.engine == "kana":
+            is_correct = self.kana.check_answer(item, user_answer)
+            record = self.kana.make_record(
+                item, user_answer, is_correct, session.mode, session.char_type
+            )
+            self.writer.put_record(record)
+            self.writer.put_timing(
+                encode_rows(
+                    item.indices,
+                    record["mode"],
+                    record["char_results"],
+                    float(record["timestamp"]),
+                    latency_ns,
+                )
+            )
+            correct_answer = item["answer"]
+        elif session.engine == "rows":
+            is_correct = self.rows.check_answer(item, user_answer)
+            correct_answer = item["answer"]
+        else:
+            is_correct = self.reviewer.check_answer(item, user_answer)
+            if is_correct:
+                self.writer.put_reviewed(item["question"])
+            correct_answer = " ".join(item["answer"])
+
+        session.answered[index] = True
+        session.score += is_correct
+        return {"is_correct": is_correct, "correct_answer": correct_answer}
+
+    def _finish(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        session = self.pool.get(str(request["session"]))
+        response = {
+            "score": session.score,
+            "total": len(session.items),
+            "latency": session.latency_stats(),
+        }
+        self.pool.release(session)
+        return response
+
+    def _stats(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if "session" in request:
+            return {"latency": self.pool.get(str(request["session"])).latency_stats()}
+        self.pool.expire()
+        return {
+            "active_sessions": len(self.pool.active),
+            "pending_writes": self.writer.queue.qsize(),
+            "sessions": {
+                sid: session.latency_stats()
+                for sid, session in self.pool.active.items()
+            },
+        }
+
+    async def handle_line(self, line: bytes, owner: Optional[Hashable] = None) -> bytes:
+        """处理一行 JSON 请求，返回一行 JSON 响应"""
+        start = time.perf_counter()
+        request: Dict[str, Any] = {}
+        try:
+            request = json.loads(line)
+            if request.get("op") == "start" and request.get("engine") == "review":
+                # 查询错题要扫描整个记录文件，放到线程池中执行，不阻塞其他会话
+                loop = asyncio.get_running_loop()
+                items = await loop.run_in_executor(None, self.review_items, request)
+                response = {"ok": True, **self._start(request, owner, items)}
+            else:
+                response = {"ok": True, **self.handle(request, owner)}
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        if "id" in request:
+            response["id"] = request["id"]
+
+        session_id = request.get("session", response.get("session"))
+        session = self.pool.active.get(str(session_id))
+        if session is not None:
+            session.latencies.append(time.perf_counter() - start)
+        return json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n"
+
+    async def serve_stream(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """处理一个连接上的全部请求，连接断开时释放它开启的会话"""
+        try:
+            while line := await reader.readline():
+                if line.strip():
+                    writer.write(await self.handle_line(line, writer))
+                    await writer.drain()
+        finally:
+            self.pool.release_owner(writer)
+            writer.close()
+
+
+async def serve_stdio(service: QuizService, out: BinaryIO) -> None:
+    """通过标准输入输出收发请求"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), sys.stdin
+    )
+    while line := await reader.readline():
+        if line.strip():
+            out.write(await service.handle_line(line))
+            out.flush()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="无界面的五十音测验服务")
+    parser.add_argument("--results", default="hiragana_quiz_results.jsonl")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="监听 Unix socket 路径")
+    parser.add_argument("--stdio", action="store_true", help="使用标准输入输出")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument(
+        "--idle-ttl", type=float, default=1800, help="空闲多少秒后回收会话"
+    )
+    args = parser.parse_args()
+    out = sys.stdout.buffer
+    if args.stdio:
+        sys.stdout = sys.stderr  # 标准输出只用于响应，引擎的提示信息改到标准错误
+
+    service = QuizService(
+        open_result_store(args.results), args.max_sessions, args.idle_ttl
+    )
+    await service.start()
+    try:
+        if args.stdio:
+            await serve_stdio(service, out)
+            return
+
+        if args.unix:
+            server = await asyncio.start_unix_server(service.serve_stream, args.unix)
+        else:
+            server = await asyncio.start_server(
+                service.serve_stream, args.host, args.port
+            )
+        async with server:
+            print(f"测验服务已启动: {args.unix or f'{args.host}:{args.port}'}")
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,207 @@
+import heapq
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from journal import ResultJournal
+from utils import atomic_write_bytes
+
+DAY = 24 * 60 * 60
+
+
+def state_path(results_file: Union[str, Path]) -> Path:
+    """记录文件对应的调度状态文件，放在记录文件旁边，不同记录文件的错题互不混用
+
+    默认记录文件沿用原来的 srs_state.jsonl。
+    """
+    results_file = Path(results_file)
+    if results_file.name == "hiragana_quiz_results.jsonl":
+        return results_file.with_name("srs_state.jsonl")
+    return results_file.with_suffix(".srs")
+
+
+class ReviewState:
+    """一道题的复习状态（SM-2）"""
+
+    __slots__ = ("key", "interval", "ease", "reps", "due", "payload")
+
+    def __init__(
+        self,
+        key: str,
+        payload: Dict[str, Any],
+        due: float,
+        interval: float = 0.0,
+        ease: float = 2.5,
+        reps: int = 0,
+    ) -> None:
+        self.key = key
+        self.payload = payload  # 题目、正确答案、模式等，用于重新出题
+        self.due = due  # 下次复习时间（时间戳）
+        self.interval = interval  # 复习间隔（天）
+        self.ease = ease  # 难度系数
+        self.reps = reps  # 连续答对次数
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "payload": self.payload,
+            "due": self.due,
+            "interval": self.interval,
+            "ease": self.ease,
+            "reps": self.reps,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReviewState":
+        return cls(
+            data["key"],
+            data["payload"],
+            data["due"],
+            data["interval"],
+            data["ease"],
+            data["reps"],
+        )
+
+
+class SpacedRepetitionScheduler:
+    """间隔重复调度器
+
+    状态变更追加写入 JSON 行日志，第一次使用时按顺序回放（后写的覆盖先写的）。
+    到期时间保存在最小堆中，过期的堆元素在弹出时丢弃，
+    因此取前 k 道到期题目只需 O(k log n)。
+    """
+
+    def __init__(self, path: Union[str, Path] = "srs_state.jsonl") -> None:
+        self.path = Path(path)
+        self.journal = ResultJournal(self.path)
+        # 从记录文件导入错题读到的位置，见 load_cursor / save_cursor
+        self.cursor_file = self.path.with_name(self.path.name + ".cursor")
+        self._states: Optional[Dict[str, ReviewState]] = None
+        self._heap: List[Tuple[float, str]] = []
+        self._log_lines = 0
+
+    @property
+    def states(self) -> Dict[str, ReviewState]:
+        """所有题目的复习状态，第一次访问时从日志回放"""
+        if self._states is None:
+            states: Dict[str, ReviewState] = {}
+            for data in self.journal.iter_records():
+                state = ReviewState.from_dict(data)
+                states[state.key] = state
+                self._log_lines += 1
+            self._heap = [(state.due, state.key) for state in states.values()]
+            heapq.heapify(self._heap)
+            self._states = states
+        return self._states
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.states
+
+    def _save(self, state: ReviewState) -> None:
+        heapq.heappush(self._heap, (state.due, state.key))
+        self.journal.append([state.to_dict()])
+        self._log_lines += 1
+
+    def add(
+        self, key: str, payload: Dict[str, Any], now: Optional[float] = None
+    ) -> ReviewState:
+        """加入一道新题，立即到期；已存在时只返回原状态"""
+        if key in self.states:
+            return self.states[key]
+        state = ReviewState(key, payload, time.time() if now is None else now)
+        self.states[key] = state
+        self._save(state)
+        return state
+
+    def review(
+        self, key: str, quality: int, now: Optional[float] = None
+    ) -> ReviewState:
+        """按 SM-2 更新复习状态，quality 取 0-5，3 分以上算记住"""
+        now = time.time() if now is None else now
+        state = self.states[key]
+        if quality < 3:
+            state.reps = 0
+            state.interval = 1
+        else:
+            if state.reps == 0:
+                state.interval = 1
+            elif state.reps == 1:
+                state.interval = 6
+            else:
+                state.interval = round(state.interval * state.ease, 2)
+            state.reps += 1
+        state.ease = max(
+            1.3, state.ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        )
+        state.due = now + state.interval * DAY
+        self._save(state)
+        return state
+
+    def review_answer(
+        self, key: str, is_correct: bool, now: Optional[float] = None
+    ) -> ReviewState:
+        """按答对/答错更新复习状态"""
+        return self.review(key, 4 if is_correct else 1, now)
+
+    def load_cursor(self, source: Union[str, Path]) -> Optional[str]:
+        """上次从记录文件 source 导入错题读到的游标，没有导入过时返回 None"""
+        try:
+            with open(self.cursor_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if data.get("source") != str(source):
+            return None  # 换了记录文件，从头导入
+        cursor: Optional[str] = data.get("cursor")
+        return cursor
+
+    def save_cursor(self, source: Union[str, Path], cursor: Optional[str]) -> None:
+        data = {"source": str(source), "cursor": cursor}
+        atomic_write_bytes(self.cursor_file, json.dumps(data).encode("utf-8"))
+
+    def due(
+        self,
+        limit: int,
+        now: Optional[float] = None,
+        mode: Optional[str] = None,
+        since: Optional[float] = None,
+    ) -> List[ReviewState]:
+        """按到期时间取前 limit 道已到期的题目
+
+        可按练习模式过滤，since 只取答错时间在该时间戳之后的题目。
+        """
+        now = time.time() if now is None else now
+        states = self.states
+        picked: List[ReviewState] = []
+        skipped: List[Tuple[float, str]] = []
+        while self._heap and len(picked) < limit and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            state = states.get(entry[1])
+            if state is None or state.due != entry[0]:
+                continue  # 状态已更新，丢弃旧的堆元素
+            skipped.append(entry)
+            if (mode is None or state.payload.get("mode") == mode) and (
+                since is None or float(state.payload.get("timestamp", 0)) >= since
+            ):
+                picked.append(state)
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        return picked
+
+    def sync(self) -> None:
+        self.journal.sync()
+
+    def close(self) -> None:
+        """关闭日志；日志行数远多于题目数时压缩为每题一行
+
+        压缩按日志文件的内容进行（同一题只保留最后一条），
+        不会丢掉其他进程同时写入的状态。
+        """
+        if self._states is not None and self._log_lines > 4 * len(self._states) + 1000:
+            if self.journal.compact(key="key"):
+                self._log_lines = len(self._states)
+        self.journal.close()
@@ -0,0 +1,163 @@
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from kana_table import MODE_COLUMNS, KanaTable, get_kana_table
+from utils import FileLock, atomic_write_bytes
+
+MODES = tuple(MODE_COLUMNS)
+
+_MAGIC = b"MJST"
+_HEADER = struct.Struct("<4sII")  # 魔数、字符数、模式数
+
+
+class MasteryStats:
+    """每个假名在每种练习模式下的作答次数和答对次数
+
+    计数保存在按 (五十音表位置, 模式) 排列的紧凑数组里，随新记录增量更新，
+    查询只与字母表大小有关，与历史记录长短无关。
+    """
+
+    def __init__(self, table: Optional[KanaTable] = None) -> None:
+        self.table = table if table is not None else get_kana_table()
+        size = len(self.table) * len(MODES)
+        self.attempts = array("I", bytes(4 * size))
+        self.correct = array("I", bytes(4 * size))
+        # 上次读取或保存时文件中的计数，保存时只把之后的增量合并进文件
+        self._saved_attempts = array("I", self.attempts)
+        self._saved_correct = array("I", self.correct)
+
+    def update(self, records: Iterable[Dict[str, Any]]) -> None:
+        """用新的答题记录累加计数（只统计带逐字结果的记录）"""
+        for record in records:
+            mode = record.get("mode")
+            if mode not in MODE_COLUMNS or "char_results" not in record:
+                continue
+            m = MODES.index(mode)
+            indices = self.table.record_indices(record)
+            for index, is_correct in zip(indices, record["char_results"]):
+                if index < 0:
+                    continue
+                slot = index * len(MODES) + m
+                self.attempts[slot] += 1
+                self.correct[slot] += bool(is_correct)
+
+    def accuracy(self, mode: Optional[str] = None) -> List[Tuple[str, int, int]]:
+        """每个假名的 (平假名, 作答次数, 答对次数)，mode 为 None 时合计所有模式"""
+        modes = range(len(MODES)) if mode is None else [MODES.index(mode)]
+        result = []
+        for i, hira in enumerate(self.table.hiragana):
+            base = i * len(MODES)
+            attempts = sum(self.attempts[base + m] for m in modes)
+            correct = sum(self.correct[base + m] for m in modes)
+            result.append((hira, attempts, correct))
+        return result
+
+    def weakest(
+        self, n: int = 10, mode: Optional[str] = None
+    ) -> List[Tuple[str, int, int]]:
+        """答错次数最多的 n 个假名"""
+        rows = [row for row in self.accuracy(mode) if row[1]]
+        rows.sort(key=lambda row: (row[1] - row[2], -row[2]), reverse=True)
+        return rows[:n]
+
+    def save(self, path: Union[str, Path]) -> None:
+        """保存统计；其他进程期间也保存过时，把本进程的增量加到文件中的计数上"""
+        with FileLock(path):
+            disk = MasteryStats.load(path, self.table)
+            if disk is not None and (
+                disk.attempts != self._saved_attempts
+                or disk.correct != self._saved_correct
+            ):
+                for counts, saved, on_disk in (
+                    (self.attempts, self._saved_attempts, disk.attempts),
+                    (self.correct, self._saved_correct, disk.correct),
+                ):
+                    for i, value in enumerate(counts):
+                        counts[i] = on_disk[i] + value - saved[i]
+            self._write(path)
+
+    def _write(self, path: Union[str, Path]) -> None:
+        header = _HEADER.pack(_MAGIC, len(self.table), len(MODES))
+        atomic_write_bytes(
+            path, header + self.attempts.tobytes() + self.correct.tobytes()
+        )
+        self._saved_attempts = array("I", self.attempts)
+        self._saved_correct = array("I", self.correct)
+
+    @classmethod
+    def load(
+        cls, path: Union[str, Path], table: Optional[KanaTable] = None
+    ) -> Optional["MasteryStats"]:
+        """读取统计文件；文件不存在或与五十音表不匹配时返回 None"""
+        stats = cls(table)
+        path = Path(path)
+        if not path.exists():
+            return None
+        data = path.read_bytes()
+        if len(data) < _HEADER.size:
+            return None
+        magic, rows, modes = _HEADER.unpack_from(data)
+        size = len(stats.attempts) * stats.attempts.itemsize
+        if (magic, rows, modes) != (_MAGIC, len(stats.table), len(MODES)):
+            return None
+        if len(data) != _HEADER.size + 2 * size:
+            return None
+        stats.attempts = array("I", data[_HEADER.size : _HEADER.size + size])
+        stats.correct = array("I", data[_HEADER.size + size :])
+        stats._saved_attempts = array("I", stats.attempts)
+        stats._saved_correct = array("I", stats.correct)
+        return stats
+
+    def add_counts(self, counts: Iterable[Tuple[str, int, int, int]]) -> None:
+        """累加 (模式, 五十音表位置, 作答次数, 答对次数)，如保留策略汇总掉的旧记录"""
+        for mode, index, attempts, correct in counts:
+            if mode not in MODES:
+                continue
+            slot = index * len(MODES) + MODES.index(mode)
+            self.attempts[slot] += attempts
+            self.correct[slot] += correct
+
+    @classmethod
+    def open(
+        cls,
+        path: Union[str, Path],
+        records: Iterable[Dict[str, Any]],
+        table: Optional[KanaTable] = None,
+        base: Optional[Callable[[], Iterable[Tuple[str, int, int, int]]]] = None,
+    ) -> "MasteryStats":
+        """读取统计文件，没有时从历史记录重建一次
+
+        重建在文件锁内进行并再次检查，多个进程同时启动时只有一个会重建。
+        base 只在重建时调用，给出已不在历史记录中的计数（见 add_counts），
+        如 retention.load_rollup(...).kana_counts。
+        调用方应在追加新记录之前打开统计，新记录再通过 update 累加。
+        """
+        stats = cls.load(path, table)
+        if stats is None:
+            with FileLock(path):
+                stats = cls.load(path, table)
+                if stats is None:
+                    stats = cls(table)
+                    if base is not None:
+                        stats.add_counts(base())
+                    stats.update(records)
+                    stats._write(path)
+        return stats
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "hiragana_quiz_results.stats"
+    stats = MasteryStats.load(path)
+    if stats is None:
+        raise SystemExit(f"未找到统计文件: {path}")
+
+    for mode in MODES:
+        weakest = stats.weakest(5, mode)
+        if not weakest:
+            continue
+        print(f"=== {mode} 最常答错 ===")
+        for hira, attempts, correct in weakest:
+            print(f"{hira}: 错 {attempts - correct} / 共 {attempts}")
@@ -0,0 +1,469 @@
+import json
+import re
+import sys
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Container,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from journal import ResultJournal, StaleCursorError
+from reviewed import ReviewedSet
+
+if TYPE_CHECKING:
+    import sqlite3
+from utils import iter_json_array, load_result_data
+
+# 答题记录中单独成列的字段，其余字段存入 extra
+RESULT_FIELDS = (
+    "question",
+    "user_answer",
+    "correct_answer",
+    "is_correct",
+    "mode",
+    "char_type",
+    "timestamp",
+    "is_review",
+)
+
+# 按学习者分片时的数据目录：data/<profile>/results.jsonl 等
+DATA_DIR = Path("data")
+_PROFILE_NAME = re.compile(r"^[\w-][\w.-]*$")
+
+
+def _record_key(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    """判断两条记录是否相同；SQLite 存储读出的时间戳是浮点数"""
+    timestamp: Any = record.get("timestamp")
+    try:
+        timestamp = float(timestamp)
+    except (TypeError, ValueError):
+        pass
+    return timestamp, record.get("question"), record.get("user_answer")
+
+
+class ResultStore(ABC):
+    """答题记录存储接口，HiraganaQuiz 与 MistakeReviewer 共用"""
+
+    path: Path  # 记录文件路径
+    cursor: Optional[str] = None  # iter_new_records 读到的位置
+
+    @abstractmethod
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        """追加答题记录，返回写入条数"""
+
+    @abstractmethod
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        """按写入顺序遍历全部记录"""
+
+    @abstractmethod
+    def unreviewed_mistakes(
+        self, mode: Optional[str] = None, char_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """查询未复习的错题，可按模式和字符类型过滤"""
+
+    def iter_new_records(
+        self, cursor: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """产出游标之后追加的记录，遍历结束后 self.cursor 指向已读到的位置
+
+        cursor 为 None 时从头读取；记录被重写导致游标失效时抛出 StaleCursorError，
+        调用方应丢弃据旧游标算出的结果并从头读取。默认实现的游标是已读条数，
+        仍需遍历前面的记录，子类可以按偏移或行号直接定位。
+        """
+        skip = int(cursor) if cursor is not None else 0
+        count = 0
+        for record in self.iter_records():
+            count += 1
+            if count > skip:
+                yield record
+        if count < skip:
+            raise StaleCursorError(self.path)
+        self.cursor = str(count)
+
+    def iter_mistakes(
+        self,
+        mode: Optional[str] = None,
+        char_type: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """按写入顺序逐条产出未复习的错题
+
+        since 只保留该时间戳之后的记录，limit 取够条数后立即停止读取。
+        """
+        if limit is not None and limit <= 0:
+            return
+        reviewed = self.reviewed_questions()
+        count = 0
+        for item in self.iter_records():
+            if (
+                item["is_correct"]
+                or item["question"] in reviewed
+                or (mode is not None and item["mode"] != mode)
+                or (char_type is not None and item["char_type"] != char_type)
+                or (since is not None and float(item["timestamp"]) < since)
+            ):
+                continue
+            yield item
+            count += 1
+            if count == limit:
+                return
+
+    @abstractmethod
+    def reviewed_questions(self) -> Container[str]:
+        """已复习的题目（支持 in 判断）"""
+
+    @abstractmethod
+    def mark_reviewed(self, questions: Iterable[str]) -> None:
+        """把题目标记为已复习"""
+
+    def sync(self) -> None:
+        """把缓冲的写入落盘"""
+
+    def close(self) -> None:
+        """关闭存储"""
+        self.sync()
+
+    def migrate(self, legacy_file: Union[str, Path]) -> int:
+        """导入旧版 JSON 数组格式的记录文件，导入后改名为 .bak
+
+        上次导入在写入后、改名前中断时，记录已经在存储里，跳过已存在的记录避免重复。
+        """
+        legacy_file = Path(legacy_file)
+        if not legacy_file.exists():
+            return 0
+
+        legacy = load_result_data(legacy_file)
+        existing = Counter(_record_key(record) for record in self.iter_records())
+        pending = []
+        for record in legacy:
+            key = _record_key(record)
+            if existing[key]:
+                existing[key] -= 1
+            else:
+                pending.append(record)
+        count = self.append(pending)
+        self.sync()
+        legacy_file.replace(legacy_file.with_name(legacy_file.name + ".bak"))
+        return count
+
+
+class JournalResultStore(ResultStore):
+    """基于追加日志的存储，已复习题目保存在单独的 JSON 文件中"""
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        reviewed_file: Union[str, Path] = "reviewed_mistakes.json",
+    ) -> None:
+        self.path = Path(path)
+        self.reviewed_file = Path(reviewed_file)
+        self.journal = ResultJournal(self.path)
+        # 任何压缩（包括追加触发的后台压缩）都会换掉日志文件，之前先提交或丢弃
+        # 保留策略上次中断的压缩留下的待提交汇总，否则它会因日志已换而被丢弃
+        self.journal.before_compact = self._recover_rollup
+        if self.reviewed_file.suffix == ".json":
+            # 旧版按题目字符串保存的 JSON 文件，第一次查询时导入哈希日志
+            self.reviewed = ReviewedSet(
+                self.reviewed_file.with_suffix(".hashes"), legacy_file=reviewed_file
+            )
+        else:
+            self.reviewed = ReviewedSet(self.reviewed_file)
+
+    def _recover_rollup(self) -> None:
+        from retention import recover  # retention 依赖本模块，用到时再导入
+
+        recover(self.path)
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        if self.path.suffix == ".json":
+            raise ValueError(f"旧版 JSON 记录文件只读: {self.path}")
+        return self.journal.append(records)
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        if self.path.suffix == ".json":
+            # 兼容旧版 JSON 数组格式，逐个元素解析
+            yield from iter_json_array(self.path)
+        else:
+            yield from self.journal.iter_records()
+
+    def iter_new_records(
+        self, cursor: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """游标为日志的字节偏移，只读取新追加的部分"""
+        if self.path.suffix == ".json":
+            yield from super().iter_new_records(cursor)
+            return
+        yield from self.journal.iter_new_records(cursor)
+        self.cursor = self.journal.cursor
+
+    def unreviewed_mistakes(
+        self, mode: Optional[str] = None, char_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return list(self.iter_mistakes(mode, char_type))
+
+    def iter_mistakes(
+        self,
+        mode: Optional[str] = None,
+        char_type: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        if not self.path.exists():
+            raise FileNotFoundError(self.path)
+        return super().iter_mistakes(mode, char_type, since, limit)
+
+    def reviewed_questions(self) -> ReviewedSet:
+        return self.reviewed
+
+    def mark_reviewed(self, questions: Iterable[str]) -> None:
+        """标记先缓存在内存里，sync/close 或攒够一批时追加写入"""
+        self.reviewed.update(questions)
+
+    def sync(self) -> None:
+        self.journal.sync()
+        self.reviewed.flush()
+
+    def close(self) -> None:
+        self.journal.close()
+        self.reviewed.close()
+
+
+class SQLiteResultStore(ResultStore):
+    """嵌入式 SQLite 存储，错题查询走索引而不是全表扫描"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS results (
+        id INTEGER PRIMARY KEY,
+        question TEXT NOT NULL,
+        user_answer TEXT NOT NULL,
+        correct_answer TEXT NOT NULL,
+        is_correct INTEGER NOT NULL,
+        mode TEXT NOT NULL,
+        char_type TEXT NOT NULL,
+        timestamp REAL NOT NULL,
+        is_review INTEGER NOT NULL DEFAULT 0,
+        reviewed INTEGER NOT NULL DEFAULT 0,
+        extra TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_results_mistakes
+        ON results (is_correct, reviewed, mode, char_type, timestamp);
+    CREATE INDEX IF NOT EXISTS idx_results_question ON results (question);
+    """
+    FETCH_SIZE = 256  # 迭代读取时每次持锁取出的行数
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        import sqlite3  # 只在使用 SQLite 存储时导入，缩短启动时间
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> int:
+        rows = [_to_row(record) for record in records]
+        with self._lock:
+            self.conn.executemany(
+                "INSERT INTO results (question, user_answer, correct_answer,"
+                " is_correct, mode, char_type, timestamp, is_review, extra)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def _iter_rows(
+        self, sql: str, params: Sequence[Any] = ()
+    ) -> Iterator["sqlite3.Row"]:
+        """分批读取按 id 排序的查询结果，只读到开始查询时已有的行
+
+        连接由答题服务的写入线程和读取错题的线程共用：执行查询和每批读取都持有锁，
+        但逐行处理时不持有锁，读取方处理记录期间不会挡住写入。
+        同一连接能看到迭代期间新插入的行，这些行留给下次读取。
+        """
+        with self._lock:
+            (last,) = self.conn.execute("SELECT max(id) FROM results").fetchone()
+            cursor = self.conn.execute(sql, params)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(self.FETCH_SIZE)
+            for row in rows:
+                if row["id"] > (last or 0):
+                    return
+                yield row
+            if not rows:
+                return
+
+    def iter_records(self) -> Iterator[Dict[str, Any]]:
+        for row in self._iter_rows("SELECT * FROM results ORDER BY id"):
+            yield _from_row(row)
+
+    def iter_new_records(
+        self, cursor: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """游标为读到的最大 id"""
+        last = int(cursor) if cursor is not None else 0
+        with self._lock:
+            (max_id,) = self.conn.execute("SELECT max(id) FROM results").fetchone()
+        if (max_id or 0) < last:
+            raise StaleCursorError(self.path)
+        rows = self._iter_rows(
+            "SELECT * FROM results WHERE id > ? ORDER BY id", (last,)
+        )
+        for row in rows:
+            last = row["id"]
+            yield _from_row(row)
+        self.cursor = str(last)
+
+    def _mistakes_query(
+        self,
+        mode: Optional[str],
+        char_type: Optional[str],
+        since: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> Tuple[str, List[Any]]:
+        sql = "SELECT * FROM results WHERE is_correct = 0 AND reviewed = 0"
+        params: List[Any] = []
+        if mode is not None:
+            sql += " AND mode = ?"
+            params.append(mode)
+        if char_type is not None:
+            sql += " AND char_type = ?"
+            params.append(char_type)
+        if since is not None:
+            sql += " AND timestamp >= ?"
+            params.append(since)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(max(limit, 0))
+        return sql, params
+
+    def unreviewed_mistakes(
+        self, mode: Optional[str] = None, char_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        sql, params = self._mistakes_query(mode, char_type)
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return [_from_row(row) for row in rows]
+
+    def iter_mistakes(
+        self,
+        mode: Optional[str] = None,
+        char_type: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        sql, params = self._mistakes_query(mode, char_type, since, limit)
+        for row in self._iter_rows(sql, params):
+            yield _from_row(row)
+
+    def reviewed_questions(self) -> Set[str]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT question FROM results WHERE reviewed = 1"
+            ).fetchall()
+        return {row["question"] for row in rows}
+
+    def mark_reviewed(self, questions: Iterable[str]) -> None:
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE results SET reviewed = 1 WHERE question = ? AND is_correct = 0",
+                [(question,) for question in questions],
+            )
+            self.conn.commit()
+
+    def sync(self) -> None:
+        with self._lock:
+            self.conn.commit()
+
+    def close(self) -> None:
+        self.sync()
+        self.conn.close()
+
+
+def _to_row(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    extra = {k: v for k, v in record.items() if k not in RESULT_FIELDS}
+    return (
+        record["question"],
+        record["user_answer"],
+        record["correct_answer"],
+        int(record["is_correct"]),
+        record["mode"],
+        record["char_type"],
+        float(record["timestamp"]),
+        int(record.get("is_review", False)),
+        json.dumps(extra, ensure_ascii=False) if extra else None,
+    )
+
+
+def _from_row(row: "sqlite3.Row") -> Dict[str, Any]:
+    record = {field: row[field] for field in RESULT_FIELDS}
+    record["is_correct"] = bool(record["is_correct"])
+    record["is_review"] = bool(record["is_review"])
+    if row["extra"]:
+        record.update(json.loads(row["extra"]))
+    return record
+
+
+def open_result_store(
+    path: Union[str, Path], reviewed_file: Union[str, Path] = "reviewed_mistakes.json"
+) -> ResultStore:
+    """按文件后缀打开记录存储：.db/.sqlite 使用 SQLite，其余使用追加日志"""
+    path = Path(path)
+    if path.suffix in (".db", ".sqlite", ".sqlite3"):
+        return SQLiteResultStore(path)
+    return JournalResultStore(path, reviewed_file)
+
+
+def profile_dir(profile: str, data_dir: Union[str, Path] = DATA_DIR) -> Path:
+    """学习者的数据目录；profile 只能由字母、数字、下划线、点和横线组成"""
+    if not _PROFILE_NAME.match(profile):
+        raise ValueError(f"无效的学习者名称: {profile!r}")
+    return Path(data_dir) / profile
+
+
+def open_profile_store(
+    profile: str, data_dir: Union[str, Path] = DATA_DIR, suffix: str = ".jsonl"
+) -> ResultStore:
+    """打开学习者自己的记录分片，suffix 为 .db 时使用 SQLite"""
+    directory = profile_dir(profile, data_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    return open_result_store(
+        directory / f"results{suffix}", directory / "reviewed.json"
+    )
+
+
+if __name__ == "__main__":
+    # 在两种存储之间复制记录，例如：
+    # python store.py hiragana_quiz_results.jsonl hiragana_quiz_results.db
+    if len(sys.argv) != 3:
+        raise SystemExit("用法: python store.py <源文件> <目标文件>")
+
+    src = open_result_store(sys.argv[1])
+    dst = open_result_store(sys.argv[2])
+    count = dst.append(src.iter_records())
+    reviewed = src.reviewed_questions()
+    dst.mark_reviewed(
+        record["question"]
+        for record in src.iter_records()
+        if not record["is_correct"] and record["question"] in reviewed
+    )
+    dst.close()
+    print(f"已复制 {count} 条记录到 {sys.argv[2]}")
@@ -0,0 +1,197 @@
+import argparse
+import os
+import struct
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple, Union
+
+from kana_table import MODE_COLUMNS, KanaTable, get_kana_table
+from utils import FileLock
+
+if TYPE_CHECKING:
+    import numpy as np
+
+MODES = tuple(MODE_COLUMNS)
+
+# 文件布局：头部 <4sHI>（魔数、版本、五十音表大小），之后是定长的行，
+# 每个作答字符一行 <dIHBB>：作答时刻（Unix 秒）、该字符分摊的作答耗时（微秒）、
+# 五十音表位置、模式序号、是否答对
+_MAGIC = b"MJTM"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHI")
+_ROW = struct.Struct("<dIHBB")
+_MAX_US = 0xFFFFFFFF
+
+
+def encode_rows(
+    indices: Sequence[int],
+    mode: str,
+    char_results: Sequence[bool],
+    timestamp: float,
+    latency_ns: int,
+) -> bytes:
+    """一道题的计时行，整题耗时平均分给题中的每个字符"""
+    if not indices:
+        return b""
+    share = min(latency_ns // 1000 // len(indices), _MAX_US)
+    m = MODES.index(mode)
+    return b"".join(
+        _ROW.pack(timestamp, share, index, m, bool(ok))
+        for index, ok in zip(indices, char_results)
+    )
+
+
+class TimingLog:
+    """与答题记录并列的作答计时（每行 16 字节的二进制侧列）
+
+    只追加；读取时整个文件读成 NumPy 结构化数组，按假名或模式分组的
+    百分位数在一次排序里算出。写到一半中断留下的不完整行读取时忽略。
+    """
+
+    def __init__(
+        self, path: Union[str, Path], table: Optional[KanaTable] = None
+    ) -> None:
+        self.path = Path(path)
+        self.table = table if table is not None else get_kana_table()
+
+    def append(self, rows: bytes) -> None:
+        """追加 encode_rows 生成的行"""
+        if not rows:
+            return
+        with FileLock(self.path):
+            with open(self.path, "ab") as f:
+                if f.tell() < _HEADER.size:
+                    # 新文件，或者上次连文件头都没写完就中断了：重写文件头
+                    f.truncate(0)
+                    f.write(_HEADER.pack(_MAGIC, _VERSION, len(self.table)))
+                else:
+                    # 上次写到一半中断时，先截掉不完整的行，保持行对齐
+                    partial = (f.tell() - _HEADER.size) % _ROW.size
+                    if partial:
+                        f.truncate(f.tell() - partial)
+                f.write(rows)
+
+    def load(self) -> "np.ndarray":
+        """读取所有完整的行；文件不存在或与五十音表不匹配时返回空数组"""
+        import numpy as np  # 只在查询计时时导入
+
+        dtype = np.dtype(
+            [
+                ("timestamp", "<f8"),
+                ("latency_us", "<u4"),
+                ("kana", "<u2"),
+                ("mode", "u1"),
+                ("correct", "u1"),
+            ]
+        )
+        try:
+            with open(self.path, "rb") as f:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size or _HEADER.unpack(header) != (
+                    _MAGIC,
+                    _VERSION,
+                    len(self.table),
+                ):
+                    return np.zeros(0, dtype=dtype)
+                count = (os.fstat(f.fileno()).st_size - _HEADER.size) // _ROW.size
+                return np.fromfile(f, dtype=dtype, count=count)
+        except FileNotFoundError:
+            return np.zeros(0, dtype=dtype)
+
+    def _select(
+        self, mode: Optional[str], correct_only: bool, since: Optional[float]
+    ) -> "np.ndarray":
+        rows = self.load()
+        keep = rows["latency_us"] > 0
+        if mode is not None:
+            keep &= rows["mode"] == MODES.index(mode)
+        if correct_only:
+            keep &= rows["correct"] == 1
+        if since is not None:
+            keep &= rows["timestamp"] >= since
+        return rows[keep]
+
+    def percentiles(
+        self,
+        by: str = "kana",
+        ps: Sequence[float] = (50, 90),
+        mode: Optional[str] = None,
+        correct_only: bool = True,
+        since: Optional[float] = None,
+    ) -> Tuple["np.ndarray", "np.ndarray"]:
+        """按假名（by="kana"）或模式（by="mode"）分组的每字耗时百分位数（毫秒）
+
+        返回 (百分位数 [组, len(ps)]，样本数 [组])，没有样本的组为 NaN。
+        """
+        if by not in ("kana", "mode"):
+            raise ValueError(f"Unknown grouping: {by}")
+        rows = self._select(mode, correct_only, since)
+        size = len(self.table) if by == "kana" else len(MODES)
+        return _grouped_percentiles(rows[by], rows["latency_us"] / 1000, size, ps)
+
+    def fluency(
+        self, mode: str, min_samples: int = 3, max_boost: float = 2.0
+    ) -> List[float]:
+        """每个假名的流利度加权：答对时的耗时中位数比该模式整体中位数慢多少倍
+
+        只加权不降权（最小为 1），最多 max_boost 倍；样本不足 min_samples 的假名为 1。
+        """
+        import numpy as np
+
+        rows = self._select(mode, True, None)
+        if not len(rows):
+            return [1.0] * len(self.table)
+        medians, counts = _grouped_percentiles(
+            rows["kana"], rows["latency_us"].astype(np.float64), len(self.table), (50,)
+        )
+        ratio = medians[:, 0] / np.median(rows["latency_us"])
+        boost = np.where(counts >= min_samples, np.clip(ratio, 1.0, max_boost), 1.0)
+        result: List[float] = boost.tolist()
+        return result
+
+
+def _grouped_percentiles(
+    keys: "np.ndarray", values: "np.ndarray", size: int, ps: Sequence[float]
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """按 keys 分组排序一次，各组的百分位数取组内第 floor((n-1)·p/100) 个值"""
+    import numpy as np
+
+    keys = keys.astype(np.int64)
+    order = np.lexsort((values, keys))
+    values = values[order]
+    counts = np.bincount(keys, minlength=size)
+    starts = np.cumsum(counts) - counts
+    result = np.full((size, len(ps)), np.nan)
+    has = counts > 0
+    for j, p in enumerate(ps):
+        offset = np.floor((counts[has] - 1) * p / 100).astype(np.int64)
+        result[has, j] = values[starts[has] + offset]
+    return result, counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="作答耗时统计")
+    parser.add_argument("path", nargs="?", default="hiragana_quiz_results.timing")
+    parser.add_argument("--mode", choices=MODES, help="只看某个练习模式")
+    parser.add_argument("--all", action="store_true", help="包括答错的作答")
+    args = parser.parse_args()
+
+    log = TimingLog(args.path)
+    correct_only = not args.all
+    by_mode, mode_counts = log.percentiles("mode", (50, 90, 99), None, correct_only)
+    print("=== 各模式每字耗时（毫秒）: p50 / p90 / p99 ===")
+    for m, name in enumerate(MODES):
+        if mode_counts[m]:
+            p50, p90, p99 = by_mode[m]
+            print(f"{name:<14} {p50:8.0f} {p90:8.0f} {p99:8.0f}  ({mode_counts[m]} 次)")
+
+    by_kana, kana_counts = log.percentiles("kana", (50, 90), args.mode, correct_only)
+    print("\n=== 最慢的假名（按 p50）: p50 / p90 ===")
+    slowest = sorted(
+        (i for i in range(len(log.table)) if kana_counts[i]),
+        key=lambda i: -by_kana[i, 0],
+    )
+    for i in slowest[:15]:
+        p50, p90 = by_kana[i]
+        print(
+            f"{log.table.hiragana[i]:<4} {p50:8.0f} {p90:8.0f}  ({kana_counts[i]} 次)"
+        )
@@ -0,0 +1,326 @@
+import argparse
+import csv
+import re
+import unicodedata
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from grading import ROMAJI_VARIANTS
+from kana_table import KanaTable, get_kana_table
+
+# 五十音表之外的假名组合（主要用于外来语），以平假名书写，片假名按码位平移得到。
+# 罗马音与表中的写法不能重复，否则转回假名时会变成别的字：
+# 单独的小写元音用 xa 等，てぃ/でぃ/とぅ/どぅ/うぉ 用输入法的 thi/dhi/twu/dwu/who
+EXTRA_KANA = {
+    "ぁ": "xa",
+    "ぃ": "xi",
+    "ぅ": "xu",
+    "ぇ": "xe",
+    "ぉ": "xo",
+    "ゔ": "vu",
+    "ゔぁ": "va",
+    "ゔぃ": "vi",
+    "ゔぇ": "ve",
+    "ゔぉ": "vo",
+    "ふぁ": "fa",
+    "ふぃ": "fi",
+    "ふぇ": "fe",
+    "ふぉ": "fo",
+    "てぃ": "thi",
+    "でぃ": "dhi",
+    "とぅ": "twu",
+    "どぅ": "dwu",
+    "うぃ": "wi",
+    "うぇ": "we",
+    "うぉ": "who",
+    "しぇ": "she",
+    "じぇ": "je",
+    "ちぇ": "che",
+    "いぇ": "ye",
+}
+
+# 输入法的写法：di/du 对应ぢ/づ（表中它们与じ/ず同为 ji/zu）
+EXTRA_ROMAJI = {
+    "di": "ぢ",
+    "du": "づ",
+}
+
+SOKUON = "っッ"
+LONG_VOWEL = "ー"
+VOWELS = "aiueo"
+_KATA_OFFSET = ord("ア") - ord("あ")
+
+
+def to_katakana(text: str) -> str:
+    """平假名转片假名（其他字符不变）"""
+    return "".join(chr(ord(c) + _KATA_OFFSET) if "ぁ" <= c <= "ゖ" else c for c in text)
+
+
+class Trie:
+    """最长匹配前缀树"""
+
+    _END = ""
+
+    def __init__(self, mapping: Dict[str, str]) -> None:
+        self.root: Dict[str, Any] = {}
+        self.max_len = 0
+        for key, value in mapping.items():
+            node = self.root
+            for c in key:
+                node = node.setdefault(c, {})
+            node[self._END] = value
+            self.max_len = max(self.max_len, len(key))
+
+    def longest(self, text: str, start: int) -> Tuple[int, Optional[str]]:
+        """从 start 开始的最长匹配，返回 (匹配长度, 对应值)"""
+        node: Dict[str, Any] = self.root
+        length, value = 0, None
+        for i in range(start, min(len(text), start + self.max_len)):
+            child = node.get(text[i])
+            if child is None:
+                break
+            node = child
+            if self._END in node:
+                length, value = i - start + 1, node[self._END]
+        return length, value
+
+
+class Transliterator:
+    """假名与罗马音互转
+
+    以五十音表构建前缀树，按最长匹配逐段转换，处理拗音、促音（っ）、
+    长音（ー）和拨音（ん）。输入可以分块流式送入，总耗时与文本长度成正比。
+    """
+
+    def __init__(self, table: Optional[KanaTable] = None) -> None:
+        table = table if table is not None else get_kana_table()
+
+        kana_to_romaji: Dict[str, str] = {}
+        romaji_to_kana: Dict[str, str] = {}
+        pairs = list(zip(table.hiragana, table.romaji))
+        for hira, roma in pairs + list(EXTRA_KANA.items()):
+            kana_to_romaji.setdefault(hira, roma)
+            kana_to_romaji.setdefault(to_katakana(hira), roma)
+        # 罗马音的优先级：五十音表 > 输入法写法 > 训令式等变体 > 外来语组合
+        for hira, roma in pairs:
+            romaji_to_kana.setdefault(roma, hira)
+        for roma, hira in EXTRA_ROMAJI.items():
+            romaji_to_kana.setdefault(roma, hira)
+        for roma, variants in ROMAJI_VARIANTS.items():
+            for variant in variants:
+                if roma in romaji_to_kana and variant.isalpha():
+                    romaji_to_kana.setdefault(variant, romaji_to_kana[roma])
+        for hira, roma in EXTRA_KANA.items():
+            romaji_to_kana.setdefault(roma, hira)
+
+        self.kana_trie = Trie(kana_to_romaji)
+        self.romaji_trie = Trie(romaji_to_kana)
+
+    # ---- 假名 -> 罗马音 ----
+
+    def _kana_step(self, text: str, i: int, out: List[str]) -> int:
+        c = text[i]
+        if c in SOKUON:
+            _, nxt = self.kana_trie.longest(text, i + 1)
+            if nxt and nxt[0] not in VOWELS and nxt[0] != "n":
+                out.append(nxt[0])  # 促音：重复下一个音的辅音
+            return i + 1
+        if c == LONG_VOWEL:
+            last = out[-1][-1:] if out else ""
+            out.append(last if last and last in VOWELS else "-")
+            return i + 1
+
+        length, roma = self.kana_trie.longest(text, i)
+        if roma is None:
+            out.append(c)
+            return i + 1
+        if roma == "n":
+            _, nxt = self.kana_trie.longest(text, i + 1)
+            if nxt and nxt[0] in VOWELS + "ny":
+                roma = "n'"  # 区分 かんい / かに、んな / な
+        out.append(roma)
+        return i + length
+
+    def iter_kana_to_romaji(self, chunks: Iterable[str]) -> Iterator[str]:
+        """流式转换假名为罗马音，每送入一块输出已能确定的部分"""
+        lookahead = self.kana_trie.max_len + 1
+        yield from _stream(chunks, self._kana_step, lookahead)
+
+    def kana_to_romaji(self, text: str) -> str:
+        return "".join(self.iter_kana_to_romaji([text]))
+
+    # ---- 罗马音 -> 假名 ----
+
+    def _romaji_step(self, text: str, i: int, out: List[str]) -> int:
+        c = text[i]
+        nxt = text[i + 1 : i + 2]
+        if c == "'":
+            return i + 1
+        if c == "-":
+            out.append(LONG_VOWEL)
+            return i + 1
+        if c == "n" and (nxt == "" or nxt not in VOWELS + "y"):
+            # 拨音：n 后面不是元音或 y；nn 后面也不是元音或 y 时合并为一个 ん
+            after = text[i + 2 : i + 3]
+            out.append("ん")
+            if nxt == "n" and (after == "" or after not in VOWELS + "y"):
+                return i + 2
+            return i + 1
+        if c.isalpha() and c not in VOWELS and (nxt == c or text[i : i + 3] == "tch"):
+            out.append("っ")  # 双写辅音（或 tch）表示促音
+            return i + 1
+
+        length, kana = self.romaji_trie.longest(text, i)
+        if kana is None:
+            out.append(c)
+            return i + 1
+        out.append(kana)
+        return i + length
+
+    def iter_romaji_to_kana(
+        self, chunks: Iterable[str], katakana: bool = False
+    ) -> Iterator[str]:
+        """流式转换罗马音为假名"""
+        lookahead = self.romaji_trie.max_len + 2
+        lowered = (chunk.lower() for chunk in chunks)
+        for piece in _stream(lowered, self._romaji_step, lookahead):
+            yield to_katakana(piece) if katakana else piece
+
+    def romaji_to_kana(self, text: str, katakana: bool = False) -> str:
+        return "".join(self.iter_romaji_to_kana([text], katakana))
+
+
+def _stream(
+    chunks: Iterable[str], step: Callable[[str, int, List[str]], int], lookahead: int
+) -> Iterator[str]:
+    """按块推进转换；缓冲区末尾不足 lookahead 的部分留到下一块再处理"""
+    buffer = ""
+    out: List[str] = []  # 只保留上一块的最后一段输出，供长音判断前一个元音
+    for chunk in chunks:
+        buffer += chunk
+        i = 0
+        emitted = len(out)
+        while len(buffer) - i >= lookahead:
+            i = step(buffer, i, out)
+        buffer = buffer[i:]
+        if len(out) > emitted:
+            yield "".join(out[emitted:])
+            del out[:-1]
+
+    emitted = len(out)
+    i = 0
+    while i < len(buffer):
+        i = step(buffer, i, out)
+    if len(out) > emitted:
+        yield "".join(out[emitted:])
+
+
+# ---- 词汇表校验 ----
+
+# 外来语组合的输入法写法在比较时视同常见写法（ティ 写作 ti 或 thi 都算对）
+_LOANWORD_SPELLINGS = re.compile(r"thi|dhi|twu|dwu|who|x(?=[aiueo])")
+_LOANWORD_PLAIN = {"thi": "ti", "dhi": "di", "twu": "tu", "dwu": "du", "who": "wo"}
+
+_MACRONS = str.maketrans(
+    {"ā": "aa", "ī": "ii", "ū": "uu", "ē": "ee", "ō": "ou", "â": "aa", "ô": "ou"}
+)
+_READING = re.compile(r"^\|\s*([^|（]+?)（([^）|]+)）\s*\|")
+
+
+def canonical_romaji(text: str) -> str:
+    """用于比较的罗马音规范形式：忽略大小写、空格、撇号、长音写法差异"""
+    text = unicodedata.normalize("NFC", text.lower()).translate(_MACRONS)
+    text = re.sub(r"[\s'\-~]", "", text)
+    text = _LOANWORD_SPELLINGS.sub(lambda m: _LOANWORD_PLAIN.get(m.group(), ""), text)
+    return text.replace("tch", "cch").replace("oo", "ou")
+
+
+def is_kana(text: str) -> bool:
+    return all("ぁ" <= c <= "ゖ" or "ァ" <= c <= "ヺ" or c == LONG_VOWEL for c in text)
+
+
+def load_readings(notes_dir: Union[str, Path]) -> Dict[str, str]:
+    """从章节笔记的生词表中读取「漢字（かな）」形式的读音"""
+    readings: Dict[str, str] = {}
+    for path in Path(notes_dir).glob("ch*/*.md"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                match = _READING.match(line)
+                if match:
+                    readings[match.group(1).strip()] = match.group(2).strip()
+    return readings
+
+
+class Mismatch(NamedTuple):
+    unit: str
+    line: int
+    japan: str
+    romaji: str
+    expected: str
+
+
+def validate_units(
+    words_dir: Union[str, Path],
+    readings: Optional[Dict[str, str]] = None,
+    transliterator: Optional[Transliterator] = None,
+) -> Tuple[List[Mismatch], int, int]:
+    """检查所有单元 CSV 中 japan 与 romaji 两列是否一致
+
+    假名词条直接转写比较；含汉字的词条使用 readings 中的读音，没有读音时跳过。
+    返回 (不一致的词条, 已检查条数, 跳过条数)。
+    """
+    transliterator = transliterator or Transliterator()
+    readings = readings or {}
+    mismatches: List[Mismatch] = []
+    checked = skipped = 0
+    for path in sorted(Path(words_dir).glob("ch*.csv")):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for line_no, row in enumerate(csv.DictReader(f), 2):
+                japan, romaji = row["japan"].strip(), row["romaji"].strip()
+                kana = japan if is_kana(japan) else readings.get(japan)
+                if kana is None:
+                    skipped += 1
+                    continue
+                checked += 1
+                expected = transliterator.kana_to_romaji(kana)
+                if canonical_romaji(expected) != canonical_romaji(romaji):
+                    mismatches.append(
+                        Mismatch(path.stem, line_no, japan, romaji, expected)
+                    )
+    return mismatches, checked, skipped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="假名与罗马音互转 / 词汇表校验")
+    parser.add_argument("text", nargs="?", help="要转换的文本")
+    parser.add_argument("--to-kana", action="store_true", help="罗马音转假名")
+    parser.add_argument("--katakana", action="store_true", help="输出片假名")
+    parser.add_argument("--validate", metavar="WORDS_DIR", help="校验单元 CSV")
+    parser.add_argument("--notes", metavar="NOTES_DIR", help="章节笔记目录（读音）")
+    args = parser.parse_args()
+
+    tr = Transliterator()
+    if args.validate:
+        notes = load_readings(args.notes) if args.notes else None
+        mismatches, checked, skipped = validate_units(args.validate, notes, tr)
+        for m in mismatches:
+            print(f"{m.unit}:{m.line} {m.japan} 写作 {m.romaji}，应为 {m.expected}")
+        print(f"已检查 {checked} 条，跳过 {skipped} 条，不一致 {len(mismatches)} 条")
+    elif args.text:
+        if args.to_kana:
+            print(tr.romaji_to_kana(args.text, args.katakana))
+        else:
+            print(tr.kana_to_romaji(args.text))
+    else:
+        parser.print_help()
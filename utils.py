@@ -1,12 +1,23 @@
 import json
+import os
+import re
+import sys
 from pathlib import Path
-from typing import Any, Dict, List, Tuple, Union, cast
+from types import TracebackType
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple, Type, Union, cast
 
+from metrics import timed
 
-def load_kana_data() -> Tuple[Dict[str, Any], Dict[str, Any]]:
+_SEPARATOR = re.compile(r"[\s,]*")  # 数组元素之间的空白和逗号
+
+
+@timed("load_kana_data")
+def load_kana_data(
+    path: Union[Path, str] = "hiragana_data.json"
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     """从JSON文件加载五十音图数据"""
     try:
-        with open("hiragana_data.json", "r", encoding="utf-8") as f:
+        with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
         return data.get("basic_kana", {}), data.get("youon_kana", {})
     except Exception as e:
@@ -15,6 +26,7 @@ def load_kana_data() -> Tuple[Dict[str, Any], Dict[str, Any]]:
         return {}, {}
 
 
+@timed("load_result_data")
 def load_result_data(path: Union[Path, str]) -> List[Any]:
     """加载错题本"""
     if isinstance(path, str):
@@ -22,9 +34,118 @@ def load_result_data(path: Union[Path, str]) -> List[Any]:
 
     if path.exists():
         try:
+            if path.suffix == ".jsonl":
+                # 追加日志格式：每行一条记录，跳过写了一半的最后一行
+                with open(path, "r", encoding="utf-8") as f:
+                    return [json.loads(line) for line in f if line.endswith("\n")]
             data = json.loads(path.read_text(encoding="utf-8"))
             return cast(List[Any], data)  # 显式类型断言
         except Exception:
             print("无法加载历史记录，将创建新记录")
 
     return []
+
+
+def iter_json_array(path: Union[Path, str], chunk_size: int = 1 << 20) -> Iterator[Any]:
+    """逐个读取 JSON 数组文件中的元素，内存占用与单个元素大小相关，与文件大小无关
+
+    空文件视为空数组；不是数组或内容被截断时抛出 ValueError（含 JSONDecodeError）。
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(chunk_size)
+        pos = _skip_separators(buffer, 0)
+        if pos == len(buffer):
+            return
+        if buffer[pos : pos + 1] != "[":
+            raise ValueError(f"不是 JSON 数组: {path}")
+        pos += 1
+        eof = False
+        while True:
+            pos = _skip_separators(buffer, pos)
+            if buffer[pos : pos + 1] == "]":
+                return
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 元素被分块截断：读入下一块再试，丢掉已解析的部分
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+
+
+def _skip_separators(text: str, pos: int) -> int:
+    match = _SEPARATOR.match(text, pos)
+    return match.end() if match else pos
+
+
+def atomic_write_bytes(path: Union[Path, str], data: bytes) -> None:
+    """先写临时文件再改名替换，写到一半中断也不会损坏原文件"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class FileLock:
+    """跨进程的建议性文件锁，锁文件为 path + ".lock"
+
+    POSIX 上使用 flock，Windows 上使用 msvcrt.locking。
+    同一个对象可以反复加锁解锁，锁文件句柄在第一次加锁时打开并保持。
+    """
+
+    def __init__(self, path: Union[Path, str]) -> None:
+        self.path = Path(str(path) + ".lock")
+        self._fh: Optional[IO[bytes]] = None
+
+    def acquire(self) -> None:
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, "a+b")
+        if sys.platform == "win32":
+            import msvcrt
+
+            self._fh.seek(0)
+            msvcrt.locking(self._fh.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+
+    def release(self) -> None:
+        if self._fh is None:
+            return
+        if sys.platform == "win32":
+            import msvcrt
+
+            self._fh.seek(0)
+            msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.release()